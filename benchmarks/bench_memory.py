@@ -0,0 +1,65 @@
+"""Benchmark the memory held per loaded history entry: the dicts json.load
+returns for the flat layout vs. PlanEntry objects.
+
+Timestamps carry microseconds, as saved plans do.
+
+Usage: python benchmarks/bench_memory.py [ENTRIES]
+"""
+
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from periodic_prompter.models import PlanEntry
+
+RECURRING_PLANS = ["Email and Slack", "Standup", "Code review", "Lunch", "1:1 with manager",
+                   "Sprint planning", "Fix flaky CI tests", "Write weekly status update"]
+
+
+def _flat_json(entries):
+    """A history in the flat JSON layout, with about half the plans recurring."""
+    rng = random.Random(1)
+    start = PlanEntry('2020-01-01T00:00:00', '').timestamp_us
+    records = []
+    previous = ''
+    for i in range(entries):
+        if rng.random() < 0.5:
+            plan = rng.choice(RECURRING_PLANS)
+        else:
+            plan = f"Work on ticket {rng.randint(1000, 9999)}: {rng.choice(RECURRING_PLANS).lower()} follow-up"
+        entry = PlanEntry(None, plan, previous, 'yes' if previous else '', bool(previous),
+                          i + 1, start + i * 900000000 + rng.randrange(1000000))
+        records.append(entry.to_dict())
+        previous = plan
+    return json.dumps(records)
+
+
+def _measure(load, text):
+    """(bytes per entry held by load(text)'s result, the result)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    loaded = load(text)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held / len(loaded), loaded
+
+
+def main(entries=100000):
+    text = _flat_json(entries)
+    dict_bytes, dicts = _measure(json.loads, text)
+    entry_bytes, plans = _measure(lambda data: [PlanEntry.from_dict(record) for record in json.loads(data)], text)
+
+    lossless = all(PlanEntry.from_dict(record) == plan for record, plan in zip(dicts, plans))
+    print(f"{entries} entries:")
+    print(f"  dicts       {dict_bytes:8.0f} bytes/entry")
+    print(f"  PlanEntry   {entry_bytes:8.0f} bytes/entry ({(1 - entry_bytes / dict_bytes) * 100:.0f}% less)")
+    print(f"  round trip  {'lossless' if lossless else 'LOSSY'}")
+    return 0 if lossless else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,117 @@
+"""Benchmark history queries: memory-mapped snapshot vs. full JSON load,
+the JSON vs. binary snapshot formats, and normalized vs. flat snapshot size.
+
+Usage: python benchmarks/bench_storage.py [ENTRIES]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from periodic_prompter import binformat
+from periodic_prompter.models import PlanEntry
+from periodic_prompter.storage import PlanStorage, _encode_record
+
+RECURRING_PLANS = ["Email and Slack", "Standup", "Code review", "Lunch", "1:1 with manager",
+                   "Sprint planning", "Fix flaky CI tests", "Write weekly status update"]
+
+
+def _timed(label, func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<34} {best * 1000:10.1f} ms")
+
+
+def _realistic_history(entries):
+    """Entries where about half the plans recur and the rest are one-offs."""
+    rng = random.Random(1)
+    start = int(datetime(2020, 1, 1).timestamp())
+    history = []
+    previous = ''
+    for i in range(entries):
+        if rng.random() < 0.5:
+            plan = rng.choice(RECURRING_PLANS)
+        else:
+            plan = f"Work on ticket {rng.randint(1000, 9999)}: {rng.choice(RECURRING_PLANS).lower()} follow-up"
+        history.append(PlanEntry(start + i * 900, plan, previous, 'yes' if previous else '', True))
+        previous = plan
+    return history
+
+
+def _flat_size(plans, storage_format):
+    """Bytes the records take with both texts stored inline in every record."""
+    if storage_format == 'binary':
+        return sum(binformat.RECORD_HEADER.size + len(plan.plan.encode('utf-8')) +
+                   len(plan.previous_plan.encode('utf-8')) for plan in plans)
+    return sum(len(_encode_record({key: value for key, value in plan.to_dict().items() if key != 'id'})
+                   .encode('utf-8')) + 2 for plan in plans)
+
+
+def main(entries=200000):
+    with tempfile.TemporaryDirectory() as data_dir:
+        storage = PlanStorage(data_dir)
+        start = int(datetime(2020, 1, 1).timestamp())
+        storage.import_plans([
+            PlanEntry(start + i * 900, f"Plan {i}", f"Plan {i - 1}", 'yes', True)
+            for i in range(entries)
+        ])
+        storage.compact()
+        size = storage.plans_file.stat().st_size
+        print(f"{entries} entries, snapshot {size / 1e6:.1f} MB")
+
+        day = datetime.fromtimestamp(start + entries * 450).replace(hour=0, minute=0, second=0)
+
+        print("full load (_load_json / _load_state):")
+        _timed("_load_json", lambda: storage._load_json(storage.plans_file))
+        _timed("history(50)", lambda: storage._load_state()['plans'][-50:])
+        _timed("one day", lambda: [p for p in storage._load_state()['plans']
+                                   if p.datetime.date() == day.date()])
+        _timed("full scan", lambda: sum(1 for _ in storage._load_state()['plans']))
+
+        print("memory-mapped:")
+        storage._view = None
+        _timed("first query (builds index)", lambda: storage.get_plans_history(50), repeat=1)
+        _timed("history(50)", lambda: storage.get_plans_history(50))
+        _timed("one day", lambda: list(storage.iter_plans(day, day + timedelta(days=1))))
+        _timed("full scan", lambda: sum(1 for _ in storage.iter_plans()))
+
+        storage.close()
+
+        print("snapshot formats:")
+        for storage_format in ('json', 'binary'):
+            storage = PlanStorage(data_dir, storage_format)
+            path = storage.plans_file
+            print(f" {storage_format}: {path.name} {path.stat().st_size / 1e6:.1f} MB")
+            _timed("parse everything", lambda: storage._read_snapshot(path))
+            storage._view = None
+            _timed("open view", lambda: storage._read_view(), repeat=1)
+            view = storage._read_view()[0]
+            _timed("entry N (x1000)", lambda: [view.record(i * 97 % len(view)) for i in range(1000)])
+            _timed("one day", lambda: list(storage.iter_plans(day, day + timedelta(days=1))))
+            storage.close()
+
+    print("normalized snapshots (recurring plans, previous plan by id):")
+    history = _realistic_history(entries)
+    for storage_format in ('json', 'binary'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            storage = PlanStorage(data_dir, storage_format)
+            storage.import_plans(history)
+            storage.compact()
+            size = storage.plans_file.stat().st_size
+            flat = _flat_size(storage._load_plans(), storage_format)
+            storage.close()
+        print(f"  {storage_format:<6} flat {flat / 1e6:6.1f} MB  normalized {size / 1e6:6.1f} MB"
+              f"  ({(1 - size / flat) * 100:.0f}% smaller)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -23,13 +23,32 @@ OPTIONS = {
     'site_packages': False,
     'strip': True,
     'optimize': 2,
-    'packages': ['rumps', 'plyer', 'schedule'],
+    'packages': ['rumps', 'plyer'],
     'includes': [
         'periodic_prompter',
         'periodic_prompter.main_rumps',
         'periodic_prompter.notifications',
         'periodic_prompter.settings', 
         'periodic_prompter.storage',
+        'periodic_prompter.locking',
+        'periodic_prompter.models',
+        'periodic_prompter.analytics',
+        'periodic_prompter.rollups',
+        'periodic_prompter.importer',
+        'periodic_prompter.binformat',
+        'periodic_prompter.paging',
+        'periodic_prompter.clock',
+        'periodic_prompter.simulator',
+        'periodic_prompter.working_hours',
+        'periodic_prompter.ui_dispatcher',
+        'periodic_prompter.sinks',
+        'periodic_prompter.sync',
+        'periodic_prompter.team_report',
+        'periodic_prompter.profiling',
+        'periodic_prompter.tracing',
+        'periodic_prompter.events',
+        'periodic_prompter.recent',
+        'periodic_prompter.reports',
         'periodic_prompter.scheduler',
         'periodic_prompter.settings_gui'
     ],
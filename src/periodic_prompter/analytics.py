@@ -0,0 +1,163 @@
+"""Completion-rate analytics over the plan history.
+
+Every breakdown is computed from the daily and hourly rollups that
+storage keeps up to date on each save, so the cost depends on the number
+of days with plans, not on the number of entries, and nothing is read
+from the history itself.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.rollups import DailyRollups
+except ImportError:
+    from .rollups import DailyRollups
+
+
+# How much each rollup answer counter counts towards the completion rate
+FIELD_SCORES = {
+    'completed': 1.0,
+    'partial': 0.5,
+    'no': 0.0,
+}
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+ROLLING_WINDOWS = (7, 30)
+
+# Buckets with fewer answered plans than this are left out of best/worst picks
+MIN_SAMPLES = 3
+
+
+def _answered(counts: Dict) -> int:
+    return sum(counts[field] for field in FIELD_SCORES)
+
+
+def _score(counts: Dict) -> float:
+    return sum(counts[field] * score for field, score in FIELD_SCORES.items())
+
+
+def _rates(score_sums, counts) -> List[Optional[float]]:
+    """Completion percentage per bucket, None where nothing was answered."""
+    return [(s / c) * 100 if c else None for s, c in zip(score_sums, counts)]
+
+
+def _bucket(buckets: List[List[Dict]]) -> Dict:
+    """Sum plans, answered counts and scores over the rollups in each bucket.
+    
+    The raw sums are returned alongside the rates so breakdowns from
+    several histories can be added together.
+    """
+    plans = [sum(counts['count'] for counts in bucket) for bucket in buckets]
+    answered = [sum(_answered(counts) for counts in bucket) for bucket in buckets]
+    scores = [sum(_score(counts) for counts in bucket) for bucket in buckets]
+    return {'rates': _rates(scores, answered), 'answered': answered, 'plans': plans, 'scores': scores}
+
+
+def by_hour(rollups: DailyRollups) -> Dict:
+    """Completion rate for each hour of the day (0-23)."""
+    return _bucket([[counts] for counts in rollups.hours])
+
+
+def by_weekday(rollups: DailyRollups) -> Dict:
+    """Completion rate for each weekday (Monday=0)."""
+    buckets = [[] for _ in range(7)]
+    for day_key, day in rollups.days.items():
+        buckets[date.fromisoformat(day_key).weekday()].append(day)
+    return _bucket(buckets)
+
+
+def _daily(rollups: DailyRollups, today: date) -> Dict:
+    """Answered counts and score sums per calendar day, first day to today.
+    
+    Days without plans, including those since the last plan, count as zero.
+    """
+    days = {date.fromisoformat(day_key): day for day_key, day in rollups.days.items()}
+    first_day = min(days)
+    span = (max(max(days), today) - first_day).days + 1
+    counts = [0] * span
+    score_sums = [0.0] * span
+    for day, rollup in days.items():
+        counts[(day - first_day).days] = _answered(rollup)
+        score_sums[(day - first_day).days] = _score(rollup)
+    return {'first_day': first_day, 'span': span, 'counts': counts, 'score_sums': score_sums}
+
+
+def _rolling_from_daily(daily: Dict, window_days: int) -> List[Dict]:
+    """Trailing-window completion rates from per-day totals."""
+    counts = daily['counts']
+    score_sums = daily['score_sums']
+    window_counts = []
+    window_scores = []
+    count_sum = 0
+    score_sum = 0.0
+    for i in range(daily['span']):
+        count_sum += counts[i]
+        score_sum += score_sums[i]
+        if i >= window_days:
+            count_sum -= counts[i - window_days]
+            score_sum -= score_sums[i - window_days]
+        window_counts.append(count_sum)
+        window_scores.append(score_sum)
+    
+    rates = _rates(window_scores, window_counts)
+    return [
+        {'date': daily['first_day'] + timedelta(days=i), 'rate': rates[i], 'answered': window_counts[i]}
+        for i in range(daily['span'])
+    ]
+
+
+def rolling(rollups: DailyRollups, window_days: int, today: Optional[date] = None) -> List[Dict]:
+    """Completion rate over a trailing window, for every day in the history.
+    
+    Returns one {'date', 'rate', 'answered'} dict per calendar day from the
+    first recorded plan to today (default: the current date).
+    """
+    if not rollups.days:
+        return []
+    return _rolling_from_daily(_daily(rollups, today or date.today()), window_days)
+
+
+def _extreme(breakdown: Dict, pick) -> Optional[int]:
+    """Index of the best/worst bucket with enough answered plans."""
+    candidates = [i for i, rate in enumerate(breakdown['rates'])
+                  if rate is not None and breakdown['answered'][i] >= MIN_SAMPLES]
+    if not candidates:
+        return None
+    return pick(candidates, key=lambda i: breakdown['rates'][i])
+
+
+def analyze_rollups(rollups: DailyRollups, today: Optional[date] = None) -> Dict:
+    """Compute all breakdowns from a history's rollups.
+    
+    The current rates are over the windows ending today (default: the
+    current date), whether or not there were plans on the last few days.
+    """
+    hours = by_hour(rollups)
+    weekdays = by_weekday(rollups)
+    daily = _daily(rollups, today or date.today()) if rollups.days else None
+    windows = {days: (_rolling_from_daily(daily, days) if daily else []) for days in ROLLING_WINDOWS}
+    
+    return {
+        'entries': sum(day['count'] for day in rollups.days.values()),
+        'by_hour': hours,
+        'by_weekday': weekdays,
+        'worst_hour': _extreme(hours, min),
+        'best_hour': _extreme(hours, max),
+        'worst_weekday': _extreme(weekdays, min),
+        'best_weekday': _extreme(weekdays, max),
+        'rolling': windows,
+        'current': {days: (series[-1]['rate'] if series else None) for days, series in windows.items()},
+    }
+
+
+def analyze_entries(entries: Iterable, today: Optional[date] = None) -> Dict:
+    """Compute all breakdowns for PlanEntry objects in history order."""
+    return analyze_rollups(DailyRollups.rebuild(entries, 0), today)
+
+
+def analyze(storage, today: Optional[date] = None) -> Dict:
+    """Compute completion breakdowns for everything in a PlanStorage."""
+    return analyze_rollups(storage.get_daily_rollups(), today)
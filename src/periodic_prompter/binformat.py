@@ -0,0 +1,362 @@
+"""Binary snapshot format for the plan history.
+
+A binary snapshot is a fixed header, one record per entry and a table of
+repeated plan texts:
+    
+    header:  magic, seq, count, SHA-256 of everything after the header,
+             offset of the strings table
+    record:  time (int64 epoch microseconds), id (int64), status code (uint8), flags (uint8),
+             plan field (uint32), previous plan field (uint32),
+             then whichever of the plan and previous plan are inline UTF-8
+    strings: count (uint32), then each text as length (uint32) and UTF-8
+
+A plan field is the byte length of the inline text, or with its flag set
+an index into the strings table. The previous plan field may instead hold
+the id of the record just before, whose plan it was (see EntryNormalizer).
+
+A sidecar ``<snapshot>.idx`` file holds the byte offset and epoch second
+of every record as two int64 arrays, so entry N is one lookup and a time
+range is a binary search that decodes nothing. The index is derived data:
+it names the checksum of the snapshot it describes and is rebuilt by a
+single header scan whenever it is missing or stale.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.models import MICROS, CompletionStatus, EntryNormalizer, PlanEntry
+    from periodic_prompter.paging import release_pages
+except ImportError:
+    from .models import MICROS, CompletionStatus, EntryNormalizer, PlanEntry
+    from .paging import release_pages
+
+
+MAGIC = b'PPBIN\x00\x03\n'
+INDEX_MAGIC = b'PPIDX\x00\x01\n'
+
+FILE_HEADER = struct.Struct('<8sQQ32sQ')
+RECORD_HEADER = struct.Struct('<qqBBII')
+INDEX_HEADER = struct.Struct('<8s32sQ')
+LENGTH = struct.Struct('<I')
+
+STATUS_CODES = {
+    CompletionStatus.NONE: 0,
+    CompletionStatus.YES: 1,
+    CompletionStatus.NO: 2,
+    CompletionStatus.PARTIALLY: 3,
+}
+STATUSES = {code: status for status, code in STATUS_CODES.items()}
+
+FLAG_COMPLETED = 0x01
+FLAG_PLAN_STRING = 0x02
+FLAG_PREVIOUS_STRING = 0x04
+FLAG_PREVIOUS_ID = 0x08
+
+
+def is_binary(data: bytes) -> bool:
+    """Whether data starts like a binary snapshot."""
+    return data[:len(MAGIC)] == MAGIC
+
+
+def encode_records(entries: Iterable[PlanEntry], normalizer: EntryNormalizer) -> bytearray:
+    """Encode entries as consecutive binary records (a snapshot body).
+    
+    Successive batches of one snapshot must share the normalizer.
+    """
+    body = bytearray()
+    pack = RECORD_HEADER.pack
+    for entry in entries:
+        flags = FLAG_COMPLETED if entry.completed else 0
+        plan = normalizer.text(entry.plan)
+        if isinstance(plan, int):
+            flags |= FLAG_PLAN_STRING
+            plan_field, plan = plan, b''
+        else:
+            plan = plan.encode('utf-8')
+            plan_field = len(plan)
+        
+        previous_id = normalizer.previous_id(entry)
+        if previous_id is not None:
+            flags |= FLAG_PREVIOUS_ID
+            previous_field, previous_plan = previous_id, b''
+        else:
+            previous_plan = normalizer.text(entry.previous_plan)
+            if isinstance(previous_plan, int):
+                flags |= FLAG_PREVIOUS_STRING
+                previous_field, previous_plan = previous_plan, b''
+            else:
+                previous_plan = previous_plan.encode('utf-8')
+                previous_field = len(previous_plan)
+        
+        body += pack(entry.timestamp_us, entry.id, STATUS_CODES[entry.completion_status],
+                     flags, plan_field, previous_field)
+        body += plan
+        body += previous_plan
+    return body
+
+
+def encode_strings(strings: List[str]) -> bytearray:
+    """Encode the strings table that ends a snapshot."""
+    table = bytearray(LENGTH.pack(len(strings)))
+    for text in strings:
+        data = text.encode('utf-8')
+        table += LENGTH.pack(len(data))
+        table += data
+    return table
+
+
+def encode_header(seq: int, count: int, checksum: bytes, strings_offset: int) -> bytes:
+    """File header for a snapshot whose body has the given SHA-256."""
+    return FILE_HEADER.pack(MAGIC, seq, count, checksum, strings_offset)
+
+
+def encode_snapshot(entries: List[PlanEntry], seq: int) -> bytes:
+    """Encode entries as a binary snapshot."""
+    normalizer = EntryNormalizer()
+    body = encode_records(entries, normalizer)
+    strings_offset = FILE_HEADER.size + len(body)
+    body += encode_strings(normalizer.strings)
+    header = encode_header(seq, len(entries), hashlib.sha256(body).digest(), strings_offset)
+    return header + bytes(body)
+
+
+def _record_plan(data, offset: int, strings: List[str]) -> Tuple[int, str]:
+    """Id and plan text of the record at offset, decoding nothing else."""
+    _, entry_id, _, flags, plan_field, _ = RECORD_HEADER.unpack_from(data, offset)
+    if flags & FLAG_PLAN_STRING:
+        return entry_id, strings[plan_field]
+    start = offset + RECORD_HEADER.size
+    return entry_id, str(data[start:start + plan_field], 'utf-8')
+
+
+def _decode_record(data, offset: int, strings: List[str],
+                   prior: Callable[[], Optional[Tuple[int, str]]]) -> Tuple[PlanEntry, int]:
+    """Decode the record at offset, returning it and the next record's offset.
+    
+    prior() returns the id and plan of the record before this one, for a
+    previous plan given by id.
+    """
+    timestamp, entry_id, code, flags, plan_field, previous_field = RECORD_HEADER.unpack_from(data, offset)
+    pos = offset + RECORD_HEADER.size
+    if flags & FLAG_PLAN_STRING:
+        plan = strings[plan_field]
+    else:
+        plan = str(data[pos:pos + plan_field], 'utf-8')
+        pos += plan_field
+    
+    if flags & FLAG_PREVIOUS_ID:
+        before = prior()
+        if before is None or before[0] != previous_field:
+            raise ValueError(f"record at byte {offset} refers to a missing entry {previous_field}")
+        previous_plan = before[1]
+    elif flags & FLAG_PREVIOUS_STRING:
+        previous_plan = strings[previous_field]
+    else:
+        previous_plan = str(data[pos:pos + previous_field], 'utf-8')
+        pos += previous_field
+    
+    if pos > len(data):
+        raise ValueError(f"record at byte {offset} runs past the end of the snapshot")
+    entry = PlanEntry(None, plan, previous_plan, STATUSES[code], flags & FLAG_COMPLETED, entry_id, timestamp)
+    return entry, pos
+
+
+def _read_header(data) -> Tuple[int, int, bytes, int]:
+    """Validate the file header, returning (seq, count, checksum, strings offset)."""
+    if len(data) < FILE_HEADER.size:
+        raise ValueError("snapshot is truncated")
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError("not a binary snapshot")
+    _, seq, count, checksum, strings_offset = FILE_HEADER.unpack_from(data, 0)
+    if not FILE_HEADER.size <= strings_offset <= len(data):
+        raise ValueError("strings table offset is out of range")
+    return seq, count, checksum, strings_offset
+
+
+def _verify(data, checksum: bytes):
+    body = memoryview(data)[FILE_HEADER.size:]
+    try:
+        if hashlib.sha256(body).digest() != checksum:
+            raise ValueError("checksum mismatch")
+    finally:
+        body.release()
+
+
+def _read_strings(data, offset: int) -> List[str]:
+    """Decode the strings table at offset."""
+    try:
+        count = LENGTH.unpack_from(data, offset)[0]
+        pos = offset + LENGTH.size
+        strings = []
+        for _ in range(count):
+            length = LENGTH.unpack_from(data, pos)[0]
+            pos += LENGTH.size
+            strings.append(str(data[pos:pos + length], 'utf-8'))
+            pos += length
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"unreadable strings table: {e}")
+    if pos != len(data):
+        raise ValueError("trailing data after the strings table")
+    return strings
+
+
+def decode_snapshot(data: bytes) -> Tuple[int, List[PlanEntry]]:
+    """Verify and decode a whole binary snapshot, returning (seq, entries).
+    
+    Raises ValueError if the data is damaged.
+    """
+    seq, count, checksum, strings_offset = _read_header(data)
+    _verify(data, checksum)
+    strings = _read_strings(data, strings_offset)
+    
+    entries = []
+    offset = FILE_HEADER.size
+    try:
+        for _ in range(count):
+            entry, offset = _decode_record(
+                data, offset, strings, lambda: (entries[-1].id, entries[-1].plan) if entries else None)
+            entries.append(entry)
+    except (struct.error, KeyError, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"unreadable record at byte {offset}: {e}")
+    if offset != strings_offset:
+        raise ValueError("trailing data after the last record")
+    return seq, entries
+
+
+def _index_path(snapshot_path: Path) -> Path:
+    return snapshot_path.with_name(snapshot_path.name + '.idx')
+
+
+def build_index(data, count: int, end: int) -> Tuple[List[int], List[int]]:
+    """Scan the record headers before end, returning (offsets, epoch seconds)."""
+    offsets = []
+    timestamps = []
+    offset = FILE_HEADER.size
+    unpack_from = RECORD_HEADER.unpack_from
+    for _ in range(count):
+        timestamp, _, _, flags, plan_field, previous_field = unpack_from(data, offset)
+        offsets.append(offset)
+        timestamps.append(timestamp // MICROS)
+        offset += RECORD_HEADER.size
+        if not flags & FLAG_PLAN_STRING:
+            offset += plan_field
+        if not flags & (FLAG_PREVIOUS_STRING | FLAG_PREVIOUS_ID):
+            offset += previous_field
+    if offset != end:
+        raise ValueError("record lengths do not add up to the snapshot size")
+    return offsets, timestamps
+
+
+def write_index(snapshot_path: Path, checksum: bytes, offsets, timestamps):
+    """Write the sidecar index for a snapshot (temp file and rename)."""
+    index_path = _index_path(snapshot_path)
+    tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+    count = len(offsets)
+    with open(tmp_path, 'wb') as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, checksum, count))
+        f.write(struct.pack(f'<{count}q', *offsets))
+        f.write(struct.pack(f'<{count}q', *timestamps))
+    os.replace(tmp_path, index_path)
+
+
+def index_snapshot(snapshot_path: Path):
+    """Write the sidecar index for a freshly written snapshot."""
+    with open(snapshot_path, 'rb') as f:
+        data = f.read()
+    _, count, checksum, strings_offset = _read_header(data)
+    write_index(snapshot_path, checksum, *build_index(data, count, strings_offset))
+
+
+class BinarySnapshot:
+    """Read-only, memory-mapped view of a binary snapshot and its index.
+    
+    Offers the same interface as storage.SnapshotIndex, so readers can use
+    either format interchangeably.
+    """
+    
+    def __init__(self, file_path: Path, f):
+        st = os.fstat(f.fileno())
+        self.key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self.file_path = Path(file_path)
+        self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.seq, count, checksum, self.strings_offset = _read_header(self.mm)
+        _verify(self.mm, checksum)
+        self.strings = _read_strings(self.mm, self.strings_offset)
+        self.offsets, self.timestamps = self._load_index(count, checksum)
+    
+    def _load_index(self, count: int, checksum: bytes):
+        """Map the sidecar index, rebuilding it if it is missing or stale."""
+        index_path = _index_path(self.file_path)
+        try:
+            with open(index_path, 'rb') as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_checksum, index_count = INDEX_HEADER.unpack_from(index, 0)
+            if magic == INDEX_MAGIC and index_checksum == checksum and index_count == count and \
+                    len(index) == INDEX_HEADER.size + 16 * count:
+                columns = memoryview(index)[INDEX_HEADER.size:].cast('q')
+                return columns[:count], columns[count:]
+        except (OSError, ValueError, struct.error):
+            pass
+        
+        offsets, timestamps = build_index(self.mm, count, self.strings_offset)
+        try:
+            write_index(self.file_path, checksum, offsets, timestamps)
+        except OSError as e:
+            print(f"Could not write snapshot index for {self.file_path}: {e}")
+        return offsets, timestamps
+    
+    def __len__(self):
+        return len(self.offsets)
+    
+    @property
+    def max_id(self) -> int:
+        """Largest entry id, read from the record headers without decoding the records."""
+        unpack = RECORD_HEADER.unpack_from
+        return max((unpack(self.mm, offset)[1] for offset in self.offsets), default=0)
+    
+    def _decode(self, index: int, offset: int, prior: Optional[PlanEntry]) -> Tuple[PlanEntry, int]:
+        """Decode record number index at offset; prior is the entry before, if known."""
+        def before():
+            if prior is not None:
+                return prior.id, prior.plan
+            if index == 0:
+                return None
+            return _record_plan(self.mm, self.offsets[index - 1], self.strings)
+        return _decode_record(self.mm, offset, self.strings, before)
+    
+    def record(self, index: int) -> PlanEntry:
+        """Decode record number index."""
+        return self._decode(index, self.offsets[index], None)[0]
+    
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[PlanEntry]:
+        """Decode records [start, stop) lazily."""
+        if stop is None:
+            stop = len(self)
+        offset = self.offsets[start] if start < stop else 0
+        entry = None
+        for index in range(start, stop):
+            entry, offset = self._decode(index, offset, entry)
+            yield entry
+    
+    def release(self, start: int, stop: int):
+        """Let the OS drop the mapped pages holding records [start, stop)."""
+        end = self.offsets[stop] if stop < len(self.offsets) else self.strings_offset
+        release_pages(self.mm, self.offsets[start], end)
+    
+    def bisect_time(self, epoch: int) -> int:
+        """Index of the first record at or after epoch, from the index alone."""
+        timestamps = self.timestamps
+        low, high = 0, len(timestamps)
+        while low < high:
+            mid = (low + high) // 2
+            if timestamps[mid] < epoch:
+                low = mid + 1
+            else:
+                high = mid
+        return low
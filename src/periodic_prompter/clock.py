@@ -0,0 +1,52 @@
+"""Clock abstraction so scheduling can run against real or simulated time."""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class SystemClock:
+    """Wall-clock time and real waiting."""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def wait(self, event: threading.Event, timeout: Optional[float]) -> bool:
+        """Wait until event is set or timeout seconds pass. Returns event.is_set()."""
+        return event.wait(timeout)
+
+    def sleep(self, seconds: float):
+        threading.Event().wait(seconds)
+
+
+class VirtualClock:
+    """Simulated time that only moves when told to.
+
+    Waiting and sleeping advance the clock instantly instead of blocking,
+    so a year of scheduling can be replayed in moments.
+    """
+
+    def __init__(self, start: Optional[datetime] = None):
+        self.current = start or datetime(2000, 1, 1)
+
+    def now(self) -> datetime:
+        return self.current
+
+    def advance(self, seconds: float):
+        self.current += timedelta(seconds=seconds)
+
+    def advance_to(self, when: datetime):
+        """Move forward to when (never backwards)."""
+        if when > self.current:
+            self.current = when
+
+    def wait(self, event: threading.Event, timeout: Optional[float]) -> bool:
+        if not event.is_set() and timeout is not None:
+            self.advance(timeout)
+        return event.is_set()
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+
+SYSTEM_CLOCK = SystemClock()
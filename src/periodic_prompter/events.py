@@ -0,0 +1,168 @@
+"""Typed events and the bus that delivers them.
+
+Components that keep something derived from the history or the settings
+(the menu, log sinks, sync, the recent-plans ring, cached reviews, the
+scheduler) subscribe to the events they care about instead of being
+called from wherever the change happens. Plan events come from
+PlanStorage, whatever made the change:
+
+    PlanSaved       a new plan entry is durably stored
+    PlanAmended     a stored entry changed, e.g. its plan was answered
+    HistoryChanged  entries were imported, or another process wrote
+    SettingsChanged settings were saved; carries the keys that changed
+    ScheduleFired   a schedule came due and is about to run
+
+A subscriber to a class also receives its subclasses, so subscribing to
+Event receives everything. Synchronous subscribers run in the publishing
+thread, in subscription order, and must be quick. Queued subscribers run
+one at a time on the bus's own thread, for work that may block (file
+writes, restarts). A failing subscriber is reported and skipped; it
+never stops the others or the publisher.
+"""
+
+import atexit
+import queue
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, Optional, Type
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.models import PlanEntry
+except ImportError:
+    from .models import PlanEntry
+
+
+# Events waiting for queued subscribers before new ones are dropped
+EVENT_QUEUE_SIZE = 1000
+
+_STOP = object()
+
+
+class Event:
+    """Base class of all events."""
+    
+    __slots__ = ()
+    
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class PlanSaved(Event):
+    __slots__ = ('entry',)
+    
+    def __init__(self, entry: PlanEntry):
+        self.entry = entry
+
+
+class PlanAmended(Event):
+    """entry is the stored entry as it is now."""
+    
+    __slots__ = ('entry',)
+    
+    def __init__(self, entry: PlanEntry):
+        self.entry = entry
+
+
+class HistoryChanged(Event):
+    """The history changed other than by this process's saves; re-read what is needed."""
+    
+    __slots__ = ()
+
+
+class SettingsChanged(Event):
+    __slots__ = ('changed',)
+    
+    def __init__(self, changed: Iterable[str]):
+        self.changed = frozenset(changed)
+    
+    def affects(self, keys: Iterable[str]) -> bool:
+        """Whether any of keys changed."""
+        return not self.changed.isdisjoint(keys)
+
+
+class ScheduleFired(Event):
+    __slots__ = ('name', 'kind', 'planned', 'late')
+    
+    def __init__(self, name: str, kind: str, planned: datetime, late: float = 0.0):
+        self.name = name
+        self.kind = kind
+        self.planned = planned
+        self.late = late
+
+
+class EventBus:
+    """Delivers published events to synchronous and queued subscribers."""
+    
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        # Event class -> [(handler, queued)]; replaced, never mutated, so
+        # publish can read it without taking the lock
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.queue = queue.Queue(queue_size)
+        self.thread = None
+        self.dropped = 0
+        self.closed = False
+    
+    def subscribe(self, event_type: Type[Event], handler: Callable, queued: bool = False) -> Callable:
+        """Call handler(event) for every event_type published. Returns handler."""
+        with self._lock:
+            subscribers = dict(self._subscribers)
+            subscribers[event_type] = subscribers.get(event_type, []) + [(handler, queued)]
+            self._subscribers = subscribers
+            if queued and self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='event-bus', daemon=True)
+                self.thread.start()
+                # Deliver what is still queued when the app quits
+                atexit.register(self.close)
+        return handler
+    
+    def unsubscribe(self, event_type: Type[Event], handler: Callable):
+        with self._lock:
+            subscribers = dict(self._subscribers)
+            subscribers[event_type] = [(subscribed, queued) for subscribed, queued
+                                       in subscribers.get(event_type, []) if subscribed != handler]
+            self._subscribers = subscribers
+    
+    def publish(self, event: Event):
+        """Deliver event: synchronous subscribers now, queued ones in the background.
+        
+        Never blocks on queued subscribers; if their queue is full the
+        event is dropped for them and counted.
+        """
+        subscribers = self._subscribers
+        for event_type in type(event).__mro__:
+            for handler, queued in subscribers.get(event_type, ()):
+                if not queued:
+                    _deliver(handler, event)
+                elif not self.closed:
+                    try:
+                        self.queue.put_nowait((handler, event))
+                    except queue.Full:
+                        self.dropped += 1
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            _deliver(*item)
+    
+    def close(self, timeout: Optional[float] = 5):
+        """Deliver queued events, then stop the background thread."""
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join(timeout)
+
+
+def _deliver(handler: Callable, event: Event):
+    try:
+        handler(event)
+    except Exception as e:
+        name = getattr(handler, '__qualname__', repr(handler))
+        print(f"Error handling {type(event).__name__} in {name}: {e}")
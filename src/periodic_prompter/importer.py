@@ -0,0 +1,424 @@
+"""Resumable bulk import of plan history from data directories, plans.json files and CSV logs.
+
+A data directory, or a snapshot with journals beside it, is read as
+storage reads it, snapshot plus journals, so saves made since its last
+compaction are imported too. Other sources are streamed, never loaded
+whole: plans.json files (the legacy plain list or any snapshot schema
+version) are decoded one record at a time with storage's own decoder,
+and CSV logs written by LogWriter are read row by row. Entries are deduplicated on their full timestamp plus
+plan text against both the existing history and everything imported so
+far, and written through PlanStorage.import_plans() in large batches. After every batch the byte
+offset reached in the source is checkpointed, so an interrupted import
+picks up where it stopped.
+"""
+
+import argparse
+import codecs
+import csv
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.models import CompletionStatus, PlanEntry
+    from periodic_prompter.storage import (SNAPSHOT_FILES, PlanStorage, _decode_plan, _parse_snapshot_header,
+                                           _snapshot_record, read_data_dir)
+except ImportError:
+    from .models import CompletionStatus, PlanEntry
+    from .storage import (SNAPSHOT_FILES, PlanStorage, _decode_plan, _parse_snapshot_header,
+                          _snapshot_record, read_data_dir)
+
+
+IMPORT_BATCH_SIZE = 20000
+
+# Bytes read from a JSON source at a time
+READ_CHUNK_SIZE = 1024 * 1024
+
+_SEPARATORS = re.compile(r'[ \t\r\n,]*')
+
+CSV_COLUMNS = ['timestamp', 'plan', 'previous_plan', 'completion_status', 'completed']
+
+JOURNAL_FILES = ('plans.journal', 'plans.journal.1')
+
+# Files of a data directory that hold its history
+DATA_FILES = tuple(name + suffix for name in SNAPSHOT_FILES.values() for suffix in ('', '.bak')) + JOURNAL_FILES
+
+
+def _dedup_key(entry: PlanEntry) -> int:
+    """Compact 64-bit key identifying an entry by timestamp (to the microsecond) and plan text."""
+    digest = hashlib.blake2b(f"{entry.timestamp_us}\0{entry.plan}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _carry_answer(previous: PlanEntry, entry: PlanEntry):
+    """Apply the answer a CSV row gives about the row before it.
+    
+    The CSV log is written as plans are saved, so each row's status is the
+    answer about the previous plan and no row is marked completed yet; the
+    previous entry is updated the way storage updates it on save. Rows of
+    a CSV export already carry their own answers (answered ones are marked
+    completed) and are left alone.
+    """
+    if entry.completion_status is CompletionStatus.NONE or entry.completed or previous.completed:
+        return
+    previous.completion_status = entry.completion_status
+    previous.completed = True
+
+
+def _data_dir(path: Path) -> Optional[Path]:
+    """The data directory to import for path: path itself, or the one holding a snapshot with journals."""
+    if path.is_dir():
+        return path
+    if path.name in SNAPSHOT_FILES.values() and any((path.parent / name).exists() for name in JOURNAL_FILES):
+        return path.parent
+    return None
+
+
+def _unreadable(path: Path, end_offset: int, error: Exception):
+    print(f"Skipping unreadable record in {path} before byte {end_offset}: {error}")
+
+
+def _iter_list_records(f, path: Path, offset: int) -> Iterator[Tuple[Dict, int]]:
+    """Stream records from a legacy plain-list plans.json as (record, end_offset) pairs."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    
+    f.seek(offset)
+    buffer = ''
+    pos = 0
+    byte_offset = offset  # byte offset of buffer[pos]
+    in_array = offset > 0
+    eof = False
+    
+    while True:
+        # Skip separators between records
+        skip = _SEPARATORS.match(buffer, pos).end()
+        byte_offset += skip - pos  # separators are ASCII
+        pos = skip
+        
+        if pos == len(buffer):
+            if eof:
+                return
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = utf8.decode(chunk, final=eof)
+            pos = 0
+            continue
+        
+        if not in_array:
+            if buffer[pos] != '[':
+                raise ValueError(f"{path}: not a plans.json file")
+            byte_offset += 1
+            pos += 1
+            in_array = True
+            continue
+        
+        if buffer[pos] == ']':
+            return
+        
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if eof:
+                raise ValueError(f"{path}: unreadable record at byte {byte_offset}")
+            # Record continues in the next chunk
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+            pos = 0
+            continue
+        
+        byte_offset += len(buffer[pos:end].encode('utf-8'))
+        pos = end
+        yield record, byte_offset
+
+
+def _line_before(f, offset: int, first_line_end: int) -> Optional[bytes]:
+    """The snapshot line ending at offset, or None if that is the header."""
+    if offset <= first_line_end:
+        return None
+    data = b''
+    start = offset
+    while True:
+        start = max(first_line_end, start - READ_CHUNK_SIZE)
+        f.seek(start)
+        data = f.read(offset - start - len(data)) + data
+        newline = data.rfind(b'\n', 0, len(data) - 1)
+        if newline != -1:
+            return data[newline + 1:]
+        if start == first_line_end:
+            return data
+
+
+def iter_json_entries(path: Path, offset: int = 0) -> Iterator[Tuple[Optional[PlanEntry], int]]:
+    """Stream entries from a plans.json file as (entry, end_offset) pairs.
+    
+    Snapshot records are decoded the way storage decodes them: upgraded
+    from the header's schema version, with plan text looked up in the
+    strings table and previous_id resolved against the record before.
+    The legacy plain list is streamed record by record. end_offset is the
+    byte offset just past the record, suitable for resuming; entry is None
+    for a record that could not be decoded. The snapshot checksum is not
+    checked, since a damaged file is still worth importing what it can.
+    """
+    with open(path, 'rb') as f:
+        first_line = f.readline()
+        header = _parse_snapshot_header(first_line)
+        if header is None:
+            for record, end_offset in _iter_list_records(f, path, offset):
+                try:
+                    entry = _decode_plan(record, 1)
+                except (KeyError, TypeError, ValueError) as e:
+                    _unreadable(path, end_offset, e)
+                    entry = None
+                yield entry, end_offset
+            return
+        
+        version = int(header.get('version', 1))
+        strings = header.get('strings') or []
+        offset = max(offset, len(first_line))
+        prior_line = _line_before(f, offset, len(first_line))
+        prior_raw = None
+        if prior_line is not None:
+            try:
+                prior_raw = json.loads(_snapshot_record(prior_line))
+            except (TypeError, ValueError):
+                pass  # the record that follows, if it refers to it, is reported
+        
+        f.seek(offset)
+        end_offset = offset
+        for line in f:
+            end_offset += len(line)
+            line = _snapshot_record(line)
+            if line is None:
+                return
+            before, prior_raw = prior_raw, None
+            try:
+                prior_raw = json.loads(line)
+                entry = _decode_plan(prior_raw, version, strings, lambda: before)
+            except (KeyError, TypeError, ValueError) as e:
+                _unreadable(path, end_offset, e)
+                entry = None
+            yield entry, end_offset
+
+
+def iter_csv_entries(path: Path, offset: int = 0, header=None) -> Iterator[Tuple[Optional[PlanEntry], int]]:
+    """Stream rows from a LogWriter CSV log as (entry, end_offset) pairs.
+    
+    entry is None for a row that could not be read.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        position = [offset]
+        
+        def lines():
+            for raw in iter(f.readline, b''):
+                position[0] += len(raw)
+                yield raw.decode('utf-8')
+        
+        reader = csv.reader(lines())
+        if header is None:
+            header = next(reader, None)
+            if header is None:
+                return
+        for row in reader:
+            if not row:
+                continue
+            record = dict(zip(header, row))
+            record['completed'] = record.get('completed', '').strip().lower() == 'true'
+            try:
+                entry = PlanEntry.from_dict(record)
+            except (KeyError, TypeError, ValueError) as e:
+                _unreadable(path, position[0], e)
+                entry = None
+            yield entry, position[0]
+
+
+class BulkImporter:
+    """Imports many history sources into a PlanStorage, resumably."""
+    
+    def __init__(self, storage: PlanStorage, batch_size: int = IMPORT_BATCH_SIZE,
+                 progress: Optional[Callable[[Dict], None]] = None):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.progress = progress
+        self.checkpoint_file = storage.data_dir / 'import_checkpoint.json'
+        self.checkpoint = self._load_checkpoint()
+        self.seen = None
+    
+    def _load_checkpoint(self) -> Dict:
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'sources': {}}
+        except Exception as e:
+            print(f"Error loading {self.checkpoint_file}, starting over: {e}")
+            return {'sources': {}}
+    
+    def _save_checkpoint(self):
+        self.storage._save_json(self.checkpoint_file, self.checkpoint)
+    
+    def reset(self):
+        """Forget all progress so every source is read from the start."""
+        self.checkpoint = {'sources': {}}
+        self._save_checkpoint()
+    
+    def _load_seen(self):
+        """Index the existing history for deduplication."""
+        self.seen = {_dedup_key(entry) for entry in self.storage.iter_plans()}
+    
+    def _source_state(self, path: Path) -> Dict:
+        """Checkpoint state for a source file or data directory, reset if it has changed."""
+        if path.is_dir():
+            stats = [(path / name).stat() for name in DATA_FILES if (path / name).exists()]
+            size = sum(stat.st_size for stat in stats)
+            mtime = max((stat.st_mtime for stat in stats), default=0)
+        else:
+            stat = path.stat()
+            size, mtime = stat.st_size, stat.st_mtime
+        key = str(path.resolve())
+        state = self.checkpoint['sources'].get(key)
+        if state is None or state.get('size') != size or state.get('mtime') != mtime:
+            state = {'size': size, 'mtime': mtime, 'offset': 0,
+                     'imported': 0, 'skipped': 0, 'done': False, 'header': None}
+            self.checkpoint['sources'][key] = state
+        return state
+    
+    def import_source(self, path) -> Dict:
+        """Import one data directory, plans.json or CSV file, resuming from its checkpoint.
+        
+        A data directory's offset counts entries rather than bytes, since
+        its history is read whole.
+        """
+        path = Path(path)
+        data_dir = _data_dir(path)
+        if data_dir is not None:
+            path = data_dir
+        state = self._source_state(path)
+        if state['done']:
+            return state
+        if self.seen is None:
+            self._load_seen()
+        
+        is_csv = path.suffix.lower() == '.csv'
+        if data_dir is not None:
+            plans = read_data_dir(data_dir)
+            state['total'] = len(plans)
+            entries = ((plan, index + 1) for index, plan in enumerate(plans[state['offset']:], state['offset']))
+        elif is_csv:
+            if state['header'] is None:
+                with open(path, 'rb') as f:
+                    header_line = f.readline()
+                state['header'] = next(csv.reader([header_line.decode('utf-8')]), None) or CSV_COLUMNS
+                # Data rows start right after the header row
+                state['offset'] = len(header_line)
+            entries = iter_csv_entries(path, state['offset'], state['header'])
+        else:
+            entries = iter_json_entries(path, state['offset'])
+        
+        batch = []
+        batch_end = state['offset']
+        # The last entry read is held back until the next row, which may
+        # answer it, has been read; the checkpoint never passes it
+        held = None
+        for entry, end_offset in entries:
+            if entry is None:
+                state['skipped'] += 1
+                continue
+            if held is not None:
+                if is_csv:
+                    _carry_answer(held[0], entry)
+                self._add(state, batch, held[0])
+                batch_end = held[1]
+                if len(batch) >= self.batch_size:
+                    self._commit_batch(path, state, batch, batch_end)
+                    batch = []
+            held = (entry, end_offset)
+        
+        if held is not None:
+            self._add(state, batch, held[0])
+            batch_end = held[1]
+        self._commit_batch(path, state, batch, batch_end)
+        state['done'] = True
+        self._save_checkpoint()
+        return state
+    
+    def _add(self, state: Dict, batch, entry: PlanEntry):
+        """Queue entry for import unless it is already in the history."""
+        key = _dedup_key(entry)
+        if key in self.seen:
+            state['skipped'] += 1
+        else:
+            self.seen.add(key)
+            batch.append(entry)
+    
+    def _commit_batch(self, path: Path, state: Dict, batch, end_offset: int):
+        """Write a batch to storage, then checkpoint the source offset."""
+        if batch:
+            self.storage.import_plans(sorted(batch, key=lambda entry: entry.timestamp_us))
+        state['imported'] += len(batch)
+        state['offset'] = end_offset
+        self._save_checkpoint()
+        
+        if self.progress:
+            self.progress({
+                'source': str(path),
+                'bytes_done': end_offset,
+                'bytes_total': state.get('total', state['size']),
+                'imported': state['imported'],
+                'skipped': state['skipped'],
+            })
+    
+    def import_all(self, paths) -> Dict:
+        """Import several sources in order. Returns totals."""
+        totals = {'imported': 0, 'skipped': 0}
+        for path in paths:
+            state = self.import_source(path)
+            totals['imported'] += state['imported']
+            totals['skipped'] += state['skipped']
+        return totals
+
+
+def _print_progress(info: Dict):
+    total = info['bytes_total'] or 1
+    print(f"{info['source']}: {info['bytes_done'] * 100 // total}% "
+          f"({info['imported']} imported, {info['skipped']} duplicates skipped)")
+
+
+def main(argv=None):
+    """Command line entry point: periodic-prompter-import SOURCE..."""
+    parser = argparse.ArgumentParser(
+        description="Import plan history from data directories, plans.json files and CSV logs."
+    )
+    parser.add_argument('sources', nargs='+', help="Data directories, plans.json or .csv files to import")
+    parser.add_argument('--data-dir', help="Data directory to import into (default: the app's)")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help=f"Entries per storage commit (default: {IMPORT_BATCH_SIZE})")
+    parser.add_argument('--restart', action='store_true',
+                        help="Ignore saved progress and read every source from the start")
+    args = parser.parse_args(argv)
+    
+    storage = PlanStorage(args.data_dir)
+    importer = BulkImporter(storage, batch_size=args.batch_size, progress=_print_progress)
+    if args.restart:
+        importer.reset()
+    
+    try:
+        totals = importer.import_all(args.sources)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.")
+        return 1
+    finally:
+        storage.close()
+    
+    print(f"Done: {totals['imported']} imported, {totals['skipped']} duplicates skipped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Advisory file locking shared between Periodic Prompter processes."""
+
+import fcntl
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class FileLock:
+    """Advisory fcntl lock on a lock file.
+
+    Readers take the lock shared and writers take it exclusive. Every
+    acquisition opens its own file descriptor, so the lock also works
+    between threads of one process (flock locks belong to the open file).
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = Path(lock_path)
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _locked(self, mode):
+        fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    def shared(self):
+        """Context manager holding the lock in shared (reader) mode."""
+        return self._locked(fcntl.LOCK_SH)
+
+    def exclusive(self):
+        """Context manager holding the lock in exclusive (writer) mode."""
+        return self._locked(fcntl.LOCK_EX)
+
+
+class InstanceLock:
+    """Guards against running two copies of the app on the same data."""
+
+    def __init__(self, lock_path):
+        self.lock_path = Path(lock_path)
+        self.fd = None
+
+    def acquire(self) -> bool:
+        """Try to become the running instance. Returns False if one already is."""
+        if self.fd is not None:
+            return True
+
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # Record our pid to make a stuck lock easy to diagnose
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self.fd = fd
+        return True
+
+    def release(self):
+        """Release the instance lock."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -7,16 +7,28 @@ import rumps
 
 # Use absolute imports for packaging compatibility
 try:
+    from periodic_prompter.events import EventBus, HistoryChanged, PlanAmended, PlanSaved
     from periodic_prompter.notifications import NotificationSystem
     from periodic_prompter.settings import Settings
     from periodic_prompter.scheduler import PromptScheduler
     from periodic_prompter.settings_gui import SettingsWindow
+    from periodic_prompter.storage import DEFAULT_DATA_DIR
+    from periodic_prompter.locking import InstanceLock
+    from periodic_prompter.ui_dispatcher import UIDispatcher
+    from periodic_prompter.profiling import start_profiler
+    from periodic_prompter import tracing
 except ImportError:
     # Fallback to relative imports for development
+    from .events import EventBus, HistoryChanged, PlanAmended, PlanSaved
     from .notifications import NotificationSystem
     from .settings import Settings
     from .scheduler import PromptScheduler
     from .settings_gui import SettingsWindow
+    from .storage import DEFAULT_DATA_DIR
+    from .locking import InstanceLock
+    from .ui_dispatcher import UIDispatcher
+    from .profiling import start_profiler
+    from . import tracing
 
 
 class PeriodicPrompterApp(rumps.App):
@@ -24,29 +36,47 @@ class PeriodicPrompterApp(rumps.App):
         super(PeriodicPrompterApp, self).__init__("⏰", title="⏰")
         
         # Initialize components
-        self.settings = Settings()
-        self.notification_system = NotificationSystem(self.settings)
-        self.scheduler = PromptScheduler(self.settings, self.notification_system, self.update_plan_in_menu)
+        self.ui = UIDispatcher()
+        self.events = EventBus()
+        self.settings = Settings(events=self.events)
+        self.notification_system = NotificationSystem(self.settings, self.events)
+        self.scheduler = PromptScheduler(self.settings, self.notification_system, events=self.events)
         self.settings_window = None
         
-        # Set up menu
+        # Off unless PERIODIC_PROMPTER_PROFILE or the profiling setting is set
+        self.profiler = start_profiler(self.settings, self.notification_system.storage.data_dir)
+        if self.profiler:
+            self.profiler.instrument_app(self.scheduler, self.notification_system)
+        tracing.enable_from(self.settings)
+        self.trace_dir = self.notification_system.storage.data_dir / 'traces'
+        
+        # Set up menu; it follows saves from any thread through the event bus
         self.setup_menu()
         self.update_menu_title()
+        self.events.subscribe(PlanSaved, lambda event: self.update_plan_in_menu())
+        self.events.subscribe(PlanAmended, lambda event: self.ui.request('recent', self.update_recent_menu))
+        # Queued after the notification system has re-read the recent plans
+        self.events.subscribe(HistoryChanged, lambda event: self.update_plan_in_menu(), queued=True)
         
         # Start scheduler
         self.scheduler.start()
     
     def setup_menu(self):
         """Set up the static menu structure (only called once)."""
+        self.recent_menu = rumps.MenuItem("Recent Plans")
         self.menu = [
             "Current Plan",
             "Prompt Now", 
+            self.recent_menu,
             None,  # Separator
             "Schedule Info", 
             "Toggle Scheduler",
             None,  # Separator
             "Settings",
         ]
+        if tracing.enabled():
+            self.menu.add(rumps.MenuItem("Export Trace", callback=self.export_trace))
+        self.update_recent_menu()
     
     def update_menu_title(self):
         """Update only the menu bar title with current plan text."""
@@ -59,9 +89,27 @@ class PeriodicPrompterApp(rumps.App):
         else:
             self.title = "⏰"
     
+    def update_recent_menu(self):
+        """Rebuild the Recent Plans submenu from the in-memory ring (no disk access)."""
+        for key in list(self.recent_menu.keys()):
+            del self.recent_menu[key]
+        
+        items = self.notification_system.recent.menu_items()
+        if not items:
+            self.recent_menu.add(rumps.MenuItem("No plans yet"))
+        for entry, title in items:
+            self.recent_menu.add(rumps.MenuItem(title, callback=self._show_plan(entry)))
+    
+    def _show_plan(self, entry):
+        """Menu callback showing the full text of a recent plan."""
+        def show(_):
+            self.notification_system.show_notification(entry.datetime.strftime('%A %H:%M'), entry.plan)
+        return show
+    
     def update_plan_in_menu(self):
-        """Update the menu with current plan text."""
-        self.update_menu_title()
+        """Update the menu with current plan text (safe from any thread)."""
+        self.ui.request('title', self.update_menu_title)
+        self.ui.request('recent', self.update_recent_menu)
     
     @rumps.clicked("Current Plan") 
     def show_current_plan(self, _):
@@ -84,10 +132,6 @@ class PeriodicPrompterApp(rumps.App):
                 result = self.notification_system.prompt_user_plan(previous)
                 print(f"Prompt result: {result}")  # Debug
                 
-                # Update menu with new plan
-                if result.get('plan'):
-                    self.update_plan_in_menu()
-                    
             except Exception as e:
                 print(f"Error in prompt: {e}")  # Debug
                 import traceback
@@ -119,6 +163,15 @@ class PeriodicPrompterApp(rumps.App):
         # Run in separate thread to avoid blocking UI
         threading.Thread(target=show_settings, daemon=True).start()
         
+    def export_trace(self, _):
+        """Write the recorded timeline to the traces folder."""
+        def run_export():
+            path = tracing.export(self.trace_dir)
+            if path:
+                self.notification_system.show_notification("Trace exported", str(path))
+        
+        threading.Thread(target=run_export, daemon=True).start()
+    
     @rumps.clicked("Schedule Info")
     def show_schedule_info(self, _):
         """Show information about the current schedule."""
@@ -141,6 +194,11 @@ class PeriodicPrompterApp(rumps.App):
         """Clean up resources before quitting."""
         print("Cleaning up before quit...")
         self.scheduler.stop()
+        if self.profiler:
+            self.profiler.stop()
+        self.events.close()
+        if tracing.export(self.trace_dir):
+            print(f"Trace written to {self.trace_dir}")
 
 
 def main():
@@ -149,6 +207,12 @@ def main():
         print("This application is designed for macOS only.")
         sys.exit(1)
         
+    # Only one app instance may write the data directory
+    instance_lock = InstanceLock(DEFAULT_DATA_DIR / 'app.lock')
+    if not instance_lock.acquire():
+        print("Periodic Prompter is already running.")
+        sys.exit(0)
+    
     app = PeriodicPrompterApp()
     app.run()
 
@@ -0,0 +1,175 @@
+"""Data model for recorded plans."""
+
+import math
+import sys
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Optional
+
+
+class CompletionStatus(Enum):
+    """How the user said a plan went."""
+
+    NONE = ''
+    YES = 'yes'
+    NO = 'no'
+    PARTIALLY = 'partially'
+
+    @classmethod
+    def parse(cls, value) -> 'CompletionStatus':
+        """Convert a stored or user-entered status to a CompletionStatus."""
+        if isinstance(value, cls):
+            return value
+        status = _STATUS_VALUES.get(value)
+        if status is not None:
+            return status
+        try:
+            return cls((value or '').strip().lower())
+        except ValueError:
+            print(f"Unknown completion status {value!r}, treating as unset")
+            return cls.NONE
+
+
+# Statuses by stored value, for the common case in parse()
+_STATUS_VALUES = {status.value: status for status in CompletionStatus}
+
+# Microseconds per second
+MICROS = 1000000
+
+
+def _to_epoch_us(timestamp) -> int:
+    """Convert an ISO timestamp string, datetime or epoch seconds to epoch microseconds."""
+    if isinstance(timestamp, int):
+        return timestamp * MICROS
+    if isinstance(timestamp, float):
+        return round(timestamp * MICROS)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    # Only the whole seconds are taken from the float, so it cannot round the
+    # microseconds; they are at least a float step away from the next second
+    return math.floor(timestamp.timestamp()) * MICROS + timestamp.microsecond
+
+
+class PlanEntry:
+    """One recorded plan.
+
+    Entries are compact: fixed slots instead of a per-entry dict, an epoch
+    integer timestamp, an enum for the completion status and interned plan
+    text, so the previous_plan of an entry shares its string with the plan
+    of the entry before it.
+
+    The time is kept to the microsecond as timestamp_us, so entries
+    round-trip through every stored format unchanged; an integer timestamp
+    given to the constructor is epoch seconds, and timestamp_us (if given)
+    takes precedence over it. id is a stable integer assigned by storage
+    when the entry is saved (0 until then).
+    """
+
+    __slots__ = ('id', 'timestamp_us', 'plan', 'previous_plan', 'completion_status', 'completed')
+
+    def __init__(self, timestamp, plan: str, previous_plan: str = '',
+                 completion_status=CompletionStatus.NONE, completed: bool = False,
+                 entry_id: int = 0, timestamp_us: Optional[int] = None):
+        self.id = entry_id
+        self.timestamp_us = _to_epoch_us(timestamp) if timestamp_us is None else timestamp_us
+        self.plan = sys.intern(plan or '')
+        self.previous_plan = sys.intern(previous_plan or '')
+        self.completion_status = CompletionStatus.parse(completion_status)
+        self.completed = bool(completed)
+
+    @property
+    def timestamp(self) -> int:
+        """Epoch seconds the plan was recorded at."""
+        return self.timestamp_us // MICROS
+
+    @property
+    def datetime(self) -> datetime:
+        """Local time the plan was recorded."""
+        seconds, micros = divmod(self.timestamp_us, MICROS)
+        return datetime.fromtimestamp(seconds).replace(microsecond=micros)
+
+    @property
+    def timestamp_iso(self) -> str:
+        """Timestamp in the ISO format used by the JSON files and logs."""
+        return self.datetime.isoformat()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PlanEntry':
+        """Build an entry from the stored JSON/dict shape."""
+        return cls(
+            timestamp=data['timestamp'],
+            plan=data.get('plan', ''),
+            previous_plan=data.get('previous_plan', ''),
+            completion_status=data.get('completion_status', ''),
+            completed=data.get('completed', False),
+            entry_id=data.get('id', 0)
+        )
+
+    def to_dict(self) -> Dict:
+        """Convert to the stored JSON/dict shape."""
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp_iso,
+            'plan': self.plan,
+            'previous_plan': self.previous_plan,
+            'completion_status': self.completion_status.value,
+            'completed': self.completed
+        }
+
+    def copy(self) -> 'PlanEntry':
+        """Return an independent copy of this entry."""
+        return PlanEntry(None, self.plan, self.previous_plan,
+                         self.completion_status, self.completed, self.id, self.timestamp_us)
+
+    def __eq__(self, other):
+        if not isinstance(other, PlanEntry):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return (f"PlanEntry({self.timestamp_iso!r}, {self.plan!r}, "
+                f"status={self.completion_status.value!r}, completed={self.completed})")
+
+
+class EntryNormalizer:
+    """Normalizes entries for a snapshot, written in order.
+
+    An entry whose previous_plan is the plan of the entry just before it
+    refers to that entry's id instead of repeating the text. A plan text
+    seen a second time gets a slot in the strings table and is referred
+    to by index from then on. First sightings are remembered for at most
+    SEEN_LIMIT texts at a time, so memory stays bounded on huge histories.
+    """
+
+    SEEN_LIMIT = 10000
+
+    def __init__(self):
+        self.strings = []
+        self._slots = {}
+        self._seen = set()
+        self._prior = None
+
+    def text(self, value: str):
+        """value itself, or its index in the strings table if it repeats."""
+        if not value:
+            return ''
+        slot = self._slots.get(value)
+        if slot is not None:
+            return slot
+        if value in self._seen:
+            self._seen.discard(value)
+            slot = self._slots[value] = len(self.strings)
+            self.strings.append(value)
+            return slot
+        if len(self._seen) >= self.SEEN_LIMIT:
+            self._seen.clear()
+        self._seen.add(value)
+        return value
+
+    def previous_id(self, entry: PlanEntry):
+        """Id of the entry before this one if it holds entry's previous plan, else None."""
+        prior = self._prior
+        self._prior = entry
+        if entry.previous_plan and prior is not None and prior.plan == entry.previous_plan:
+            return prior.id
+        return None
@@ -8,24 +8,100 @@ import time
 
 # Use absolute imports for packaging compatibility
 try:
-    from periodic_prompter.storage import PlanStorage, LogWriter
+    from periodic_prompter import tracing
+    from periodic_prompter.events import (EventBus, HistoryChanged, PlanAmended, PlanSaved, ScheduleFired,
+                                          SettingsChanged)
+    from periodic_prompter.recent import DEFAULT_COUNT, RecentPlans
+    from periodic_prompter.reports import ReportGenerator
+    from periodic_prompter.sinks import SinkPipeline, build_sinks
+    from periodic_prompter.storage import PlanStorage
+    from periodic_prompter.sync import create_sync_client
 except ImportError:
-    from .storage import PlanStorage, LogWriter
+    from . import tracing
+    from .events import EventBus, HistoryChanged, PlanAmended, PlanSaved, ScheduleFired, SettingsChanged
+    from .recent import DEFAULT_COUNT, RecentPlans
+    from .reports import ReportGenerator
+    from .sinks import SinkPipeline, build_sinks
+    from .storage import PlanStorage
+    from .sync import create_sync_client
+
+
+# Settings the log sinks are built from
+SINK_SETTINGS = ('create_log', 'create_csv_log', 'log_file_path', 'sinks')
 
 
 class NotificationSystem:
-    def __init__(self, settings=None):
+    def __init__(self, settings=None, events=None):
         self.settings = settings
-        self.storage = PlanStorage()
-        self.log_writer = None
+        self.events = events if events is not None else EventBus()
+        budget_mb = settings.get('memory_budget_mb', 0) if settings else 0
+        # Storage publishes every change to the history on the bus
+        self.storage = PlanStorage(storage_format=settings.get('storage_format') if settings else None,
+                                   memory_budget=int(budget_mb * 1024 * 1024) or None, events=self.events)
+        self.sinks = None
+        self._sinks_lock = threading.Lock()
         
         # Load current plan from storage
         self.current_plan = self.storage.get_current_plan()
         
-        # Initialize log writer if logging is enabled
-        if settings and settings.get('create_log', True):
-            log_path = settings.get('log_file_path', '~/periodic_prompter_log.txt')
-            self.log_writer = LogWriter(log_path)
+        # The last few plans for the menu, read once here and kept up to date on save
+        self.recent = RecentPlans(settings.get('recent_plans', DEFAULT_COUNT) if settings else DEFAULT_COUNT)
+        self.recent.prime(self.storage)
+        
+        # Weekly and monthly reviews; closed periods are cached in the data dir
+        self.reports = ReportGenerator(self.storage)
+        
+        # Start the log sinks configured in settings
+        self.configure_sinks()
+        
+        # Start syncing to the team endpoint if enabled
+        self.sync = create_sync_client(settings, self.storage)
+    
+        # Everything derived from the history follows it through events;
+        # the cheap, non-blocking updates run inline, file writes queued
+        self.events.subscribe(PlanSaved, self._plan_saved)
+        self.events.subscribe(PlanSaved, lambda event: self.recent.push(event.entry))
+        self.events.subscribe(PlanAmended, lambda event: self.recent.amend(event.entry))
+        self.events.subscribe(HistoryChanged, self._history_changed, queued=True)
+        self.events.subscribe(PlanSaved, self._publish_to_sinks)
+        if self.sync:
+            self.events.subscribe(PlanSaved, lambda event: self.sync.notify())
+            self.events.subscribe(HistoryChanged, lambda event: self.sync.notify())
+        self.events.subscribe(PlanSaved, lambda event: self.reports.refresh(), queued=True)
+        self.events.subscribe(PlanAmended, lambda event: self.reports.refresh(day=event.entry.datetime.date()),
+                              queued=True)
+        self.events.subscribe(HistoryChanged, lambda event: self.reports.refresh(), queued=True)
+        self.events.subscribe(ScheduleFired, self._schedule_fired, queued=True)
+        self.events.subscribe(SettingsChanged, self._settings_changed, queued=True)
+    
+    def configure_sinks(self):
+        """(Re)build the log sink pipeline from the current settings."""
+        sinks = SinkPipeline(build_sinks(self.settings))
+        with self._sinks_lock:
+            old, self.sinks = self.sinks, sinks
+        if old:
+            # Nothing publishes to the old sinks any more; let them finish what they have queued
+            old.close()
+    
+    def _publish_to_sinks(self, event: PlanSaved):
+        # Held across publish so a swap never leaves an entry on closed sinks
+        with self._sinks_lock:
+            self.sinks.publish(event.entry)
+    
+    def _plan_saved(self, event: PlanSaved):
+        self.current_plan = event.entry.plan
+    
+    def _history_changed(self, event: HistoryChanged):
+        self.current_plan = self.storage.get_current_plan()
+        self.recent.prime(self.storage)
+    
+    def _schedule_fired(self, event: ScheduleFired):
+        if event.kind == 'report':
+            self.publish_weekly_report()
+    
+    def _settings_changed(self, event: SettingsChanged):
+        if event.affects(SINK_SETTINGS):
+            self.configure_sinks()
         
     def show_notification(self, title, message, timeout=10):
         """Show a macOS notification."""
@@ -35,7 +111,8 @@ class NotificationSystem:
             script = f'''
             display notification "{message}" with title "{title}" subtitle "Periodic Prompter"
             '''
-            subprocess.run(['osascript', '-e', script], check=True)
+            with tracing.span('osascript', 'notifications', kind='notification'):
+                subprocess.run(['osascript', '-e', script], check=True)
         except Exception as e:
             try:
                 # Fallback to plyer if available
@@ -69,8 +146,9 @@ class NotificationSystem:
                 '''
             
             # Execute the AppleScript
-            result = subprocess.run(['osascript', '-e', script], 
-                                  capture_output=True, text=True, check=True)
+            with tracing.span('osascript', 'notifications', kind='dialog'):
+                result = subprocess.run(['osascript', '-e', script], 
+                                      capture_output=True, text=True, check=True)
             
             if result.stdout.strip():
                 parts = result.stdout.strip().split('|', 1)
@@ -88,13 +166,20 @@ class NotificationSystem:
             # Fallback to simple text input
             try:
                 script = f'text returned of (display dialog "{prompt}" default answer "")'
-                result = subprocess.run(['osascript', '-e', script], 
-                                      capture_output=True, text=True, check=True)
+                with tracing.span('osascript', 'notifications', kind='fallback dialog'):
+                    result = subprocess.run(['osascript', '-e', script], 
+                                          capture_output=True, text=True, check=True)
                 plan = result.stdout.strip()
                 return {'plan': plan, 'completion': 'yes'}
             except:
                 return {'plan': '', 'completion': 'yes'}
     
+    def publish_weekly_report(self):
+        """Write this week's review and tell the user where it is."""
+        paths = self.reports.refresh(('week',))
+        if paths:
+            self.show_notification("Weekly Review", f"Your week in review: {paths[0]}")
+    
     def prompt_user_plan(self, previous_plan=""):
         """Show notification and prompt user for their plan."""
         # First show notification
@@ -115,22 +200,13 @@ class NotificationSystem:
         result = self.show_input_dialog(title, prompt, previous_plan)
         
         if result['plan']:
-            # Save to storage
-            plan_entry = self.storage.save_plan(
+            # Save to storage; it publishes PlanSaved, which updates the current plan
+            self.storage.save_plan(
                 plan=result['plan'],
                 completion_status=result.get('completion', ''),
                 previous_plan=previous_plan
             )
             
-            # Update current plan
-            self.current_plan = result['plan']
-            
-            # Write to log if logging is enabled
-            if self.log_writer:
-                self.log_writer.write_plan_log(plan_entry)
-                if self.settings and self.settings.get('create_csv_log', False):
-                    self.log_writer.write_csv_log(plan_entry)
-            
             # Show confirmation
             self.show_notification("Plan Recorded", f"Your plan: {result['plan'][:50]}...")
             
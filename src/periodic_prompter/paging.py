@@ -0,0 +1,173 @@
+"""Bounded-memory paging over a memory-mapped snapshot.
+
+In paging mode PlanStorage wraps its snapshot view in a PagedView. Records
+are decoded a page (a run of consecutive records) at a time into a small
+LRU cache, and the mapped file bytes behind a page are handed back to the
+OS as soon as it has been decoded. Pages beyond the memory budget are
+evicted least recently used first and decoded again from disk if touched,
+so the resident set is the budget plus a sparse offset table however long
+the history grows.
+"""
+
+import mmap
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.models import PlanEntry
+except ImportError:
+    from .models import PlanEntry
+
+
+# Records per page; also the stride of the sparse offset table in paging mode
+PAGE_RECORDS = 256
+
+# Bookkeeping per cached page (list, LRU slot) on top of its entries
+PAGE_OVERHEAD = 200
+
+
+def release_pages(mm: mmap.mmap, begin: int, end: int):
+    """Tell the OS the mapped bytes [begin, end) will not be needed soon.
+    
+    The pages are dropped from the resident set and read back from the file
+    if touched again. Does nothing where madvise is unavailable.
+    """
+    if end <= begin or not hasattr(mmap, 'MADV_DONTNEED'):
+        return
+    begin -= begin % mmap.PAGESIZE
+    try:
+        mm.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+    except (OSError, ValueError):
+        pass
+
+
+def _entry_size(entry: PlanEntry) -> int:
+    """Approximate bytes held by a decoded entry."""
+    return sys.getsizeof(entry) + sys.getsizeof(entry.timestamp_us) + \
+        sys.getsizeof(entry.plan) + sys.getsizeof(entry.previous_plan)
+
+
+class PagingStats:
+    """Cache counters, kept across snapshot views so they cover the app's lifetime."""
+    
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+        self.resident_pages = 0
+    
+    def to_dict(self) -> Dict:
+        lookups = self.hits + self.loads
+        return {
+            'budget': self.budget,
+            'resident_bytes': self.resident_bytes,
+            'resident_pages': self.resident_pages,
+            'hits': self.hits,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / lookups) * 100 if lookups else 0.0,
+        }
+
+
+class PagedView:
+    """LRU of decoded record pages over a SnapshotIndex or BinarySnapshot.
+    
+    Offers the same interface as the view it wraps. Entries handed out are
+    copies, so callers may modify them without touching the cache.
+    """
+    
+    def __init__(self, view, stats: PagingStats, page_records: int = PAGE_RECORDS):
+        self.view = view
+        self.key = view.key
+        self.seq = view.seq
+        self.stats = stats
+        self.page_records = page_records
+        self.pages = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.view)
+    
+    @property
+    def max_id(self) -> int:
+        return self.view.max_id
+    
+    def drop(self):
+        """Forget all cached pages (the view is being replaced)."""
+        with self._lock:
+            for entries, cost in self.pages.values():
+                self.stats.resident_bytes -= cost
+            self.stats.resident_pages -= len(self.pages)
+            self.pages.clear()
+    
+    def _page(self, number: int) -> List[PlanEntry]:
+        """Decoded entries of page number, loading it from disk if needed."""
+        with self._lock:
+            page = self.pages.get(number)
+            if page is not None:
+                self.pages.move_to_end(number)
+                self.stats.hits += 1
+                return page[0]
+            
+            start = number * self.page_records
+            stop = min(start + self.page_records, len(self.view))
+            entries = list(self.view.records(start, stop))
+            self.view.release(start, stop)
+            
+            cost = PAGE_OVERHEAD + sum(_entry_size(entry) for entry in entries)
+            self.pages[number] = (entries, cost)
+            self.stats.loads += 1
+            self.stats.resident_bytes += cost
+            self.stats.resident_pages += 1
+            
+            # The page just loaded always stays, even if it alone exceeds the budget
+            while self.stats.resident_bytes > self.stats.budget and len(self.pages) > 1:
+                _, (_, evicted_cost) = self.pages.popitem(last=False)
+                self.stats.evictions += 1
+                self.stats.resident_bytes -= evicted_cost
+                self.stats.resident_pages -= 1
+            return entries
+    
+    def record(self, index: int) -> PlanEntry:
+        """Entry number index."""
+        return self._page(index // self.page_records)[index % self.page_records].copy()
+    
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[PlanEntry]:
+        """Entries [start, stop), a page at a time."""
+        if stop is None:
+            stop = len(self)
+        index = start
+        while index < stop:
+            number, offset = divmod(index, self.page_records)
+            entries = self._page(number)
+            for entry in entries[offset:offset + stop - index]:
+                yield entry.copy()
+            index += len(entries) - offset
+    
+    def bisect_time(self, epoch: int) -> int:
+        """Index of the first record at or after epoch, decoding at most one page."""
+        if getattr(self.view, 'timestamps', None) is not None:
+            # The binary index answers without decoding anything
+            return self.view.bisect_time(epoch)
+        
+        # Find the page by its first record, read straight from the view
+        low, high = 0, -(-len(self) // self.page_records)
+        while low < high:
+            mid = (low + high) // 2
+            if self.view.record(mid * self.page_records).timestamp < epoch:
+                low = mid + 1
+            else:
+                high = mid
+        if low == 0:
+            return 0
+        number = low - 1
+        entries = self._page(number)
+        for offset, entry in enumerate(entries):
+            if entry.timestamp >= epoch:
+                return number * self.page_records + offset
+        return number * self.page_records + len(entries)
@@ -0,0 +1,204 @@
+"""Opt-in profiling of the scheduler, the prompt pipeline and storage.
+
+Turned on by the PERIODIC_PROMPTER_PROFILE environment variable (its value
+is the sample rate, e.g. "0.25"; "1" profiles every call) or by the
+"profiling" setting. When it is off nothing is wrapped or started, so it
+costs nothing.
+
+When on, the instrumented methods are wrapped on the live objects. A
+sampled call runs under cProfile. Only one call in the process is
+profiled at a time, since cProfile cannot run two profilers at once; a
+call made meanwhile runs unprofiled (if it is on the same thread, it is
+included in the profile that is running). Profiles are
+merged per method and, every dump interval, written as
+<method>-<time>.pstats into a "profiles" folder in the data directory,
+alongside a tracemalloc diff of what was allocated since the last dump.
+Only the newest files of each kind are kept.
+
+Read a profile with: python -m pstats ~/.local/share/periodic_prompter/profiles/<file>.pstats
+"""
+
+import cProfile
+import functools
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+ENV_VAR = 'PERIODIC_PROMPTER_PROFILE'
+
+DEFAULT_SAMPLE_RATE = 0.25
+
+# Seconds between dumps of profiles and allocation diffs
+DUMP_INTERVAL = 15 * 60
+
+# Files kept per method (and of allocation diffs)
+KEEP_FILES = 24
+
+# Frames recorded per allocation, and lines written per diff
+TRACEMALLOC_FRAMES = 10
+ALLOCATION_LINES = 40
+
+SCHEDULER_METHODS = ('run_due', 'prompt_callback')
+NOTIFICATION_METHODS = ('prompt_user_plan',)
+STORAGE_METHODS = ('get_current_plan', 'get_last_plan', 'get_plans_history',
+                   'get_plans_for_date', 'get_stats', 'get_summaries')
+
+# Held while a call is being profiled, by whichever Profiler and thread
+_profiling = threading.Lock()
+
+
+def sample_rate_from(settings=None) -> Optional[float]:
+    """Sample rate if profiling is enabled by the environment or settings, else None."""
+    value = os.environ.get(ENV_VAR, '').strip()
+    if value:
+        try:
+            rate = float(value)
+        except ValueError:
+            rate = DEFAULT_SAMPLE_RATE
+        return min(rate, 1.0) if rate > 0 else None
+    if settings is not None and settings.get('profiling', False):
+        return settings.get('profile_sample_rate', DEFAULT_SAMPLE_RATE)
+    return None
+
+
+class Profiler:
+    """Samples instrumented calls with cProfile and periodically dumps results."""
+    
+    def __init__(self, output_dir, sample_rate: float = DEFAULT_SAMPLE_RATE,
+                 dump_interval: float = DUMP_INTERVAL, keep: int = KEEP_FILES):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.dump_interval = dump_interval
+        self.keep = keep
+        self.stats = {}
+        self.calls = {}
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_snapshot = None
+    
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._last_snapshot = tracemalloc.take_snapshot()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        print(f"Profiling {self.sample_rate:.0%} of calls into {self.output_dir}")
+    
+    def stop(self):
+        """Write what has been collected and stop."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        tracemalloc.stop()
+    
+    # Instrumentation
+    
+    def wrap(self, name: str, func):
+        """func wrapped so a sample of its calls is profiled under name."""
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            with self._lock:
+                self.calls[name] = self.calls.get(name, 0) + 1
+            if random.random() >= self.sample_rate or not _profiling.acquire(blocking=False):
+                return func(*args, **kwargs)
+            
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                _profiling.release()
+                self._add(name, profile)
+        return profiled
+    
+    def instrument(self, obj, names, prefix: str):
+        """Replace methods of obj with profiled wrappers, as prefix.method."""
+        for name in names:
+            setattr(obj, name, self.wrap(f"{prefix}.{name}", getattr(obj, name)))
+    
+    def instrument_app(self, scheduler, notification_system):
+        """Instrument the scheduler, prompt pipeline and storage of the app."""
+        self.instrument(scheduler, SCHEDULER_METHODS, 'scheduler')
+        self.instrument(notification_system, NOTIFICATION_METHODS, 'notifications')
+        storage = notification_system.storage
+        self.instrument(storage, STORAGE_METHODS, 'storage')
+        # Saves are committed on the writer thread
+        storage.writer.commit_fn = self.wrap('storage.commit', storage.writer.commit_fn)
+    
+    def _add(self, name: str, profile: cProfile.Profile):
+        with self._lock:
+            self.samples[name] = self.samples.get(name, 0) + 1
+            if name in self.stats:
+                self.stats[name].add(profile)
+            else:
+                self.stats[name] = pstats.Stats(profile)
+    
+    # Output
+    
+    def _run(self):
+        while not self._stop.wait(self.dump_interval):
+            self.dump()
+        self.dump()
+    
+    def dump(self):
+        """Write merged profiles and an allocation diff, then rotate old files."""
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        with self._lock:
+            stats, self.stats = self.stats, {}
+        
+        try:
+            for name, collected in stats.items():
+                collected.dump_stats(str(self.output_dir / f"{name}-{stamp}.pstats"))
+                self._rotate(f"{name}-")
+            self._dump_allocations(stamp)
+            self._rotate('allocations-')
+        except Exception as e:
+            print(f"Error writing profiles: {e}")
+    
+    def _dump_allocations(self, stamp: str):
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            # Leave out the profiler's own allocations
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1024:.0f} KB (peak {peak / 1024:.0f} KB)",
+                 f"Sampled calls: {self._sample_summary()}", "",
+                 "Top allocation changes since the previous dump:"]
+        for diff in snapshot.compare_to(self._last_snapshot, 'lineno')[:ALLOCATION_LINES]:
+            lines.append(str(diff))
+        self._last_snapshot = snapshot
+        with open(self.output_dir / f"allocations-{stamp}.txt", 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+    
+    def _sample_summary(self) -> str:
+        with self._lock:
+            return ', '.join(f"{name} {self.samples.get(name, 0)}/{calls}"
+                             for name, calls in sorted(self.calls.items())) or 'none'
+    
+    def _rotate(self, prefix: str):
+        """Delete all but the newest keep files starting with prefix."""
+        files = sorted(path for path in self.output_dir.iterdir() if path.name.startswith(prefix))
+        for path in files[:-self.keep]:
+            path.unlink()
+
+
+def start_profiler(settings, data_dir) -> Optional[Profiler]:
+    """A started Profiler if profiling is enabled, else None."""
+    sample_rate = sample_rate_from(settings)
+    if sample_rate is None:
+        return None
+    profiler = Profiler(Path(data_dir) / 'profiles', sample_rate)
+    profiler.start()
+    return profiler
@@ -0,0 +1,88 @@
+"""The last few plans, kept in memory for the Recent Plans menu.
+
+RecentPlans is a fixed-size ring primed once from the end of the history
+and kept current from PlanSaved and PlanAmended events, so the menu can be
+redrawn without reading storage. Entries that fall off the end are simply
+forgotten.
+"""
+
+import threading
+from collections import deque
+from typing import List, Tuple
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.models import CompletionStatus, PlanEntry
+except ImportError:
+    from .models import CompletionStatus, PlanEntry
+
+
+# Entries shown by default
+DEFAULT_COUNT = 10
+
+# Marker per answer; a plan that has not been followed up yet is still open
+MARKERS = {
+    CompletionStatus.YES: '✓',
+    CompletionStatus.PARTIALLY: '◐',
+    CompletionStatus.NO: '✗',
+}
+OPEN_MARKER = '…'
+UNANSWERED_MARKER = '·'
+
+# Plan text longer than this is truncated in the menu
+MENU_TEXT_LENGTH = 60
+
+
+class RecentPlans:
+    """Ring buffer of the most recent plan entries, oldest first."""
+    
+    def __init__(self, count: int = DEFAULT_COUNT):
+        self.entries = deque(maxlen=count)
+        self._lock = threading.Lock()
+    
+    def prime(self, storage):
+        """Fill the ring from the end of the stored history (once, at startup)."""
+        try:
+            entries = storage.get_plans_history(self.entries.maxlen)
+        except Exception as e:
+            print(f"Error reading recent plans: {e}")
+            return
+        with self._lock:
+            self.entries.clear()
+            self.entries.extend(entries)
+    
+    def push(self, entry: PlanEntry):
+        """Add a newly saved entry."""
+        with self._lock:
+            self.entries.append(entry.copy())
+    
+    def amend(self, entry: PlanEntry):
+        """Replace the entry with entry's id, if it is still in the ring."""
+        with self._lock:
+            for index, held in enumerate(self.entries):
+                if held.id == entry.id:
+                    self.entries[index] = entry.copy()
+                    return
+    
+    def latest(self) -> List[PlanEntry]:
+        """The entries, newest first."""
+        with self._lock:
+            return list(reversed(self.entries))
+    
+    def menu_items(self) -> List[Tuple[PlanEntry, str]]:
+        """(entry, menu line) per entry, newest first; the line shows marker, time and plan."""
+        return [(entry, menu_title(entry, index == 0)) for index, entry in enumerate(self.latest())]
+
+
+def marker(entry: PlanEntry, latest: bool = False) -> str:
+    """How the plan went: answered, still open (the latest), or not answered."""
+    if entry.completed:
+        return MARKERS.get(entry.completion_status, UNANSWERED_MARKER)
+    return OPEN_MARKER if latest else UNANSWERED_MARKER
+
+
+def menu_title(entry: PlanEntry, latest: bool = False) -> str:
+    plan = entry.plan
+    if len(plan) > MENU_TEXT_LENGTH:
+        plan = plan[:MENU_TEXT_LENGTH] + "..."
+    return f"{marker(entry, latest)} {entry.datetime.strftime('%a %H:%M')}  {plan}"
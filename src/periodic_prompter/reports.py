@@ -0,0 +1,288 @@
+"""Weekly and monthly reviews of the plan history, rendered as Markdown.
+
+A review covers one ISO week or calendar month: plans made against plans
+completed, the plans that came up most often and completion by day. It
+is rendered from that period's slice of the history and written to a
+"reports" folder in the data directory as week-<label>.md or
+month-<label>.md.
+
+Rendered reviews are cached per period under a fingerprint of the
+period's daily rollups, which change whenever a plan in the period is
+saved, answered or imported. A closed period whose fingerprint still
+matches is served from its file without reading the history, so after
+the first run a year of weekly reviews costs one rollups read. Only the
+open period is rendered again after a save, and a closed one when an
+entry in it is amended.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, time as dt_time
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.models import CompletionStatus, PlanEntry
+    from periodic_prompter.rollups import period_key
+    from periodic_prompter.storage import PlanStorage, _atomic_write
+except ImportError:
+    from .models import CompletionStatus, PlanEntry
+    from .rollups import period_key
+    from .storage import PlanStorage, _atomic_write
+
+
+# Bump when the rendered layout changes, so cached reviews are rendered again
+REPORT_VERSION = 1
+
+PERIODS = ('week', 'month')
+
+# Recurring plans listed per review
+TOP_PLANS = 5
+
+STATUS_FIELDS = {
+    CompletionStatus.YES: 'completed',
+    CompletionStatus.PARTIALLY: 'partial',
+    CompletionStatus.NO: 'no',
+}
+
+
+def period_bounds(key: str, period: str) -> Tuple[date, date]:
+    """First day of the period labelled key (as rollups.period_key) and the day after it."""
+    if period == 'week':
+        year, week = key.split('-W')
+        start = date.fromisocalendar(int(year), int(week), 1)
+        return start, start + timedelta(days=7)
+    if period == 'month':
+        year, month = map(int, key.split('-'))
+        return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def _empty_counts() -> Dict:
+    return {'plans': 0, 'completed': 0, 'partial': 0, 'no': 0}
+
+
+def _rate(counts: Dict) -> str:
+    answered = counts['completed'] + counts['partial'] + counts['no']
+    return f"{counts['completed'] / answered * 100:.0f}%" if answered else "-"
+
+
+def _cell(text: str) -> str:
+    """Plan text made safe for a Markdown table cell."""
+    return text.replace('|', '\\|').replace('\n', ' ')
+
+
+def summarize(entries: Iterable[PlanEntry]) -> Dict:
+    """Totals, per-day counts and recurring plans of a period's entries.
+    
+    Entries carry their own final answer once the next plan is saved, as
+    in the daily rollups; the latest plan is not answered yet.
+    """
+    totals = _empty_counts()
+    days = {}
+    plans = {}
+    for entry in entries:
+        day = entry.datetime.date()
+        counts = days.get(day)
+        if counts is None:
+            counts = days[day] = _empty_counts()
+        # Plans differing only in case or surrounding spaces are the same plan
+        text = entry.plan.strip()
+        recurring = plans.get(text.lower())
+        if recurring is None:
+            recurring = plans[text.lower()] = dict(_empty_counts(), text=text)
+        
+        field = STATUS_FIELDS.get(entry.completion_status) if entry.completed else None
+        for bucket in (totals, counts, recurring):
+            bucket['plans'] += 1
+            if field:
+                bucket[field] += 1
+    
+    top = sorted((plan for plan in plans.values() if plan['plans'] > 1),
+                 key=lambda plan: (-plan['plans'], plan['text']))[:TOP_PLANS]
+    return {'totals': totals, 'days': days, 'top_plans': top}
+
+
+def render_report(period: str, key: str, entries: Iterable[PlanEntry], closed: bool = True) -> str:
+    """Render the review of one week or month as Markdown."""
+    start, end = period_bounds(key, period)
+    summary = summarize(entries)
+    totals = summary['totals']
+    answered = totals['completed'] + totals['partial'] + totals['no']
+    
+    lines = [
+        f"# {'Weekly' if period == 'week' else 'Monthly'} Review: {key}",
+        "",
+        f"{start.strftime('%a %d %b %Y')} to {(end - timedelta(days=1)).strftime('%a %d %b %Y')}"
+        + ("" if closed else " (in progress)"),
+        "",
+        f"{totals['plans']} planned, {answered} answered: {totals['completed']} completed, "
+        f"{totals['partial']} partially, {totals['no']} not completed (completion rate {_rate(totals)})",
+        "",
+        "## Top Recurring Plans",
+        "",
+    ]
+    if summary['top_plans']:
+        lines += ["| Plan | Times | Completed | Completion |", "| --- | ---: | ---: | ---: |"]
+        for plan in summary['top_plans']:
+            lines.append(f"| {_cell(plan['text'])} | {plan['plans']} | {plan['completed']} | {_rate(plan)} |")
+    else:
+        lines.append("No plan came up more than once.")
+    
+    lines += ["", "## Completion by Day", "",
+              "| Day | Planned | Completed | Partially | Not completed | Completion |",
+              "| --- | ---: | ---: | ---: | ---: | ---: |"]
+    for day in sorted(summary['days']):
+        counts = summary['days'][day]
+        lines.append(f"| {day.strftime('%a %d %b')} | {counts['plans']} | {counts['completed']} | "
+                     f"{counts['partial']} | {counts['no']} | {_rate(counts)} |")
+    return "\n".join(lines) + "\n"
+
+
+def _fingerprints(days: Dict, period: str) -> Dict[str, str]:
+    """Fingerprint per period label of the daily rollups falling in it."""
+    grouped = {}
+    for day_key in sorted(days):
+        key = period_key(date.fromisoformat(day_key), period)
+        grouped.setdefault(key, []).append([day_key, days[day_key]])
+    return {
+        key: hashlib.sha1(json.dumps([REPORT_VERSION, rows], sort_keys=True).encode('utf-8')).hexdigest()
+        for key, rows in grouped.items()
+    }
+
+
+class ReportGenerator:
+    """Renders reviews over a PlanStorage, caching closed periods on disk."""
+    
+    def __init__(self, storage: PlanStorage, directory=None):
+        self.storage = storage
+        self.directory = Path(directory) if directory else storage.data_dir / 'reports'
+        self.index_file = self.directory / 'index.json'
+        self._lock = threading.Lock()
+    
+    def path(self, period: str, key: str) -> Path:
+        return self.directory / f"{period}-{key}.md"
+    
+    def periods(self, period: str = 'week') -> List[str]:
+        """Labels of the periods with plans, oldest first."""
+        return [summary['period'] for summary in self.storage.get_summaries(period)]
+    
+    def _load_index(self) -> Dict:
+        """Fingerprints of the cached closed periods, keyed "<period>/<label>"."""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('fingerprints', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+    
+    def _save_index(self, index: Dict):
+        _atomic_write(self.index_file, json.dumps({'fingerprints': index}, indent=2).encode('utf-8'))
+    
+    def _render(self, period: str, keys: List[str], today: date) -> Dict[str, str]:
+        """Render and write the reviews of keys from one pass over their span of history.
+        
+        Entries stream in time order, so each period is rendered as soon as
+        its entries have been read and never more than one is held at once.
+        """
+        bounds = [period_bounds(key, period) for key in keys]
+        start = datetime.combine(min(first for first, _ in bounds), dt_time())
+        end = datetime.combine(max(last for _, last in bounds), dt_time())
+        wanted = set(keys)
+        entries = self.storage.iter_plans(start, end)
+        groups = groupby(entries, key=lambda entry: period_key(entry.datetime.date(), period))
+        
+        texts = {}
+        for key, group in groups:
+            if key in wanted:
+                texts[key] = self._write(period, key, group, today)
+        for key in keys:
+            if key not in texts:
+                # No plans in this period (yet)
+                texts[key] = self._write(period, key, (), today)
+        return texts
+    
+    def _write(self, period: str, key: str, entries: Iterable[PlanEntry], today: date) -> str:
+        text = render_report(period, key, entries, period_bounds(key, period)[1] <= today)
+        _atomic_write(self.path(period, key), text.encode('utf-8'))
+        return text
+    
+    def reports(self, period: str = 'week', keys: Optional[Iterable[str]] = None,
+                today: Optional[date] = None) -> List[Tuple[str, str]]:
+        """(label, Markdown) of every period with plans, or of keys, oldest first.
+        
+        Closed periods come from the cache unless their rollups changed;
+        the open period is always rendered.
+        """
+        today = today or date.today()
+        fingerprints = _fingerprints(self.storage.get_daily_rollups().days, period)
+        keys = sorted(fingerprints) if keys is None else list(keys)
+        
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            index = self._load_index()
+            texts = {}
+            for key in keys:
+                name = f"{period}/{key}"
+                closed = period_bounds(key, period)[1] <= today
+                if closed and name in index and index[name] == fingerprints.get(key):
+                    try:
+                        texts[key] = self.path(period, key).read_text(encoding='utf-8')
+                    except OSError:
+                        pass
+            
+            stale = [key for key in keys if key not in texts]
+            if stale:
+                texts.update(self._render(period, stale, today))
+                for key in stale:
+                    if period_bounds(key, period)[1] <= today:
+                        index[f"{period}/{key}"] = fingerprints.get(key)
+                self._save_index(index)
+        return [(key, texts[key]) for key in keys]
+    
+    def refresh(self, periods: Iterable[str] = PERIODS, today: Optional[date] = None,
+                day: Optional[date] = None) -> List[Path]:
+        """Bring the week and month containing day (default: today) up to date. Returns their files."""
+        today = today or date.today()
+        paths = []
+        for period in periods:
+            key = period_key(day or today, period)
+            try:
+                self.reports(period, [key], today)
+                paths.append(self.path(period, key))
+            except Exception as e:
+                print(f"Error writing {period} review {key}: {e}")
+        return paths
+
+
+def main(argv=None):
+    """Command line entry point: periodic-prompter-reports."""
+    parser = argparse.ArgumentParser(description="Write weekly or monthly reviews of the plan history.")
+    parser.add_argument('--period', choices=PERIODS, default='week', help="Review period (default: week)")
+    parser.add_argument('--data-dir', help="Data directory to read (default: the app's)")
+    parser.add_argument('--last', type=int, metavar='N', help="Only the N most recent periods")
+    args = parser.parse_args(argv)
+    
+    storage = PlanStorage(args.data_dir)
+    try:
+        generator = ReportGenerator(storage)
+        started = time.perf_counter()
+        keys = generator.periods(args.period)
+        reports = generator.reports(args.period, keys[-args.last:] if args.last else keys)
+        elapsed = time.perf_counter() - started
+    finally:
+        storage.close()
+    
+    for key, _ in reports:
+        print(generator.path(args.period, key))
+    print(f"{len(reports)} {args.period} reviews in {elapsed * 1000:.0f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
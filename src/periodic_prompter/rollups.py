@@ -0,0 +1,164 @@
+"""Daily and hourly rollups of plan activity, maintained incrementally on every save."""
+
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.models import CompletionStatus
+except ImportError:
+    from .models import CompletionStatus
+
+
+# Which rollup counter each answer increments
+STATUS_FIELDS = {
+    CompletionStatus.YES: 'completed',
+    CompletionStatus.PARTIALLY: 'partial',
+    CompletionStatus.NO: 'no',
+}
+
+PERIODS = ('week', 'month', 'year')
+
+# Layout of the counters; stored rollups of another version are rebuilt
+ROLLUPS_VERSION = 3
+
+
+def _empty_counts() -> Dict:
+    # done counts plans marked completed, whatever (if any) answer they carry
+    return {'count': 0, 'done': 0, 'completed': 0, 'partial': 0, 'no': 0}
+
+
+def _empty_day() -> Dict:
+    return dict(_empty_counts(), first=None, last=None)
+
+
+def period_key(day: date, period: str) -> str:
+    """Label of the week, month or year a day belongs to."""
+    if period == 'week':
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == 'month':
+        return f"{day.year}-{day.month:02d}"
+    if period == 'year':
+        return str(day.year)
+    raise ValueError(f"Unknown period: {period}")
+
+
+class DailyRollups:
+    """Per-day and per-hour plan counts and answers.
+    
+    Each day records how many plans were started that day, how the plans
+    started that day were answered (completed, partial, no) and the first
+    and last prompt times. The same counters are kept for each hour of the
+    day (0-23) across all days. An answer is attributed to the day and hour
+    of the plan it answers, which is the newest entry, so the rollups track
+    that entry's time (latest) alongside the sequence number of the history
+    they reflect.
+    """
+    
+    def __init__(self, days: Dict = None, seq: int = 0, latest: str = None,
+                 hours: List[Dict] = None, version: int = ROLLUPS_VERSION):
+        self.days = days if days is not None else {}
+        self.hours = hours if hours is not None else [_empty_counts() for _ in range(24)]
+        self.seq = seq
+        self.latest = latest
+        self.version = version
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DailyRollups':
+        return cls(data.get('days', {}), data.get('seq', 0), data.get('latest'), data.get('hours'),
+                   data.get('version', 1))
+    
+    def to_dict(self) -> Dict:
+        return {'version': self.version, 'seq': self.seq, 'latest': self.latest,
+                'days': self.days, 'hours': self.hours}
+    
+    @classmethod
+    def rebuild(cls, entries: Iterable, seq: int) -> 'DailyRollups':
+        """Recompute rollups from the raw history."""
+        rollups = cls()
+        for entry in entries:
+            # Stored entries already carry their own final answer
+            rollups._count_answer(rollups._count_plan(entry), entry)
+        rollups.seq = seq
+        return rollups
+    
+    def add_entry(self, entry):
+        """Account for a newly saved plan entry.
+        
+        The status a new entry is saved with answers the previous plan, so
+        it is credited to the previous entry's day and hour.
+        """
+        field = STATUS_FIELDS.get(entry.completion_status)
+        if field and self.latest is not None:
+            # Saving with an answer marks the previous plan completed
+            for counts in self._buckets(self.latest):
+                counts['done'] += 1
+                counts[field] += 1
+        self._count_plan(entry)
+    
+    def add_imported(self, entry):
+        """Account for an entry merged in from elsewhere.
+        
+        Imported entries already carry their own final answer and may be
+        older than the newest plan, which stays the one new answers go to.
+        """
+        latest = self.latest
+        self._count_answer(self._count_plan(entry), entry)
+        if latest is not None and latest > self.latest:
+            self.latest = latest
+    
+    def _buckets(self, timestamp: str) -> Tuple[Dict, Dict]:
+        """The day and hour rollups an ISO local timestamp falls in."""
+        day_key = timestamp[:10]
+        day = self.days.get(day_key)
+        if day is None:
+            day = self.days[day_key] = _empty_day()
+        return day, self.hours[int(timestamp[11:13])]
+    
+    def _count_plan(self, entry) -> Tuple[Dict, Dict]:
+        """Count a plan on its day and hour and return those rollups."""
+        timestamp = entry.timestamp_iso
+        buckets = self._buckets(timestamp)
+        for counts in buckets:
+            counts['count'] += 1
+        day = buckets[0]
+        if day['first'] is None or timestamp < day['first']:
+            day['first'] = timestamp
+        if day['last'] is None or timestamp > day['last']:
+            day['last'] = timestamp
+        self.latest = timestamp
+        return buckets
+    
+    @staticmethod
+    def _count_answer(buckets: Tuple[Dict, Dict], entry):
+        """Count the final answer an entry carries on its day and hour."""
+        if entry.completed:
+            field = STATUS_FIELDS.get(entry.completion_status)
+            for counts in buckets:
+                counts['done'] += 1
+                if field:
+                    counts[field] += 1
+    
+    def summarize(self, period: str) -> List[Dict]:
+        """Combine days into weekly, monthly or yearly totals, oldest first."""
+        summaries = {}
+        for day_key in sorted(self.days):
+            day = self.days[day_key]
+            key = period_key(date.fromisoformat(day_key), period)
+            summary = summaries.get(key)
+            if summary is None:
+                summary = summaries[key] = dict(_empty_day(), period=key, days=0)
+            summary['days'] += 1
+            for field in ('count', 'done', 'completed', 'partial', 'no'):
+                summary[field] += day[field]
+            if summary['first'] is None:
+                summary['first'] = day['first']
+            summary['last'] = day['last']
+        
+        results = list(summaries.values())
+        for summary in results:
+            answered = summary['completed'] + summary['partial'] + summary['no']
+            summary['answered'] = answered
+            summary['completion_rate'] = (summary['completed'] / answered) * 100 if answered else 0.0
+        return results
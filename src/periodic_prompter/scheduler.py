@@ -1,39 +1,151 @@
 """Scheduling logic for Periodic Prompter."""
 
-import schedule
-import time
+import heapq
+import itertools
 import threading
-from datetime import datetime, time as dt_time
-from typing import Callable
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter import tracing
+    from periodic_prompter.clock import SYSTEM_CLOCK
+    from periodic_prompter.events import ScheduleFired, SettingsChanged
+except ImportError:
+    from . import tracing
+    from .clock import SYSTEM_CLOCK
+    from .events import ScheduleFired, SettingsChanged
+
+
+# How many days a fixed-time schedule may skip looking for a working day
+MAX_SKIPPED_DAYS = 400
+
+# Longest single wait of the scheduler thread. Waits are timed on the
+# monotonic clock, which stands still while the Mac sleeps, so the deadline
+# is rechecked against the wall clock at least this often.
+MAX_WAIT_SECONDS = 60
+
+# Settings the timers are built from; changing any restarts a running scheduler
+SCHEDULE_SETTINGS = ('interval_hours', 'start_time', 'end_time', 'weekdays_only',
+                     'working_hours', 'schedules', 'weekly_report')
+
+
+class ScheduledPrompt:
+    """One named schedule: what to prompt, how often, and within which window."""
+    
+    def __init__(self, config: Dict, hours=None):
+        self.config = config
+        self.hours = hours
+        self.name = config['name']
+        self.kind = config.get('kind', 'plan')
+        self.message = config.get('message', '')
+        # Whole minutes, as before; sub-hour remainders are kept (1.5h is 90 minutes)
+        self.interval = timedelta(minutes=max(1, int(config.get('interval_hours', 1.0) * 60)))
+        self.at = config.get('at')
+    
+    def describe(self) -> str:
+        if self.kind == 'report':
+            return "at the end of the working week"
+        if self.at:
+            return f"daily at {self.at}"
+        return f"every {int(self.interval.total_seconds() // 60)} minutes"
+    
+    def next_run(self, now: datetime) -> datetime:
+        """When to fire next, counted from when the last run finished.
+        
+        With working hours, a deadline falling outside them moves straight
+        to the next working instant (or, for a fixed daily time, to the
+        next working day at that time) instead of firing only to be skipped.
+        A report runs once a week, when the week's working time ends.
+        """
+        if self.kind == 'report':
+            end = self.hours.end_of_week(now) if self.hours is not None else None
+            return end or now + timedelta(days=7)
+        if self.at:
+            candidate = self._next_at(now)
+            if self.hours is not None:
+                for _ in range(MAX_SKIPPED_DAYS):
+                    if self.hours.is_working(candidate):
+                        break
+                    candidate = self._next_at(candidate)
+            return candidate
+        
+        candidate = now + self.interval
+        if self.hours is not None:
+            # None means no working time at all; fire (and skip) as before
+            candidate = self.hours.next_working_instant(candidate) or candidate
+        return candidate
+    
+    def _next_at(self, now: datetime) -> datetime:
+        """Next occurrence of the fixed daily time."""
+        hours, minutes = map(int, self.at.split(':'))
+        candidate = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+        return candidate if candidate > now else candidate + timedelta(days=1)
 
 
 class PromptScheduler:
-    """Manages scheduled prompts based on user settings."""
+    """Manages scheduled prompts based on user settings.
+    
+    Every named schedule has its own deadline in a heap; the single
+    scheduler thread sleeps until the earliest one, runs whatever is due
+    and re-queues it. All time comes from the clock (the system clock
+    unless another is given), so schedules can be replayed against
+    simulated time.
+    """
     
-    def __init__(self, settings, notification_system, menu_update_callback=None):
+    def __init__(self, settings, notification_system, menu_update_callback=None, clock=None, events=None):
         self.settings = settings
         self.notification_system = notification_system
         self.menu_update_callback = menu_update_callback
+        self.clock = clock or SYSTEM_CLOCK
         self.running = False
         self.scheduler_thread = None
         self.stop_event = threading.Event()
+        # Set to make the running thread rebuild its timers; wake interrupts its wait
+        self._reschedule = threading.Event()
+        self._wake = threading.Event()
+        # Heap of (deadline, tie-breaker, ScheduledPrompt)
+        self.timers = []
+        self._counter = itertools.count()
+        self._timers_lock = threading.Lock()
+        # Fires are published on the EventBus, which also tells us about new settings
+        self.events = events
+        if events is not None:
+            events.subscribe(SettingsChanged, self._settings_changed, queued=True)
         
-    def should_prompt_now(self) -> bool:
+    @property
+    def next_run(self) -> Optional[datetime]:
+        """Earliest deadline across all schedules."""
+        timers = self.timers
+        return timers[0][0] if timers else None
+    
+    def should_prompt_now(self, schedule: Optional[Dict] = None) -> bool:
         """Check if we should prompt now based on current settings."""
         # Check if today is a valid day
-        if not self.settings.should_prompt_today():
+        if not self.settings.should_prompt_today(schedule=schedule):
             return False
         
         # Check if current time is within working hours
-        if not self.settings.is_working_time():
+        if not self.settings.is_working_time(schedule=schedule):
             return False
         
         return True
     
-    def prompt_callback(self):
+    def fire(self, prompt: ScheduledPrompt):
+        """Run one schedule's prompt or reminder."""
+        if prompt.kind == 'plan':
+            self.prompt_callback(prompt.config)
+        elif prompt.kind == 'report':
+            # The review is written by whoever subscribes to ScheduleFired
+            print(f"[{self.clock.now()}] Weekly review due")
+        elif self.should_prompt_now(prompt.config):
+            print(f"[{self.clock.now()}] Reminder: {prompt.name}")
+            self.notification_system.show_notification(prompt.name, prompt.message or prompt.name)
+    
+    def prompt_callback(self, schedule: Optional[Dict] = None):
         """Callback function for scheduled prompts."""
-        if self.should_prompt_now():
-            print(f"[{datetime.now()}] Triggering scheduled prompt")
+        if self.should_prompt_now(schedule):
+            print(f"[{self.clock.now()}] Triggering scheduled prompt")
             
             # Get previous plan
             previous_plan = self.notification_system.current_plan
@@ -49,46 +161,71 @@ class PromptScheduler:
             else:
                 print("No plan recorded or user cancelled")
         else:
-            print(f"[{datetime.now()}] Skipping prompt (outside working hours or weekend)")
+            print(f"[{self.clock.now()}] Skipping prompt (outside working hours or weekend)")
     
     def setup_schedule(self):
         """Set up the scheduling based on current settings."""
-        # Clear existing schedule
-        schedule.clear()
-        
-        # Get interval from settings
-        interval_hours = self.settings.get('interval_hours', 1.0)
-        
-        # Convert hours to minutes for more precise scheduling
-        interval_minutes = int(interval_hours * 60)
-        
-        print(f"Setting up schedule: every {interval_minutes} minutes")
+        now = self.clock.now()
+        timers = []
+        for config in self.settings.get_schedules():
+            prompt = ScheduledPrompt(config, self.settings.working_hours(config))
+            print(f"Setting up schedule '{prompt.name}': {prompt.describe()}")
+            timers.append((prompt.next_run(now), next(self._counter), prompt))
+        heapq.heapify(timers)
+        with self._timers_lock:
+            self.timers = timers
+    
+    def seconds_until_due(self) -> Optional[float]:
+        """Seconds until the next prompt is due, or None if nothing is scheduled."""
+        next_run = self.next_run
+        if next_run is None:
+            return None
+        return max(0.0, (next_run - self.clock.now()).total_seconds())
+    
+    def run_due(self) -> int:
+        """Run every schedule whose deadline has passed. Returns how many ran.
         
-        # Schedule the prompt
-        if interval_minutes >= 60:
-            # Use hourly scheduling for intervals >= 1 hour
-            hours = interval_minutes // 60
-            schedule.every(hours).hours.do(self.prompt_callback)
-        else:
-            # Use minute-based scheduling for sub-hour intervals
-            schedule.every(interval_minutes).minutes.do(self.prompt_callback)
+        Each schedule's next run is counted from when its prompt finishes,
+        so a prompt left open never causes a burst of catch-up prompts.
+        """
+        ran = 0
+        while True:
+            with self._timers_lock:
+                if not self.timers or self.clock.now() < self.timers[0][0]:
+                    return ran
+                planned, _, prompt = heapq.heappop(self.timers)
+            try:
+                late = (self.clock.now() - planned).total_seconds()
+                if self.events is not None:
+                    self.events.publish(ScheduleFired(prompt.name, prompt.kind, planned, late))
+                tracing.counter('fire lateness (s)', **{prompt.name: late})
+                with tracing.span(f"fire {prompt.name}", 'scheduler', kind=prompt.kind,
+                                  planned=planned.isoformat(), late_s=late):
+                    self.fire(prompt)
+            finally:
+                with self._timers_lock:
+                    heapq.heappush(self.timers, (prompt.next_run(self.clock.now()), next(self._counter), prompt))
+            ran += 1
     
     def run_scheduler(self):
-        """Run the scheduler in a loop."""
+        """Run the scheduler in a loop, sleeping until the next prompt is due."""
         print("Starting scheduler...")
         self.setup_schedule()
         
-        while not self.stop_event.is_set():
+        while True:
+            self._wake.clear()
+            if self.stop_event.is_set():
+                return
+            if self._reschedule.is_set():
+                self._reschedule.clear()
+                self.setup_schedule()
             try:
-                # Check for pending scheduled jobs
-                schedule.run_pending()
-                
-                # Sleep for a short time to avoid busy waiting
-                time.sleep(30)  # Check every 30 seconds
-                
+                self.run_due()
             except Exception as e:
                 print(f"Error in scheduler: {e}")
-                time.sleep(60)  # Wait a bit longer on error
+            
+            timeout = self.seconds_until_due()
+            self.clock.wait(self._wake, MAX_WAIT_SECONDS if timeout is None else min(timeout, MAX_WAIT_SECONDS))
     
     def start(self):
         """Start the scheduler in a background thread."""
@@ -98,6 +235,7 @@ class PromptScheduler:
         
         self.running = True
         self.stop_event.clear()
+        self._reschedule.clear()
         
         # Start scheduler thread
         self.scheduler_thread = threading.Thread(
@@ -117,9 +255,11 @@ class PromptScheduler:
         print("Stopping scheduler...")
         self.running = False
         self.stop_event.set()
+        self._wake.set()
         
         # Clear scheduled jobs
-        schedule.clear()
+        with self._timers_lock:
+            self.timers = []
         
         # Wait for thread to finish (with timeout)
         if self.scheduler_thread and self.scheduler_thread.is_alive():
@@ -127,25 +267,32 @@ class PromptScheduler:
         
         print("Scheduler stopped")
     
+    def _settings_changed(self, event: SettingsChanged):
+        if self.running and event.affects(SCHEDULE_SETTINGS):
+            self.restart()
+    
     def restart(self):
-        """Restart the scheduler (useful when settings change)."""
+        """Restart the scheduler (useful when settings change).
+        
+        A running scheduler thread rebuilds its timers itself, once any
+        prompt it has open is answered, so a second thread is never started
+        next to it.
+        """
         print("Restarting scheduler with new settings...")
+        if self.running and self.scheduler_thread is not None and self.scheduler_thread.is_alive():
+            self._reschedule.set()
+            self._wake.set()
+            return
         self.stop()
-        time.sleep(1)  # Brief pause
         self.start()
     
     def get_next_prompt_time(self) -> str:
         """Get the time of the next scheduled prompt."""
         try:
-            jobs = schedule.get_jobs()
-            if not jobs:
+            if self.next_run is None:
                 return "No prompts scheduled"
             
-            next_run = min(job.next_run for job in jobs)
-            if next_run:
-                return next_run.strftime("%Y-%m-%d %H:%M:%S")
-            else:
-                return "Next run time not available"
+            return self.next_run.strftime("%Y-%m-%d %H:%M:%S")
                 
         except Exception as e:
             return f"Error getting next prompt time: {e}"
@@ -163,7 +310,11 @@ class PromptScheduler:
             'end_time': end_time.strftime("%H:%M"),
             'weekdays_only': weekdays_only,
             'next_prompt': self.get_next_prompt_time(),
-            'jobs_count': len(schedule.get_jobs()),
+            'jobs_count': len(self.timers),
+            'schedules': [
+                {'name': prompt.name, 'kind': prompt.kind, 'next': deadline.strftime("%Y-%m-%d %H:%M:%S")}
+                for deadline, _, prompt in sorted(self.timers)
+            ],
             'should_prompt_now': self.should_prompt_now()
         }
 
@@ -3,8 +3,18 @@
 import json
 import os
 from pathlib import Path
-from typing import Dict, Any
-from datetime import time
+from typing import Dict, Any, List, Optional
+from datetime import datetime, time
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.clock import SYSTEM_CLOCK
+    from periodic_prompter.working_hours import WorkingHours, legacy_rules
+    from periodic_prompter.events import SettingsChanged
+except ImportError:
+    from .clock import SYSTEM_CLOCK
+    from .working_hours import WorkingHours, legacy_rules
+    from .events import SettingsChanged
 
 
 class Settings:
@@ -17,16 +27,58 @@ class Settings:
         'weekdays_only': True,
         'show_next_hour_prompt': True,
         'create_log': True,
+        'create_csv_log': False,
         'log_file_path': str(Path.home() / 'periodic_prompter_log.txt'),
-        'log_file_name': 'periodic_prompter_log.txt'
+        'log_file_name': 'periodic_prompter_log.txt',
+        'storage_format': 'json',
+        # Paging mode: cap decoded history held in memory (0 leaves it off)
+        'memory_budget_mb': 0,
+        # Entries listed under Recent Plans in the menu
+        'recent_plans': 10,
+        # Log sinks replacing create_log/create_csv_log when non-empty, e.g.
+        # {"type": "jsonl", "path": "~/plans.jsonl", "policy": "drop"}
+        # (types: text, csv, jsonl, syslog; policy: block or drop)
+        'sinks': [],
+        # Push saved plans to a team endpoint (see sync.py)
+        'sync_enabled': False,
+        'sync_url': '',
+        'sync_token': '',
+        # Write a weekly review at the end of each working week (see reports.py)
+        'weekly_report': True,
+        # Sampled cProfile/tracemalloc output in the data dir (see profiling.py)
+        'profiling': False,
+        'profile_sample_rate': 0.25,
+        # Record a timeline of fires, dialogs and writes (see tracing.py)
+        'tracing': False,
+        # Extra named schedules alongside the main plan prompt, e.g.
+        # {"name": "Focus check", "kind": "reminder", "interval_hours": 0.25,
+        #  "message": "Still on track?"}. Missing window keys follow the
+        # main start_time/end_time/weekdays_only.
+        'schedules': [],
+        # Optional detailed rules replacing start_time/end_time/weekdays_only:
+        # {"weekly": {"mon": ["09:00-12:00", "13:00-17:30"], ...},
+        #  "exceptions": {"2025-12-25": []}} (see working_hours.py)
+        'working_hours': None
     }
     
-    def __init__(self, config_dir=None):
+    WINDOW_KEYS = ('start_time', 'end_time', 'weekdays_only')
+    
+    SCHEDULE_KINDS = ('plan', 'reminder')
+    
+    SINK_TYPES = ('text', 'csv', 'jsonl', 'syslog')
+    
+    SINK_POLICIES = ('block', 'drop')
+    
+    def __init__(self, config_dir=None, clock=None, events=None):
+        self.clock = clock or SYSTEM_CLOCK
+        # EventBus told about every change (see events.py), if any
+        self.events = events
         if config_dir is None:
             config_dir = Path.home() / '.config' / 'periodic_prompter'
         self.config_dir = Path(config_dir)
         self.config_file = self.config_dir / 'settings.json'
         self.settings = self.DEFAULT_SETTINGS.copy()
+        self._compiled_hours = {}
         self.load_settings()
     
     def load_settings(self):
@@ -55,6 +107,8 @@ class Settings:
     
     def validate_settings(self):
         """Validate and fix settings values."""
+        self._compiled_hours = {}
+        
         # Validate interval
         if self.settings['interval_hours'] < 0.1:
             self.settings['interval_hours'] = 0.1
@@ -75,25 +129,156 @@ class Settings:
                 self.settings[time_key] = self.DEFAULT_SETTINGS[time_key]
         
         # Validate boolean settings
-        for bool_key in ['weekdays_only', 'show_next_hour_prompt', 'create_log']:
+        for bool_key in ['weekdays_only', 'show_next_hour_prompt', 'create_log', 'create_csv_log',
+                         'sync_enabled', 'profiling', 'tracing', 'weekly_report']:
             if not isinstance(self.settings[bool_key], bool):
                 self.settings[bool_key] = self.DEFAULT_SETTINGS[bool_key]
         
+        # Validate named schedules
+        self.settings['schedules'] = self._validate_schedules(self.settings.get('schedules'))
+        
+        # Validate working-hours rules
+        if self.settings.get('working_hours') is not None:
+            try:
+                WorkingHours(self.settings['working_hours'])
+            except (AttributeError, TypeError, ValueError) as e:
+                print(f"Ignoring invalid working_hours rules: {e}")
+                self.settings['working_hours'] = None
+        
+        # Validate log sinks
+        self.settings['sinks'] = self._validate_sinks(self.settings.get('sinks'))
+        
+        # Validate sync endpoint
+        for str_key in ['sync_url', 'sync_token']:
+            if not isinstance(self.settings[str_key], str):
+                self.settings[str_key] = self.DEFAULT_SETTINGS[str_key]
+        
+        # Validate memory budget
+        if not isinstance(self.settings['memory_budget_mb'], (int, float)) or \
+                isinstance(self.settings['memory_budget_mb'], bool) or self.settings['memory_budget_mb'] < 0:
+            self.settings['memory_budget_mb'] = self.DEFAULT_SETTINGS['memory_budget_mb']
+        
+        # Validate recent plans count
+        count = self.settings['recent_plans']
+        if not isinstance(count, int) or isinstance(count, bool) or not 1 <= count <= 50:
+            self.settings['recent_plans'] = self.DEFAULT_SETTINGS['recent_plans']
+        
+        # Validate profiling sample rate
+        rate = self.settings['profile_sample_rate']
+        if not isinstance(rate, (int, float)) or isinstance(rate, bool) or not 0 < rate <= 1:
+            self.settings['profile_sample_rate'] = self.DEFAULT_SETTINGS['profile_sample_rate']
+        
+        # Validate storage format
+        if self.settings['storage_format'] not in ('json', 'binary'):
+            self.settings['storage_format'] = self.DEFAULT_SETTINGS['storage_format']
+        
         # Validate log file path
         try:
             Path(self.settings['log_file_path']).parent.mkdir(parents=True, exist_ok=True)
         except:
             self.settings['log_file_path'] = self.DEFAULT_SETTINGS['log_file_path']
     
+    @staticmethod
+    def _valid_time(value) -> bool:
+        try:
+            hours, minutes = map(int, value.split(':'))
+            return 0 <= hours <= 23 and 0 <= minutes <= 59
+        except (AttributeError, ValueError):
+            return False
+    
+    def _validate_schedules(self, schedules) -> List[Dict]:
+        """Keep well-formed schedules with unique names, dropping the rest."""
+        valid = []
+        names = {'plan'}
+        for schedule in schedules if isinstance(schedules, list) else []:
+            try:
+                name = str(schedule['name']).strip()
+                kind = schedule.get('kind', 'reminder')
+                interval = float(schedule.get('interval_hours', 1.0))
+                if not name or name in names or kind not in self.SCHEDULE_KINDS:
+                    raise ValueError("needs a unique name and a kind of plan or reminder")
+                for key in ('start_time', 'end_time', 'at'):
+                    if key in schedule and not self._valid_time(schedule[key]):
+                        raise ValueError(f"bad {key}")
+                if schedule.get('working_hours') is not None:
+                    WorkingHours(schedule['working_hours'])
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                print(f"Ignoring invalid schedule {schedule!r}: {e}")
+                continue
+            names.add(name)
+            valid.append(dict(schedule, name=name, kind=kind,
+                              interval_hours=min(max(interval, 1 / 60), 24 * 7)))
+        return valid
+    
+    def _validate_sinks(self, sinks) -> List[Dict]:
+        """Keep well-formed sink entries with unique names, dropping the rest."""
+        valid = []
+        names = set()
+        for sink in sinks if isinstance(sinks, list) else []:
+            try:
+                kind = sink['type']
+                name = str(sink.get('name', kind))
+                if kind not in self.SINK_TYPES or name in names:
+                    raise ValueError("needs a known type and a unique name")
+                if sink.get('policy', 'block') not in self.SINK_POLICIES:
+                    raise ValueError("policy must be block or drop")
+                if kind != 'syslog' and not sink.get('path'):
+                    raise ValueError("needs a path")
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                print(f"Ignoring invalid log sink {sink!r}: {e}")
+                continue
+            names.add(name)
+            valid.append(dict(sink, name=name))
+        return valid
+    
+    def get_schedules(self) -> List[Dict]:
+        """All enabled prompt schedules, starting with the main plan prompt."""
+        main = {
+            'name': 'plan',
+            'kind': 'plan',
+            'interval_hours': self.settings['interval_hours'],
+        }
+        schedules = [main] + [schedule for schedule in self.settings.get('schedules', [])
+                              if schedule.get('enabled', True)]
+        if self.settings.get('weekly_report'):
+            schedules.append({'name': 'weekly review', 'kind': 'report'})
+        return schedules
+    
+    def working_hours(self, schedule: Optional[Dict] = None) -> WorkingHours:
+        """Compiled working hours of a schedule, or of the main settings.
+        
+        A schedule with its own working_hours rules or window keys uses
+        those; otherwise it follows the main working_hours rules, or the
+        main start_time/end_time/weekdays_only if there are none.
+        """
+        schedule = schedule or {}
+        # Compiled once per schedule until the settings change
+        cache_key = schedule.get('name')
+        compiled = self._compiled_hours.get(cache_key)
+        if compiled is not None:
+            return compiled
+        
+        if schedule.get('working_hours'):
+            rules = schedule['working_hours']
+        elif any(key in schedule for key in self.WINDOW_KEYS):
+            window = dict({key: self.settings[key] for key in self.WINDOW_KEYS}, **schedule)
+            rules = legacy_rules(window['start_time'], window['end_time'], window['weekdays_only'])
+        elif self.settings.get('working_hours'):
+            rules = self.settings['working_hours']
+        else:
+            rules = legacy_rules(self.settings['start_time'], self.settings['end_time'],
+                                 self.settings['weekdays_only'])
+        
+        compiled = self._compiled_hours[cache_key] = WorkingHours(rules)
+        return compiled
+    
     def get(self, key: str, default=None):
         """Get a setting value."""
         return self.settings.get(key, default)
     
     def set(self, key: str, value: Any):
         """Set a setting value."""
-        self.settings[key] = value
-        self.validate_settings()
-        self.save_settings()
+        self.update_multiple({key: value})
     
     def get_all(self) -> Dict[str, Any]:
         """Get all settings."""
@@ -101,20 +286,32 @@ class Settings:
     
     def update_multiple(self, updates: Dict[str, Any]):
         """Update multiple settings at once."""
+        before = self.settings.copy()
         self.settings.update(updates)
         self.validate_settings()
         self.save_settings()
+        self._publish_changes(before)
     
     def reset_to_defaults(self):
         """Reset all settings to defaults."""
+        before = self.settings
         self.settings = self.DEFAULT_SETTINGS.copy()
+        self._compiled_hours = {}
         self.save_settings()
+        self._publish_changes(before)
+    
+    def _publish_changes(self, before: Dict[str, Any]):
+        """Publish SettingsChanged with the keys whose values differ from before."""
+        changed = [key for key in set(before) | set(self.settings) if before.get(key) != self.settings.get(key)]
+        if changed and self.events is not None:
+            self.events.publish(SettingsChanged(changed))
     
-    def get_working_hours(self):
-        """Get start and end time as time objects."""
+    def get_working_hours(self, schedule: Optional[Dict] = None):
+        """Get start and end time as time objects (of a schedule, if given)."""
         try:
-            start_str = self.settings['start_time']
-            end_str = self.settings['end_time']
+            source = dict(self.settings, **(schedule or {}))
+            start_str = source['start_time']
+            end_str = source['end_time']
             
             start_hours, start_minutes = map(int, start_str.split(':'))
             end_hours, end_minutes = map(int, end_str.split(':'))
@@ -127,25 +324,21 @@ class Settings:
             # Return defaults if parsing fails
             return time(9, 0), time(18, 0)
     
-    def is_working_time(self, current_time=None):
-        """Check if current time is within working hours."""
-        if current_time is None:
-            from datetime import datetime
-            current_time = datetime.now().time()
+    def is_working_time(self, current_time=None, schedule: Optional[Dict] = None):
+        """Check if current time is within working hours.
         
-        start_time, end_time = self.get_working_hours()
+        current_time may be a datetime, or a time of day taken as today.
+        """
+        now = self.clock.now()
+        if current_time is None:
+            current_time = now
+        elif isinstance(current_time, time):
+            current_time = datetime.combine(now.date(), current_time)
         
-        if start_time <= end_time:
-            return start_time <= current_time <= end_time
-        else:
-            # Handle case where end time is next day (e.g., 22:00 to 06:00)
-            return current_time >= start_time or current_time <= end_time
+        return self.working_hours(schedule).is_working(current_time)
     
-    def should_prompt_today(self):
-        """Check if we should prompt today based on weekdays_only setting."""
-        if not self.settings['weekdays_only']:
-            return True
-        
-        from datetime import datetime
-        today = datetime.now().weekday()
-        return today < 5  # Monday=0, Sunday=6
\ No newline at end of file
+    def should_prompt_today(self, today=None, schedule: Optional[Dict] = None):
+        """Check if today has any working hours (e.g. not a weekend with weekdays_only)."""
+        if today is None:
+            today = self.clock.now().date()
+        return self.working_hours(schedule).works_on(today)
\ No newline at end of file
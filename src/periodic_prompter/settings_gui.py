@@ -2,8 +2,24 @@
 
 import subprocess
 import json
+from datetime import datetime, timedelta
 from pathlib import Path
 
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter import analytics
+except ImportError:
+    from . import analytics
+
+
+# Export format choices: label -> (LogWriter format, file extension)
+EXPORT_FORMATS = {
+    "Text": ('txt', '.txt'),
+    "CSV": ('csv', '.csv'),
+    "JSON Lines": ('jsonl', '.jsonl'),
+    "SQLite": ('sqlite', '.sqlite'),
+}
+
 
 class SettingsWindow:
     """Native macOS dialog-based settings interface."""
@@ -137,12 +153,9 @@ What would you like to configure?"""
             'weekdays_only': weekdays_only
         }
         
+        # The scheduler restarts itself on the settings change
         self.settings.update_multiple(updates)
         
-        # Restart scheduler if it exists
-        if self.scheduler:
-            self.scheduler.restart()
-        
         self._show_info_dialog("Settings Saved", "Timing settings have been updated successfully!")
     
     def _show_logging_settings(self):
@@ -153,13 +166,13 @@ What would you like to configure?"""
         logging_choice = self._show_choice_dialog(
             "Logging", 
             f"Current: {'Enabled' if current['create_log'] else 'Disabled'}\\n\\nDo you want to enable logging?",
-            ["Enable logging", "Disable logging", "Cancel"]
+            ["Text log", "Text and CSV logs", "Disable logging", "Cancel"]
         )
         
         if logging_choice == "Cancel":
             return
         
-        create_log = logging_choice == "Enable logging"
+        create_log = logging_choice != "Disable logging"
         
         log_path = current['log_file_path']
         
@@ -172,23 +185,13 @@ What would you like to configure?"""
         # Save settings
         updates = {
             'create_log': create_log,
+            'create_csv_log': logging_choice == "Text and CSV logs",
             'log_file_path': log_path
         }
         
+        # The notification system rebuilds its log sinks on the settings change
         self.settings.update_multiple(updates)
         
-        # Update notification system log writer
-        if self.notification_system:
-            if create_log:
-                # Use absolute imports for packaging compatibility
-                try:
-                    from periodic_prompter.storage import LogWriter
-                except ImportError:
-                    from .storage import LogWriter
-                self.notification_system.log_writer = LogWriter(log_path)
-            else:
-                self.notification_system.log_writer = None
-        
         self._show_info_dialog("Settings Saved", "Logging settings have been updated successfully!")
     
     def _show_export_menu(self):
@@ -197,33 +200,65 @@ What would you like to configure?"""
             self._show_error_dialog("Export not available - no data storage found")
             return
         
-        plans = self.notification_system.storage.get_plans_history(1000)
-        if not plans:
+        storage = self.notification_system.storage
+        total_plans = storage.get_stats()['total_plans']
+        if not total_plans:
             self._show_info_dialog("No Data", "No plans found to export.")
             return
         
-        export_choice = self._show_choice_dialog(
+        export_choice = self._show_list_dialog(
             "Export Data",
-            f"Found {len(plans)} plans to export.\\n\\nChoose export format:",
-            ["Export to Text", "Export to CSV", "Cancel"]
+            f"Found {total_plans} plans to export. Choose export format:",
+            list(EXPORT_FORMATS)
+        )
+        
+        if export_choice is None:
+            return
+        
+        format_type, extension = EXPORT_FORMATS[export_choice]
+        
+        # Optional date range
+        range_result = self._show_input_dialog(
+            "Date Range",
+            "Export plans from which dates?\\n\\nEnter YYYY-MM-DD to YYYY-MM-DD (inclusive), or leave empty for all plans:",
+            ""
         )
+        if range_result is None:
+            return
         
-        if export_choice == "Cancel":
+        try:
+            start, end = self._parse_date_range(range_result)
+        except ValueError:
+            self._show_error_dialog(f"Invalid date range: {range_result}. Please use YYYY-MM-DD to YYYY-MM-DD.")
             return
         
-        extension = ".txt" if export_choice == "Export to Text" else ".csv"
         default_name = f"periodic_prompter_export{extension}"
         
         filename = self._show_file_save_dialog("Export plans", default_name)
         if filename:
-            log_writer = self.notification_system.log_writer
-            if log_writer:
-                log_writer.log_file_path = Path(filename)
-                format_type = 'txt' if export_choice == "Export to Text" else 'csv'
-                log_writer.export_all_plans(plans, format_type)
+            # Use absolute imports for packaging compatibility
+            try:
+                from periodic_prompter.storage import LogWriter
+            except ImportError:
+                from .storage import LogWriter
+            if LogWriter(filename).export_all_plans(storage.iter_plans(), format_type, start, end,
+                                                    export_path=filename):
                 self._show_info_dialog("Export Complete", f"Plans exported to {filename}")
             else:
-                self._show_error_dialog("Export failed - no log writer available")
+                self._show_error_dialog(f"Could not export plans to {filename}")
+    
+    def _parse_date_range(self, text):
+        """Parse "YYYY-MM-DD to YYYY-MM-DD" into a [start, end) datetime pair."""
+        text = text.strip()
+        if not text:
+            return None, None
+        
+        parts = [part.strip() for part in text.split(' to ')]
+        if len(parts) != 2:
+            raise ValueError(text)
+        start = datetime.strptime(parts[0], '%Y-%m-%d') if parts[0] else None
+        end = datetime.strptime(parts[1], '%Y-%m-%d') + timedelta(days=1) if parts[1] else None
+        return start, end
     
     def _show_statistics(self):
         """Show statistics."""
@@ -240,8 +275,47 @@ Completion rate: {stats['completion_rate']:.1f}%
 Plans this week: {stats['plans_this_week']}
 Plans today: {stats['plans_today']}"""
         
+        try:
+            stats_text += self._format_analytics(analytics.analyze(self.notification_system.storage))
+        except Exception as e:
+            print(f"Error computing analytics: {e}")
+        
+        paging = self.notification_system.storage.get_paging_stats()
+        if paging:
+            stats_text += (f"\\n\\nHistory cache: {paging['resident_bytes'] // 1024} of "
+                           f"{paging['budget'] // 1024} KB, {paging['hit_rate']:.0f}% hits, "
+                           f"{paging['evictions']} evictions")
+        
         self._show_info_dialog("Statistics", stats_text)
     
+    def _format_analytics(self, results):
+        """Format completion breakdowns for the statistics dialog."""
+        def rate(value):
+            return "n/a" if value is None else f"{value:.0f}%"
+        
+        lines = []
+        hours = results['by_hour']
+        for label, index in (("Worst hour", results['worst_hour']), ("Best hour", results['best_hour'])):
+            if index is not None:
+                lines.append(f"{label}: {index:02d}:00 ({rate(hours['rates'][index])} of {hours['answered'][index]})")
+        
+        weekdays = results['by_weekday']
+        for label, index in (("Worst day", results['worst_weekday']), ("Best day", results['best_weekday'])):
+            if index is not None:
+                lines.append(f"{label}: {analytics.WEEKDAY_NAMES[index]} "
+                             f"({rate(weekdays['rates'][index])} of {weekdays['answered'][index]})")
+        
+        for days in analytics.ROLLING_WINDOWS:
+            series = results['rolling'][days]
+            if series:
+                lines.append(f"Last {days} days (to {series[-1]['date']}): {rate(series[-1]['rate'])}")
+                if len(series) > days:
+                    lines.append(f"  previous {days} days: {rate(series[-1 - days]['rate'])}")
+        
+        if not lines:
+            return ""
+        return "\\n\\nCompletion breakdown:\\n" + "\\n".join(lines)
+    
     def _reset_to_defaults(self):
         """Reset settings to defaults."""
         choice = self._show_choice_dialog(
@@ -305,6 +379,29 @@ Plans today: {stats['plans_today']}"""
             print(f"Error showing choice dialog: {e}")
             return None
     
+    def _show_list_dialog(self, title, message, items):
+        """Show a list picker and return the chosen item, or None if cancelled."""
+        try:
+            items_str = ', '.join(f'"{item}"' for item in items)
+            
+            script = f'''
+            set listChoice to choose from list {{{items_str}}} with title "{title}" with prompt "{message}" default items {{"{items[0]}"}}
+            if listChoice is false then return ""
+            return item 1 of listChoice
+            '''
+            
+            result = subprocess.run(['osascript', '-e', script], 
+                                  capture_output=True, text=True, check=True)
+            
+            choice = result.stdout.strip()
+            return choice if choice in items else None
+        
+        except subprocess.CalledProcessError:
+            return None  # User cancelled
+        except Exception as e:
+            print(f"Error showing list dialog: {e}")
+            return None
+    
     def _show_input_dialog(self, title, message, default_value=""):
         """Show an input dialog."""
         try:
@@ -0,0 +1,355 @@
+"""Fan-out pipeline that delivers saved plans to log sinks off the prompt thread.
+
+publish() puts an entry on a bounded in-memory queue and returns at once.
+A background stage drains that queue in batches and hands each batch to
+every configured sink. Each sink has its own bounded queue and worker
+thread, so one slow or failing sink does not hold up the others, and a
+policy for when its queue is full:
+
+- "block" applies backpressure: the fan-out stage waits for room, and
+  entries build up in the pipeline queue instead. The wait is bounded by
+  SINK_BLOCK_TIMEOUT per batch, so a stalled sink cannot hold up the
+  others; what still does not fit is dropped and counted.
+- "drop" discards the entry for that sink and counts it.
+
+Failures are counted per sink and reported through stats(). Shutdown waits
+at most SINK_STOP_TIMEOUT for each stage to deliver what is queued.
+"""
+
+import atexit
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter import tracing
+    from periodic_prompter.models import PlanEntry
+    from periodic_prompter.storage import LogWriter, _encode_record, _export_record
+except ImportError:
+    from . import tracing
+    from .models import PlanEntry
+    from .storage import LogWriter, _encode_record, _export_record
+
+
+PIPELINE_QUEUE_SIZE = 10000
+SINK_QUEUE_SIZE = 1000
+SINK_BATCH_SIZE = 100
+
+# Longest the fan-out stage waits for room in a "block" sink's queue, per batch
+SINK_BLOCK_TIMEOUT = 1.0
+
+# Longest shutdown waits for a stage to deliver what is queued
+SINK_STOP_TIMEOUT = 2.0
+
+POLICIES = ('block', 'drop')
+
+# Local syslog socket, where it lives on macOS and on Linux
+SYSLOG_SOCKETS = ('/var/run/syslog', '/dev/log')
+
+# A stalled syslogd counts as a failure instead of hanging the sink
+SYSLOG_TIMEOUT = 1.0
+
+_STOP = object()
+
+
+class Sink:
+    """A destination for saved plans, fed in batches by its own worker thread."""
+    
+    # Settings keys every sink accepts; subclasses add their own in OPTIONS
+    COMMON_OPTIONS = ('name', 'policy', 'queue_size', 'batch_size')
+    OPTIONS = ()
+    
+    def __init__(self, name: str, policy: str = 'block', queue_size: int = SINK_QUEUE_SIZE,
+                 batch_size: int = SINK_BATCH_SIZE):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown sink policy: {policy}")
+        self.name = name
+        self.policy = policy
+        self.batch_size = batch_size
+        self.queue = queue.Queue(queue_size)
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.last_error = None
+        self.thread = None
+    
+    def write_batch(self, entries: List[PlanEntry]):
+        """Deliver entries; raise to report a failure."""
+        raise NotImplementedError
+    
+    def close(self):
+        """Release any resources the sink holds."""
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self.thread.start()
+    
+    def offer(self, entries: List[PlanEntry]):
+        """Queue entries according to the sink's policy."""
+        deadline = time.monotonic() + SINK_BLOCK_TIMEOUT
+        for entry in entries:
+            try:
+                if self.policy == 'block':
+                    self.queue.put(entry, timeout=max(0, deadline - time.monotonic()))
+                else:
+                    self.queue.put_nowait(entry)
+            except queue.Full:
+                self.dropped += 1
+    
+    def stop(self, timeout: float = SINK_STOP_TIMEOUT):
+        """Deliver what is queued within timeout seconds, then stop the worker.
+        
+        A worker still busy after that is left to finish on its own (it is
+        a daemon thread), and the sink is not closed under it.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        if self.thread is not None:
+            self.thread.join(max(0, deadline - time.monotonic()))
+            if self.thread.is_alive():
+                print(f"Log sink {self.name} did not finish within {timeout:g}s, "
+                      f"{self.queue.qsize()} entries not written", file=sys.stderr)
+                return
+        self.close()
+    
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            if batch:
+                self._deliver(batch)
+            if stopping:
+                return
+    
+    def _deliver(self, batch: List[PlanEntry]):
+        try:
+            with tracing.span(f"sink {self.name}", 'log', entries=len(batch)):
+                self.write_batch(batch)
+        except Exception as e:
+            if self.last_error is None:
+                # Report the start of a failure streak, not every batch
+                print(f"Log sink {self.name} failed: {e}")
+            self.failed += len(batch)
+            self.last_error = str(e)
+        else:
+            self.written += len(batch)
+            self.last_error = None
+    
+    def stats(self) -> Dict:
+        return {
+            'policy': self.policy,
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'last_error': self.last_error,
+        }
+
+
+class TextSink(Sink):
+    """The human-readable plan log."""
+    
+    OPTIONS = ('path',)
+    
+    def __init__(self, path, **kwargs):
+        super().__init__(kwargs.pop('name', 'text'), **kwargs)
+        self.log_writer = LogWriter(Path(path).expanduser())
+    
+    def write_batch(self, entries: List[PlanEntry]):
+        self.log_writer.write_plan_logs(entries)
+
+
+class CSVSink(Sink):
+    """The CSV plan log (same columns the importer reads)."""
+    
+    OPTIONS = ('path',)
+    
+    def __init__(self, path, **kwargs):
+        super().__init__(kwargs.pop('name', 'csv'), **kwargs)
+        # LogWriter derives the .csv path from the log path
+        self.log_writer = LogWriter(Path(path).expanduser().with_suffix('.csv'))
+    
+    def write_batch(self, entries: List[PlanEntry]):
+        self.log_writer.write_csv_logs(entries)
+
+
+class JSONLSink(Sink):
+    """JSON Lines log in the export schema."""
+    
+    OPTIONS = ('path',)
+    
+    def __init__(self, path, **kwargs):
+        super().__init__(kwargs.pop('name', 'jsonl'), **kwargs)
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+    
+    def write_batch(self, entries: List[PlanEntry]):
+        lines = ''.join(_encode_record(_export_record(entry)) + '\n' for entry in entries)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class SyslogSink(Sink):
+    """Local syslog over its Unix datagram socket."""
+    
+    # user.info
+    PRIORITY = 14
+    
+    OPTIONS = ('address',)
+    
+    def __init__(self, address: Optional[str] = None, **kwargs):
+        super().__init__(kwargs.pop('name', 'syslog'), **kwargs)
+        if address is None:
+            address = next((path for path in SYSLOG_SOCKETS if os.path.exists(path)), SYSLOG_SOCKETS[0])
+        self.address = address
+        self.sock = None
+    
+    def write_batch(self, entries: List[PlanEntry]):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.sock.settimeout(SYSLOG_TIMEOUT)
+            try:
+                self.sock.connect(self.address)
+            except OSError:
+                self.sock.close()
+                self.sock = None
+                raise
+        for entry in entries:
+            message = f"<{self.PRIORITY}>periodic_prompter: {json.dumps(_export_record(entry), ensure_ascii=False)}"
+            try:
+                self.sock.send(message.encode('utf-8'))
+            except OSError:
+                # Reconnect on the next batch (syslogd may have restarted)
+                self.sock.close()
+                self.sock = None
+                raise
+    
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+SINK_TYPES = {
+    'text': TextSink,
+    'csv': CSVSink,
+    'jsonl': JSONLSink,
+    'syslog': SyslogSink,
+}
+
+
+class SinkPipeline:
+    """Bounded queue plus a fan-out stage feeding every sink in batches."""
+    
+    def __init__(self, sinks: List[Sink], queue_size: int = PIPELINE_QUEUE_SIZE,
+                 batch_size: int = SINK_BATCH_SIZE):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.queue = queue.Queue(queue_size)
+        self.dropped = 0
+        self.closed = False
+        for sink in self.sinks:
+            sink.start()
+        self.thread = threading.Thread(target=self._fan_out, name='sink-pipeline', daemon=True)
+        self.thread.start()
+        # Flush what is still queued when the app quits
+        atexit.register(self.close)
+    
+    def publish(self, entry: PlanEntry) -> bool:
+        """Queue a saved plan for every sink. Never blocks; False if it was dropped."""
+        try:
+            self.queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+    
+    def _fan_out(self):
+        while True:
+            batch = [self.queue.get()]
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            for sink in self.sinks:
+                sink.offer(batch)
+            if stopping:
+                return
+    
+    def close(self):
+        """Deliver what is queued, waiting a bounded time, then stop all sinks."""
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        try:
+            self.queue.put(_STOP, timeout=SINK_STOP_TIMEOUT)
+        except queue.Full:
+            pass
+        self.thread.join(SINK_STOP_TIMEOUT)
+        for sink in self.sinks:
+            sink.stop()
+    
+    def stats(self) -> Dict:
+        return {
+            'queued': self.queue.qsize(),
+            'dropped': self.dropped,
+            'sinks': {sink.name: sink.stats() for sink in self.sinks},
+        }
+
+
+def build_sinks(settings) -> List[Sink]:
+    """Create the sinks configured in settings.
+    
+    The 'sinks' setting lists sinks explicitly; without it the classic
+    create_log / create_csv_log settings decide.
+    """
+    if settings is None:
+        return []
+    
+    configs = settings.get('sinks') or []
+    if not configs and settings.get('create_log', True):
+        log_path = settings.get('log_file_path', '~/periodic_prompter_log.txt')
+        configs = [{'type': 'text', 'path': log_path}]
+        if settings.get('create_csv_log', False):
+            configs.append({'type': 'csv', 'path': log_path})
+    
+    sinks = []
+    for config in configs:
+        config = dict(config)
+        sink_type = config.pop('type', None)
+        sink_class = SINK_TYPES.get(sink_type)
+        if sink_class is None:
+            print(f"Unknown log sink type {sink_type!r}, ignoring it", file=sys.stderr)
+            continue
+        unknown = sorted(key for key in config if key not in Sink.COMMON_OPTIONS + sink_class.OPTIONS)
+        if unknown:
+            print(f"Ignoring unknown {sink_type} sink settings: {', '.join(unknown)}", file=sys.stderr)
+            for key in unknown:
+                del config[key]
+        try:
+            sinks.append(sink_class(**config))
+        except Exception as e:
+            print(f"Error setting up {sink_class.__name__}: {e}", file=sys.stderr)
+    return sinks
@@ -1,35 +1,827 @@
-"""Persistent storage for user plans and logs."""
+"""Persistent storage for user plans and logs.
+
+Plan history is kept as a checksummed snapshot (``plans.json``) plus an
+append-only journal (``plans.journal``) of changes made since the snapshot
+was written. Every write goes through a temp file, ``fsync`` and rename (or
+an fsync'd journal append), so a crash can never leave a half-written
+history behind. The previous snapshot is kept as ``plans.json.bak`` together
+with the journal segment that follows it, which lets us recover the full
+history if the newest snapshot is ever damaged.
+
+With the "binary" storage format the snapshot is ``plans.bin`` instead (see
+binformat.py); the journal is the same in both formats.
+
+Snapshots are normalized (schema version 3): every entry has a stable id,
+a previous plan that was the plan of the entry just before is stored as
+that entry's previous_id, and repeated plan texts are kept once in the
+snapshot's strings table and referred to by index. Journal records stay
+self-contained, flat entries.
+"""
 
 import json
 import csv
+import hashlib
+import mmap
 import os
-from datetime import datetime
+import queue
+import re
+import shutil
+import sqlite3
+import threading
+import zlib
+from array import array
+from concurrent.futures import Future
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter import binformat, tracing
+    from periodic_prompter.events import HistoryChanged, PlanAmended, PlanSaved
+    from periodic_prompter.locking import FileLock
+    from periodic_prompter.models import CompletionStatus, EntryNormalizer, PlanEntry
+    from periodic_prompter.paging import PAGE_RECORDS, PagedView, PagingStats, release_pages
+    from periodic_prompter.rollups import ROLLUPS_VERSION, DailyRollups
+except ImportError:
+    from . import binformat, tracing
+    from .events import HistoryChanged, PlanAmended, PlanSaved
+    from .locking import FileLock
+    from .models import CompletionStatus, EntryNormalizer, PlanEntry
+    from .paging import PAGE_RECORDS, PagedView, PagingStats, release_pages
+    from .rollups import ROLLUPS_VERSION, DailyRollups
+
+
+DEFAULT_DATA_DIR = Path.home() / '.local' / 'share' / 'periodic_prompter'
+
+SNAPSHOT_FORMAT = 'periodic_prompter.plans'
+
+# Version of the record and current-state layout written by this code
+SCHEMA_VERSION = 3
+
+# Records rewritten per step by the background migration, and the pause
+# between steps that keeps it from competing with the app
+MIGRATION_BATCH_SIZE = 5000
+MIGRATION_PAUSE = 0.01
+
+# Snapshot file for each storage format
+SNAPSHOT_FILES = {
+    'json': 'plans.json',
+    'binary': 'plans.bin',
+}
+
+# Number of journal records after which the journal is folded into a new snapshot
+JOURNAL_COMPACT_THRESHOLD = 200
+
+# Journal size that also triggers compaction (bulk imports write large records)
+JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024
+
+# Upper bound on the number of queued requests folded into one commit
+WRITER_MAX_BATCH = 256
+
+# Seconds between checks for other processes' writes while events are published
+CHANGE_POLL_INTERVAL = 60
+
+# Stable column layout shared by the JSON Lines and SQLite exports
+EXPORT_SCHEMA_VERSION = 1
+EXPORT_SCHEMA = (
+    ('timestamp', 'TEXT NOT NULL'),
+    ('epoch', 'INTEGER NOT NULL'),
+    ('plan', 'TEXT NOT NULL'),
+    ('previous_plan', 'TEXT NOT NULL'),
+    ('completion_status', 'TEXT NOT NULL'),
+    ('completed', 'INTEGER NOT NULL'),
+)
+
+# Plans written per batch by the streaming exporters
+EXPORT_BATCH_SIZE = 1000
+
+# Bytes of a mapped JSON snapshot searched at a time for record ids
+ID_SCAN_BYTES = 4 * 1024 * 1024
+
+# Records of a mapped JSON snapshot parsed together when scanning: the
+# first run is short for small reads, later ones grow to the larger size
+SCAN_RECORDS_FIRST = 64
+SCAN_RECORDS = 2048
+
+# The id at the start of a JSON snapshot record line
+_RECORD_ID = re.compile(rb'^\{"id":(\d+)', re.M)
+
+
+class StorageCorruptionError(Exception):
+    """Raised when stored plan data fails validation and cannot be recovered."""
+
+
+def _fsync_dir(dir_path: Path):
+    """Flush a directory entry so a rename survives a crash."""
+    try:
+        fd = os.open(str(dir_path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(file_path: Path, data: bytes):
+    """Durably replace file_path with data (temp file, fsync, rename)."""
+    tmp_path = file_path.with_name(file_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    _fsync_dir(file_path.parent)
+
+
+# Schema migrations, keyed by (kind, from_version). Each takes a record of
+# that version and returns it in the layout of its to_version.
+MIGRATIONS = {}
+
+
+def migration(kind: str, from_version: int, to_version: int):
+    """Register a migration of 'plan' records or the 'state' file."""
+    def register(func):
+        MIGRATIONS[(kind, from_version)] = (to_version, func)
+        return func
+    return register
+
+
+def upgrade(kind: str, record: Dict, version: int) -> Dict:
+    """Bring a record of the given schema version up to SCHEMA_VERSION."""
+    while version < SCHEMA_VERSION:
+        if (kind, version) not in MIGRATIONS:
+            raise ValueError(f"no migration for {kind} schema version {version}")
+        version, func = MIGRATIONS[(kind, version)]
+        record = func(record)
+    return record
+
+
+def _normalize_status(value) -> str:
+    status = str(value or '').strip().lower()
+    return status if status in ('yes', 'no', 'partially') else ''
+
+
+@migration('plan', 1, 3)
+def _plan_v1_to_v3(record: Dict) -> Dict:
+    """Normalize completion statuses and fill in keys older files could omit.
+    
+    Legacy entries have no id; it stays 0 until the reader numbers them by
+    position.
+    """
+    return {
+        'id': 0,
+        'timestamp': record['timestamp'],
+        'plan': record.get('plan') or '',
+        'previous_plan': record.get('previous_plan') or '',
+        'completion_status': _normalize_status(record.get('completion_status')),
+        'completed': bool(record.get('completed', False)),
+    }
+
+
+@migration('state', 1, 3)
+def _state_v1_to_v3(state: Dict) -> Dict:
+    return {
+        'current_plan': state.get('current_plan') or '',
+        'plan_start_time': state.get('plan_start_time') or '',
+        'last_completion_status': _normalize_status(state.get('last_completion_status')),
+        'current_id': 0,
+    }
+
+
+def _text(value, strings: List[str]) -> str:
+    """Plan text stored inline, or as an index into the snapshot's strings table."""
+    if isinstance(value, int):
+        if not 0 <= value < len(strings):
+            raise ValueError(f"no string {value} in the strings table")
+        return strings[value]
+    return value or ''
+
+
+def _decode_plan(record: Dict, version: int, strings: List[str] = (), prior=None) -> PlanEntry:
+    """Decode a stored plan record, upgrading it first if it is older.
+    
+    A previous_id is resolved by calling prior(), which returns the raw
+    record just before this one.
+    """
+    if version < SCHEMA_VERSION:
+        record = upgrade('plan', record, version)
+    get = record.get
+    previous_id = get('previous_id')
+    if previous_id is not None:
+        before = prior() if prior is not None else None
+        if before is None or before.get('id') != previous_id:
+            raise ValueError(f"entry {get('id')} refers to missing entry {previous_id}")
+        previous_plan = _text(before.get('plan'), strings)
+    else:
+        previous_plan = _text(get('previous_plan'), strings)
+    # Positional, as this runs once per record on a full scan
+    return PlanEntry(record['timestamp'], _text(get('plan'), strings), previous_plan,
+                     get('completion_status', ''), get('completed', False), get('id', 0))
+
+
+def _normalize_plan(entry: PlanEntry, normalizer: EntryNormalizer) -> Dict:
+    """Snapshot record for an entry, leaving out default values."""
+    record = {'id': entry.id, 'timestamp': entry.timestamp_iso, 'plan': normalizer.text(entry.plan)}
+    previous_id = normalizer.previous_id(entry)
+    if previous_id is not None:
+        record['previous_id'] = previous_id
+    elif entry.previous_plan:
+        record['previous_plan'] = normalizer.text(entry.previous_plan)
+    if entry.completion_status is not CompletionStatus.NONE:
+        record['completion_status'] = entry.completion_status.value
+    if entry.completed:
+        record['completed'] = True
+    return record
+
+
+def _strings_line(strings: List[str]) -> bytes:
+    """The strings table as covered by a JSON snapshot's checksum."""
+    return _encode_record(strings).encode('utf-8') + b'\n'
+
+
+def _parse_snapshot_header(first_line: bytes) -> Optional[Dict]:
+    """Header of a JSON snapshot from its first line, or None for a legacy plain list.
+    
+    Raises ValueError if the header is damaged.
+    """
+    if not first_line.endswith(b'"plans": [\n'):
+        return None
+    return json.loads(first_line[:-1] + b']}')
+
+
+def _snapshot_record(line: bytes) -> Optional[bytes]:
+    """A JSON snapshot record line without its separator, or None at the closing line."""
+    line = line.rstrip(b'\n')
+    if line == b']}':
+        return None
+    return line[:-1] if line.endswith(b',') else line
+
+
+def _journal_entries(record: Dict) -> List[PlanEntry]:
+    """Plan entries carried by a journal record."""
+    version = record.get('version', 1)
+    if record['op'] == 'save':
+        return [_decode_plan(record['entry'], version)]
+    return [_decode_plan(entry, version) for entry in record['entries']]
+
+
+def _encode_record(record: Dict) -> str:
+    """Serialize a record to a single compact JSON line."""
+    return json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def _export_record(plan: PlanEntry) -> Dict:
+    """Flatten a plan to the EXPORT_SCHEMA columns."""
+    return {
+        'timestamp': plan.timestamp_iso,
+        'epoch': plan.timestamp,
+        'plan': plan.plan,
+        'previous_plan': plan.previous_plan,
+        'completion_status': plan.completion_status.value,
+        'completed': int(plan.completed),
+    }
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _filter_range(plans: Iterable[PlanEntry], start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> Iterator[PlanEntry]:
+    """Lazily keep plans recorded in [start, end)."""
+    start_epoch = int(start.timestamp()) if start else None
+    end_epoch = int(end.timestamp()) if end else None
+    for plan in plans:
+        if start_epoch is not None and plan.timestamp < start_epoch:
+            continue
+        if end_epoch is not None and plan.timestamp >= end_epoch:
+            continue
+        yield plan
+
+
+def _apply_save(plans: List[PlanEntry], plan_entry: PlanEntry):
+    """Apply a saved plan entry to the in-memory history."""
+    # Mark previous plan as completed if exists
+    if plans and plan_entry.completion_status is not CompletionStatus.NONE:
+        plans[-1].completed = True
+        plans[-1].completion_status = plan_entry.completion_status
+    
+    plans.append(plan_entry.copy())
+
+
+def _changed(plans: Iterable[PlanEntry], last_id: int) -> Iterator[PlanEntry]:
+    """Entries with ids above last_id, each preceded by an older entry it may have answered."""
+    previous = None
+    for plan in plans:
+        if plan.id > last_id:
+            if previous is not None and previous.id <= last_id and \
+                    plan.completion_status is not CompletionStatus.NONE:
+                yield previous
+            yield plan
+        previous = plan
+
+
+def _apply_import(plans: List[PlanEntry], entries: List[PlanEntry]):
+    """Merge imported entries into the in-memory history by timestamp.
+    
+    Imported entries keep their own completion state; the history stays
+    ordered by time (the sort is a linear merge of two sorted runs).
+    """
+    plans.extend(entry.copy() for entry in entries)
+    plans.sort(key=lambda plan: plan.timestamp_us)
+
+
+def _open_files(paths: Iterable[Path]) -> Dict:
+    """Open each path for reading as {path: (file or None if missing, size)}."""
+    files = {}
+    for path in paths:
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            files[path] = (None, 0)
+        else:
+            files[path] = (f, os.fstat(f.fileno()).st_size)
+    return files
+
+
+def _read_history(files: Dict, snapshots: Tuple[Path, Path], journals: Tuple[Path, Path],
+                  missing_ok: bool = False) -> Dict:
+    """Rebuild the history from open files (see _open_files).
+    
+    snapshots are the primary and backup snapshot paths, journals the
+    previous and active journal paths. With missing_ok, having neither
+    snapshot means the journals are replayed onto an empty history.
+    """
+    def read_snapshot(path):
+        f, _ = files[path]
+        if f is None:
+            raise FileNotFoundError(f"{path} does not exist")
+        return PlanStorage._read_snapshot(path, f)
+    
+    plans_file, backup_file = snapshots
+    source = plans_file
+    primary_error = None
+    try:
+        seq, plans = read_snapshot(plans_file)
+    except (FileNotFoundError, StorageCorruptionError) as e:
+        primary_error = e
+        source = backup_file
+        try:
+            seq, plans = read_snapshot(backup_file)
+        except FileNotFoundError:
+            if not (missing_ok and isinstance(e, FileNotFoundError)):
+                raise StorageCorruptionError(f"No readable plan history: {e}")
+            seq, plans = 0, []
+        except StorageCorruptionError as backup_error:
+            raise StorageCorruptionError(f"No readable plan history: {e}; {backup_error}")
+    
+    def apply(record, entries):
+        if record['op'] == 'save':
+            _apply_save(plans, entries[0])
+        elif record['op'] == 'import':
+            _apply_import(plans, entries)
+    
+    state = _replay_journals(files, journals, seq, max((plan.id for plan in plans), default=0) + 1, apply)
+    state.update({'plans': plans, 'source': source, 'primary_error': primary_error})
+    return state
+
+
+def _replay_journals(files: Dict, journals: Tuple[Path, Path], seq: int, next_id: int,
+                     apply: Optional[Callable] = None) -> Dict:
+    """Read the journal records that follow a snapshot at seq.
+    
+    apply(record, entries) is called for each record in order. Returns the
+    seq and next_id reached, any torn tail and the number of records in
+    the active journal.
+    """
+    torn_tail = None
+    journal_records = 0
+    for journal in journals:
+        f, size = files[journal]
+        if f is None:
+            continue
+        records, valid_length, torn = PlanStorage._read_journal(journal, f, size)
+        if torn:
+            torn_tail = (journal, valid_length)
+        if journal == journals[-1]:
+            journal_records = len(records)
+        
+        for record in records:
+            if record['seq'] <= seq:
+                continue
+            if record['seq'] != seq + 1:
+                raise StorageCorruptionError(
+                    f"{journal}: missing journal records {seq + 1}..{record['seq'] - 1}")
+            entries = _journal_entries(record)
+            for entry in entries:
+                if not entry.id:
+                    # Journaled before entries had ids
+                    entry.id = next_id
+                next_id = max(next_id, entry.id + 1)
+            if apply is not None:
+                apply(record, entries)
+            seq = record['seq']
+    
+    return {'seq': seq, 'next_id': next_id, 'torn_tail': torn_tail, 'journal_records': journal_records}
+
+
+def read_data_dir(data_dir) -> List[PlanEntry]:
+    """Full history of a data directory, read without opening it as a PlanStorage.
+    
+    Nothing is locked, created, migrated or repaired, and each file is
+    read once, which suits collected copies of other users' data (see
+    team_report.py).
+    """
+    data_dir = Path(data_dir)
+    storage_format = 'binary' if (data_dir / SNAPSHOT_FILES['binary']).exists() else 'json'
+    plans_file = data_dir / SNAPSHOT_FILES[storage_format]
+    snapshots = (plans_file, plans_file.with_name(plans_file.name + '.bak'))
+    journals = (data_dir / 'plans.journal.1', data_dir / 'plans.journal')
+    files = _open_files(snapshots + journals)
+    try:
+        return _read_history(files, snapshots, journals, missing_ok=True)['plans']
+    finally:
+        for f, _ in files.values():
+            if f is not None:
+                f.close()
+
+
+class SnapshotIndex:
+    """Read-only, memory-mapped view of a snapshot with a record offset table.
+    
+    The offset table is built (and the checksum verified) once per
+    snapshot file; after that a query only decodes the records it touches.
+    Pages are shared through the OS cache between all readers of the file.
+    With a stride above 1 only every stride-th offset is kept and records
+    in between are found by scanning forward, which keeps the table small
+    for paging mode.
+    """
+    
+    def __init__(self, file_path: Path, f, stride: int = 1):
+        st = os.fstat(f.fileno())
+        self.key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self.file_path = file_path
+        self.stride = stride
+        self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._build()
+        except Exception:
+            self.mm.close()
+            raise
+    
+    def _build(self):
+        mm = self.mm
+        header_end = mm.find(b'\n')
+        if header_end == -1 or not mm[:header_end].endswith(b'"plans": ['):
+            raise StorageCorruptionError(f"{self.file_path}: not a line-per-record snapshot")
+        try:
+            header = json.loads(mm[:header_end] + b']}')
+        except ValueError as e:
+            raise StorageCorruptionError(f"{self.file_path}: unreadable snapshot header: {e}")
+        if header.get('format') != SNAPSHOT_FORMAT:
+            raise StorageCorruptionError(f"{self.file_path}: unknown snapshot format {header.get('format')!r}")
+        
+        # starts[i] is the offset of record line i * stride; starts[-1] is the footer
+        starts = array('q')
+        count = 0
+        stride = self.stride
+        digest = hashlib.sha256()
+        view = memoryview(mm)
+        pos = header_end + 1
+        size = len(mm)
+        try:
+            while pos < size:
+                end = mm.find(b'\n', pos)
+                if end == -1:
+                    end = size
+                if mm[pos:end] == b']}':
+                    break
+                if count % stride == 0:
+                    starts.append(pos)
+                count += 1
+                line_end = end - 1 if mm[end - 1:end] == b',' else end
+                digest.update(view[pos:line_end])
+                digest.update(b'\n')
+                pos = end + 1
+            else:
+                raise StorageCorruptionError(f"{self.file_path}: snapshot is truncated")
+        finally:
+            view.release()
+        starts.append(pos)
+        
+        strings = header.get('strings')
+        if strings is not None:
+            digest.update(_strings_line(strings))
+        if count != header.get('count') or digest.hexdigest() != header.get('checksum'):
+            raise StorageCorruptionError(f"{self.file_path}: checksum mismatch")
+        
+        self.seq = int(header.get('seq', 0))
+        self.version = int(header.get('version', 1))
+        self.strings = strings or []
+        self.count = count
+        self.starts = starts
+        self._max_id = None
+    
+    def __len__(self):
+        return self.count
+    
+    @property
+    def max_id(self) -> int:
+        """Largest entry id, read from the start of each record line on first use.
+        
+        Records without an id are numbered by position, so then the count
+        is the largest.
+        """
+        if self._max_id is None:
+            max_id = 0
+            with_ids = 0
+            pos, end = self.starts[0], self.starts[-1]
+            while pos < end:
+                stop = self.mm.find(b'\n', pos + ID_SCAN_BYTES, end) + 1 or end
+                ids = [int(value) for value in _RECORD_ID.findall(self.mm, pos, stop)]
+                max_id = max([max_id] + ids)
+                with_ids += sum(1 for value in ids if value)
+                pos = stop
+            self._max_id = max_id if with_ids == self.count else max(max_id, self.count)
+        return self._max_id
+    
+    @staticmethod
+    def _parse(line: bytes) -> Dict:
+        if line.endswith(b','):
+            line = line[:-1]
+        return json.loads(line)
+    
+    def _raw(self, index: int) -> Dict:
+        """Undecoded record number index."""
+        if self.stride == 1:
+            return self._parse(self.mm[self.starts[index]:self.starts[index + 1] - 1])
+        block, skip = divmod(index, self.stride)
+        pos = self.starts[block]
+        for _ in range(skip):
+            pos = self.mm.find(b'\n', pos) + 1
+        return self._parse(self.mm[pos:self.mm.find(b'\n', pos)])
+    
+    def _decode(self, raw: Dict, index: int, prior_raw: Optional[Dict]) -> PlanEntry:
+        """Decode record number index; prior_raw is the record before, if already read."""
+        def prior():
+            return prior_raw if prior_raw is not None or index == 0 else self._raw(index - 1)
+        entry = _decode_plan(raw, self.version, self.strings, prior)
+        if not entry.id:
+            # Older snapshots number entries by position
+            entry.id = index + 1
+        return entry
+    
+    def record(self, index: int) -> PlanEntry:
+        """Decode record number index."""
+        return self._decode(self._raw(index), index, None)
+    
+    def _parse_lines(self, pos: int, end: int) -> List[Dict]:
+        """Records on the whole lines in mm[pos:end], parsed as one JSON array."""
+        return json.loads(b'[' + self.mm[pos:end].rstrip(b',\n') + b']')
+    
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[PlanEntry]:
+        """Decode records [start, stop) lazily.
+        
+        Lines are parsed a run at a time straight from the mapping, runs
+        growing up to SCAN_RECORDS so a short read parses little extra.
+        """
+        if stop is None:
+            stop = len(self)
+        prior_raw = None
+        index = start
+        run = SCAN_RECORDS_FIRST
+        while index < stop:
+            if self.stride == 1:
+                run_stop = min(stop, index + run)
+                raws = self._parse_lines(self.starts[index], self.starts[run_stop])
+                run = min(run * 2, SCAN_RECORDS)
+            else:
+                # One block of the sparse offset table at a time
+                block = index // self.stride
+                run_stop = min(stop, (block + 1) * self.stride)
+                first = block * self.stride
+                raws = self._parse_lines(self.starts[block], self.starts[block + 1])[index - first:run_stop - first]
+            for raw in raws:
+                yield self._decode(raw, index, prior_raw)
+                prior_raw = raw
+                index += 1
+    
+    def release(self, start: int, stop: int):
+        """Let the OS drop the mapped pages holding records [start, stop)."""
+        last_block = min(-(-stop // self.stride), len(self.starts) - 1)
+        release_pages(self.mm, self.starts[start // self.stride], self.starts[last_block])
+    
+    def bisect_time(self, epoch: int) -> int:
+        """Index of the first record at or after epoch (records are in time order)."""
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self.record(mid).timestamp < epoch:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+
+class StorageWriter:
+    """Single writer thread that owns all storage mutations.
+    
+    Callers from any thread submit requests and get a Future back. The
+    writer drains everything queued since its last commit and hands it to
+    the commit function as one batch, so concurrent saves are serialized
+    (no lost updates) and share a single journal append and fsync.
+    
+    Housekeeping the commit function defers (such as compaction) is
+    committed later in a batch of its own, once no request is waiting, so
+    it never holds up a caller's Future.
+    """
+    
+    def __init__(self, commit_fn, max_batch: int = WRITER_MAX_BATCH,
+                 idle_interval: Optional[float] = None, idle_request=None, on_committed=None):
+        self.commit_fn = commit_fn
+        # Called after each successful commit, once its futures have resolved
+        self.on_committed = on_committed
+        self.max_batch = max_batch
+        # Committed on its own after idle_interval seconds without requests
+        self.idle_interval = idle_interval
+        self.idle_request = idle_request
+        self.queue = queue.Queue()
+        # Deferred requests; only touched on the writer thread
+        self.deferred = []
+        self.writer_thread = None
+        self.lock = threading.Lock()
+        self.commits = 0
+        self.requests_committed = 0
+    
+    def submit(self, request) -> Future:
+        """Queue a request and return a Future for its result."""
+        future = Future()
+        with self.lock:
+            if self.writer_thread is None or not self.writer_thread.is_alive():
+                self.writer_thread = threading.Thread(
+                    target=self._run,
+                    daemon=True,
+                    name="PlanStorageWriter"
+                )
+                self.writer_thread.start()
+            self.queue.put((request, future))
+        return future
+    
+    def defer(self, request):
+        """From the commit function: commit request on its own once the queue is empty."""
+        self.deferred.append(request)
+    
+    def stop(self, timeout: float = 5):
+        """Commit anything still queued and stop the writer thread."""
+        with self.lock:
+            thread = self.writer_thread
+            if thread is None or not thread.is_alive():
+                return
+            self.queue.put(None)
+            self.writer_thread = None
+        thread.join(timeout=timeout)
+    
+    def _run(self):
+        """Writer loop: block for work, drain the queue, commit as one batch."""
+        while True:
+            alone = False
+            try:
+                if self.deferred:
+                    item = self.queue.get_nowait()
+                else:
+                    item = self.queue.get(timeout=self.idle_interval)
+            except queue.Empty:
+                if self.deferred:
+                    item = (self.deferred.pop(0), Future())
+                    alone = True
+                else:
+                    item = (self.idle_request, Future())
+            if item is None:
+                return
+            
+            batch = [item]
+            stop_after = False
+            while not alone and len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop_after = True
+                    break
+                batch.append(item)
+            
+            live = [(request, future) for request, future in batch
+                    if future.set_running_or_notify_cancel()]
+            requests = [request for request, _ in live]
+            futures = [future for _, future in live]
+            try:
+                results = self.commit_fn(requests)
+            except Exception as e:
+                print(f"Error committing plan storage batch: {e}")
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+                self.commits += 1
+                self.requests_committed += len(requests)
+                if self.on_committed is not None:
+                    try:
+                        self.on_committed()
+                    except Exception as e:
+                        print(f"Error after committing plan storage batch: {e}")
+            
+            if stop_after:
+                return
 
 
 class PlanStorage:
     """Manages persistent storage of user plans and completion data."""
     
-    def __init__(self, data_dir=None):
+    def __init__(self, data_dir=None, storage_format: Optional[str] = None,
+                 memory_budget: Optional[int] = None, events=None):
         if data_dir is None:
-            data_dir = Path.home() / '.local' / 'share' / 'periodic_prompter'
+            data_dir = DEFAULT_DATA_DIR
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
-        self.plans_file = self.data_dir / 'plans.json'
+        if storage_format is None:
+            # Use whatever format the data directory is already in
+            storage_format = 'binary' if (self.data_dir / SNAPSHOT_FILES['binary']).exists() else 'json'
+        if storage_format not in SNAPSHOT_FILES:
+            raise ValueError(f"Unknown storage format: {storage_format}")
+        
+        self.storage_format = storage_format
+        self.plans_file = self.data_dir / SNAPSHOT_FILES[storage_format]
+        self.backup_file = self.plans_file.with_name(self.plans_file.name + '.bak')
+        self.journal_file = self.data_dir / 'plans.journal'
+        self.prev_journal_file = self.data_dir / 'plans.journal.1'
         self.current_file = self.data_dir / 'current_state.json'
+        self.rollups_file = self.data_dir / 'rollups.json'
+        
+        # Writer-side bookkeeping, established by _recover()
+        self._compact_deferred = False
+        self._seq = 0
+        self._next_id = 1
+        self._journal_records = 0
+        self._last_journal_key = None
+        self._synced = False
+        # The newest entry in the history, once known, for PlanAmended
+        self._last_entry = None
+        # Events of the last commit, published once its futures resolve
+        self._pending_events = []
+        self.lock = FileLock(self.data_dir / 'plans.lock')
+        
+        # Cached memory-mapped view of the current snapshot for readers
+        self._view = None
+        self._view_lock = threading.Lock()
         
-        # Initialize files if they don't exist
-        self._ensure_files_exist()
+        # Paging mode: decoded records are cached a page at a time within
+        # memory_budget bytes instead of being left to the OS page cache
+        self.paging = PagingStats(memory_budget) if memory_budget else None
+        
+        # EventBus told about every change to the history (see events.py), if
+        # any; the writer then also looks for other processes' writes when idle
+        self.events = events
+        if events is not None:
+            self.writer = StorageWriter(self._commit, idle_interval=CHANGE_POLL_INTERVAL,
+                                        idle_request=('sync',), on_committed=self._publish_events)
+        else:
+            self.writer = StorageWriter(self._commit)
+        
+        # Background schema migration, started by _recover() if needed
+        self._migration = None
+        self._migration_stop = threading.Event()
+        
+        self._recover()
+        if events is not None:
+            # Start the writer now so it polls even before the first save
+            self.writer.submit(('sync',))
     
     def _ensure_files_exist(self):
         """Create data files if they don't exist."""
-        if not self.plans_file.exists():
-            self._save_json(self.plans_file, [])
+        if not self.plans_file.exists() and not self.backup_file.exists():
+            if not self._convert_snapshots():
+                self._write_snapshot(self.plans_file, [], 0)
         
         if not self.current_file.exists():
             self._save_json(self.current_file, {
+                'version': SCHEMA_VERSION,
+                'current_id': 0,
                 'current_plan': '',
                 'plan_start_time': '',
                 'last_completion_status': ''
@@ -47,82 +839,1036 @@ class PlanStorage:
     def _save_json(self, file_path: Path, data):
         """Save data to JSON file."""
         try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
+            _atomic_write(file_path, json.dumps(data, indent=2, default=str).encode('utf-8'))
         except Exception as e:
             print(f"Error saving {file_path}: {e}")
     
-    def save_plan(self, plan: str, completion_status: str = '', previous_plan: str = ''):
-        """Save a new plan entry."""
-        timestamp = datetime.now().isoformat()
-        
-        # Load existing plans
-        plans = self._load_json(self.plans_file)
-        
-        # Create plan entry
-        plan_entry = {
-            'timestamp': timestamp,
-            'plan': plan,
-            'previous_plan': previous_plan,
-            'completion_status': completion_status,
-            'completed': False  # Will be updated when next plan is set
-        }
+    def _convert_snapshots(self) -> bool:
+        """Rewrite another format's snapshots in this storage format.
+        
+        Called when the storage format setting has changed. Both snapshots
+        are converted losslessly and keep their sequence numbers, so the
+        shared journal still applies; the originals are then renamed to
+        *.converted so they can never be read as stale history. Returns
+        False if there is nothing to convert.
+        """
+        converted = False
+        for name in SNAPSHOT_FILES.values():
+            source = self.data_dir / name
+            if source == self.plans_file:
+                continue
+            for old, new in ((source, self.plans_file),
+                             (source.with_name(source.name + '.bak'), self.backup_file)):
+                if not old.exists():
+                    continue
+                try:
+                    seq, plans = self._read_snapshot(old)
+                except StorageCorruptionError as e:
+                    print(f"Warning: not converting damaged snapshot: {e}")
+                    continue
+                self._write_snapshot(new, plans, seq)
+                os.replace(old, old.with_name(old.name + '.converted'))
+                stale_index = old.with_name(old.name + '.idx')
+                if stale_index.exists():
+                    stale_index.unlink()
+                print(f"Converted {old} to {new}")
+                converted = True
+        return converted
+    
+    # Snapshot and journal format
+    
+    def _write_snapshot(self, file_path: Path, plans: List[PlanEntry], seq: int):
+        """Durably write a snapshot of the full history.
         
-        # Mark previous plan as completed if exists
-        if plans and completion_status:
-            plans[-1]['completed'] = True
-            plans[-1]['completion_status'] = completion_status
+        The JSON snapshot is valid JSON with one record per line; the header
+        line carries the journal sequence number it includes and a SHA-256 of
+        the record lines so damage can be detected on load. The binary
+        snapshot carries the same information in its file header.
         
-        plans.append(plan_entry)
+        plans is normally a list; any other iterable is streamed through a
+        side file so the history never has to be held in memory.
+        """
+        if not isinstance(plans, list):
+            self._stream_snapshot(file_path, plans, seq)
+            return
         
-        # Save updated plans
-        self._save_json(self.plans_file, plans)
+        if self.storage_format == 'binary':
+            _atomic_write(file_path, binformat.encode_snapshot(plans, seq))
+            return
         
-        # Update current state
-        current_state = {
-            'current_plan': plan,
-            'plan_start_time': timestamp,
-            'last_completion_status': completion_status
+        normalizer = EntryNormalizer()
+        lines = [_encode_record(_normalize_plan(plan, normalizer)) for plan in plans]
+        digest = hashlib.sha256()
+        for line in lines:
+            digest.update(line.encode('utf-8'))
+            digest.update(b'\n')
+        digest.update(_strings_line(normalizer.strings))
+        
+        body = ',\n'.join(lines)
+        text = self._snapshot_header(seq, len(lines), digest.hexdigest(), normalizer.strings) + \
+            (body + '\n' if body else '') + ']}\n'
+        _atomic_write(file_path, text.encode('utf-8'))
+    
+    def _stream_snapshot(self, file_path: Path, plans: Iterable[PlanEntry], seq: int):
+        """Durably write a snapshot from an iterable, in bounded memory.
+        
+        The body is written first, because the header carries the count and
+        checksum, then the header and body are joined into file_path.
+        """
+        body_path = file_path.with_name(file_path.name + '.body')
+        tmp_path = file_path.with_name(file_path.name + '.tmp')
+        binary = self.storage_format == 'binary'
+        normalizer = EntryNormalizer()
+        digest = hashlib.sha256()
+        count = 0
+        try:
+            with open(body_path, 'w+b') as body:
+                for batch in _batched(plans, EXPORT_BATCH_SIZE):
+                    if binary:
+                        chunk = binformat.encode_records(batch, normalizer)
+                        digest.update(chunk)
+                    else:
+                        lines = [_encode_record(_normalize_plan(plan, normalizer)).encode('utf-8')
+                                 for plan in batch]
+                        for line in lines:
+                            digest.update(line)
+                            digest.update(b'\n')
+                        chunk = (b',\n' if count else b'') + b',\n'.join(lines)
+                    body.write(chunk)
+                    count += len(batch)
+                if count and not binary:
+                    body.write(b'\n')
+                
+                if binary:
+                    strings_offset = binformat.FILE_HEADER.size + body.tell()
+                    table = binformat.encode_strings(normalizer.strings)
+                    body.write(table)
+                    digest.update(table)
+                    header = binformat.encode_header(seq, count, digest.digest(), strings_offset)
+                else:
+                    digest.update(_strings_line(normalizer.strings))
+                    header = self._snapshot_header(seq, count, digest.hexdigest(),
+                                                   normalizer.strings).encode('utf-8')
+                body.seek(0)
+                with open(tmp_path, 'wb') as out:
+                    out.write(header)
+                    shutil.copyfileobj(body, out)
+                    if not binary:
+                        out.write(b']}\n')
+                    out.flush()
+                    os.fsync(out.fileno())
+            os.replace(tmp_path, file_path)
+            _fsync_dir(file_path.parent)
+        finally:
+            for path in (body_path, tmp_path):
+                if path.exists():
+                    path.unlink()
+    
+    @staticmethod
+    def _snapshot_header(seq: int, count: int, checksum: str, strings: List[str]) -> str:
+        """First line of a JSON snapshot, opening its "plans" array.
+        
+        The checksum covers the record lines followed by the strings table.
+        """
+        header = {
+            'format': SNAPSHOT_FORMAT,
+            'version': SCHEMA_VERSION,
+            'seq': seq,
+            'count': count,
+            'checksum': checksum,
+            'strings': strings,
         }
-        self._save_json(self.current_file, current_state)
+        return json.dumps(header)[:-1] + ', "plans": [\n'
+    
+    @staticmethod
+    def _read_snapshot(file_path: Path, f=None) -> Tuple[int, List[PlanEntry]]:
+        """Read and verify a snapshot, returning (seq, plans).
+        
+        Reads from f if an already-open binary file is given. Raises
+        FileNotFoundError if the file is missing and StorageCorruptionError
+        if it does not verify.
+        """
+        if f is None:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        else:
+            data = f.read()
+        if binformat.is_binary(data):
+            try:
+                return binformat.decode_snapshot(data)
+            except ValueError as e:
+                raise StorageCorruptionError(f"{file_path}: {e}")
+        
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise StorageCorruptionError(f"{file_path}: {e}")
+        
+        if text.lstrip().startswith('['):
+            # Legacy plain JSON list written before snapshots had a header
+            try:
+                plans = json.loads(text)
+            except ValueError as e:
+                raise StorageCorruptionError(f"{file_path}: unreadable legacy history: {e}")
+            if not isinstance(plans, list):
+                raise StorageCorruptionError(f"{file_path}: legacy history is not a list")
+            try:
+                plans = [_decode_plan(plan, 1) for plan in plans]
+            except (KeyError, TypeError, ValueError) as e:
+                raise StorageCorruptionError(f"{file_path}: unreadable legacy record: {e}")
+            for index, plan in enumerate(plans):
+                plan.id = index + 1
+            return 0, plans
+        
+        lines = text.split('\n')
+        if lines and lines[-1] == '':
+            lines.pop()
+        if len(lines) < 2 or lines[-1] != ']}':
+            raise StorageCorruptionError(f"{file_path}: snapshot is truncated")
+        
+        try:
+            header = json.loads(lines[0] + ']}')
+        except ValueError as e:
+            raise StorageCorruptionError(f"{file_path}: unreadable snapshot header: {e}")
+        if header.get('format') != SNAPSHOT_FORMAT:
+            raise StorageCorruptionError(f"{file_path}: unknown snapshot format {header.get('format')!r}")
+        
+        version = int(header.get('version', 1))
+        strings = header.get('strings')
+        digest = hashlib.sha256()
+        plans = []
+        raw = None
+        for index, line in enumerate(lines[1:-1]):
+            if line.endswith(','):
+                line = line[:-1]
+            digest.update(line.encode('utf-8'))
+            digest.update(b'\n')
+            prior_raw = raw
+            try:
+                raw = json.loads(line)
+                plan = _decode_plan(raw, version, strings or [], lambda: prior_raw)
+            except (KeyError, TypeError, ValueError) as e:
+                raise StorageCorruptionError(f"{file_path}: unreadable record: {e}")
+            if not plan.id:
+                # Older snapshots number entries by position
+                plan.id = index + 1
+            plans.append(plan)
+        if strings is not None:
+            digest.update(_strings_line(strings))
+        
+        if len(plans) != header.get('count') or digest.hexdigest() != header.get('checksum'):
+            raise StorageCorruptionError(f"{file_path}: checksum mismatch")
         
-        return plan_entry
+        return int(header.get('seq', 0)), plans
+    
+    @staticmethod
+    def _read_journal(file_path: Path, f=None, size: int = -1) -> Tuple[List[Dict], int, bool]:
+        """Read journal records, returning (records, valid_length, torn_tail).
+        
+        Each line is "<crc32> <json>". A damaged final line is the signature
+        of a crash mid-append and is reported as a torn tail; damage anywhere
+        else raises StorageCorruptionError. If an open file is given, only
+        its first size bytes are read.
+        """
+        if f is None:
+            try:
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return [], 0, False
+        else:
+            data = f.read(size)
+        
+        records = []
+        offset = 0
+        while offset < len(data):
+            newline = data.find(b'\n', offset)
+            line_end = len(data) if newline == -1 else newline + 1
+            record = PlanStorage._decode_journal_line(data[offset:line_end]) if newline != -1 else None
+            if record is None:
+                if line_end < len(data):
+                    raise StorageCorruptionError(f"{file_path}: damaged journal record at byte {offset}")
+                return records, offset, True
+            records.append(record)
+            offset = line_end
+        
+        return records, offset, False
+    
+    @staticmethod
+    def _decode_journal_line(line: bytes) -> Optional[Dict]:
+        """Decode one journal line, or return None if it fails its CRC."""
+        try:
+            crc_hex, payload = line.rstrip(b'\n').split(b' ', 1)
+            if int(crc_hex, 16) != zlib.crc32(payload):
+                return None
+            return json.loads(payload.decode('utf-8'))
+        except ValueError:
+            return None
+    
+    def _append_journal(self, records: List[Dict]):
+        """Durably append records to the active journal."""
+        chunk = bytearray()
+        for record in records:
+            payload = _encode_record(record).encode('utf-8')
+            chunk += b'%08x ' % zlib.crc32(payload) + payload + b'\n'
+        
+        with tracing.span('journal append', 'storage', records=len(records), bytes=len(chunk)):
+            with open(self.journal_file, 'ab') as f:
+                f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _open_history(self, lock: bool = True) -> Dict:
+        """Open a consistent set of history files for reading.
+        
+        The shared lock is held only while the files are opened and the
+        journal lengths recorded; the reads happen afterwards on the open
+        descriptors, which stay valid across a concurrent compaction's
+        renames, so readers never hold up the writer.
+        """
+        paths = (self.plans_file, self.backup_file, self.prev_journal_file, self.journal_file)
+        if not lock:
+            return _open_files(paths)
+        with self.lock.shared():
+            return _open_files(paths)
+    
+    def _load_state(self, lock: bool = True) -> Dict:
+        """Load the full history from snapshot and journals.
+        
+        Falls back to the backup snapshot if the primary one is damaged or
+        missing, and raises StorageCorruptionError rather than ever returning
+        an empty history in place of unreadable data. Pass lock=False when
+        the caller already holds the exclusive lock.
+        """
+        files = self._open_history(lock)
+        try:
+            return _read_history(files, (self.plans_file, self.backup_file),
+                                 (self.prev_journal_file, self.journal_file))
+        finally:
+            for f, _ in files.values():
+                if f is not None:
+                    f.close()
+    
+    def _load_plans(self) -> List[PlanEntry]:
+        """Load the full plan history."""
+        return self._load_state()['plans']
+    
+    def _history(self, lock: bool = True) -> Dict:
+        """The history as {'plans', 'seq', 'primary_error'}, streamed when paging.
+        
+        With paging on, plans is an iterator over the paged view and the
+        journal saves, so the history is never held in memory; otherwise,
+        or when the view does not apply, it is the list from a full load.
+        """
+        if self.paging:
+            read = self._read_view(lock)
+            if read is not None:
+                view, saves = read
+                return {'plans': self._iter_view(view, saves, None, None),
+                        'seq': view.seq + len(saves), 'primary_error': None}
+        return self._load_state(lock)
+    
+    def _read_view(self, lock: bool = True) -> Optional[Tuple]:
+        """Memory-mapped snapshot plus the journal saves made since it.
+        
+        Returns None when the fast path does not apply (legacy or damaged
+        snapshot, or journaled imports that reorder history); callers then
+        fall back to a full load, which also handles recovery. Pass
+        lock=False when the caller already holds the exclusive lock.
+        """
+        files = self._open_history(lock)
+        try:
+            view = self._snapshot_view(files)
+            if view is None:
+                return None
+            
+            # A valid primary snapshot already covers the rotated journal
+            seq = view.seq
+            saves = []
+            jf, size = files[self.journal_file]
+            if jf is not None:
+                records, _, _ = self._read_journal(self.journal_file, jf, size)
+                for record in records:
+                    if record['seq'] <= seq:
+                        continue
+                    if record['seq'] != seq + 1 or record['op'] != 'save':
+                        return None
+                    entries = _journal_entries(record)
+                    if not entries[0].id:
+                        # Journaled before entries had ids; a full load numbers it
+                        return None
+                    saves.extend(entries)
+                    seq = record['seq']
+            return view, saves
+        except StorageCorruptionError:
+            return None
+        finally:
+            for f, _ in files.values():
+                if f is not None:
+                    f.close()
+    
+    def _snapshot_view(self, files: Dict):
+        """The cached view of the primary snapshot opened in files, mapping it if it changed.
+        
+        Returns None if the snapshot is missing, damaged or a legacy plain list.
+        """
+        f, _ = files[self.plans_file]
+        if f is None:
+            return None
+        
+        st = os.fstat(f.fileno())
+        with self._view_lock:
+            view = self._view
+            if view is None or view.key != (st.st_ino, st.st_size, st.st_mtime_ns):
+                try:
+                    if binformat.is_binary(os.pread(f.fileno(), len(binformat.MAGIC), 0)):
+                        view = binformat.BinarySnapshot(self.plans_file, f)
+                    else:
+                        view = SnapshotIndex(self.plans_file, f,
+                                             stride=PAGE_RECORDS if self.paging else 1)
+                except (StorageCorruptionError, ValueError):
+                    return None
+                if self.paging:
+                    if self._view is not None:
+                        self._view.drop()
+                    view = PagedView(view, self.paging)
+                # A replaced view is unmapped once running iterators drop it
+                self._view = view
+        return view
+    
+    def _scan_state(self) -> Optional[Dict]:
+        """Writer bookkeeping from the snapshot header and the journals alone.
+        
+        The primary snapshot is verified and mapped as it is for readers,
+        but none of its records are decoded. Returns None if it cannot be
+        mapped (missing, damaged or a legacy plain list); a full load is
+        needed then. Called with the exclusive lock held.
+        """
+        files = self._open_history(lock=False)
+        try:
+            view = self._snapshot_view(files)
+            if view is None:
+                return None
+            # A valid primary snapshot already covers the rotated journal
+            return _replay_journals(files, (self.journal_file,), view.seq, view.max_id + 1)
+        finally:
+            for f, _ in files.values():
+                if f is not None:
+                    f.close()
+    
+    def _tail(self, limit: int, lock: bool = True) -> List[PlanEntry]:
+        """The last limit entries, decoding only those records."""
+        read = self._read_view(lock)
+        if read is None:
+            plans = self._load_state(lock)['plans']
+            return plans[-limit:] if limit > 0 else []
+        
+        view, saves = read
+        count = len(view)
+        plans = list(view.records(max(0, count - limit), count))
+        for plan_entry in saves:
+            _apply_save(plans, plan_entry)
+        return plans[-limit:] if limit > 0 else []
+    
+    def _iter_view(self, view, saves: List[PlanEntry],
+                   start_epoch: Optional[int], end_epoch: Optional[int]) -> Iterator[PlanEntry]:
+        """Stream entries in [start_epoch, end_epoch) from the mapped snapshot and journal."""
+        def in_range(plan):
+            return (start_epoch is None or plan.timestamp >= start_epoch) and \
+                (end_epoch is None or plan.timestamp < end_epoch)
+        
+        # The newest snapshot record is held back because the first journal
+        # save may still mark it completed
+        held = None
+        first = view.bisect_time(start_epoch) if start_epoch is not None else 0
+        for plan in view.records(first):
+            if held is not None and in_range(held):
+                yield held
+            held = plan
+            if end_epoch is not None and plan.timestamp >= end_epoch and not saves:
+                break
+        
+        for plan_entry in saves:
+            if held is not None and plan_entry.completion_status is not CompletionStatus.NONE:
+                held.completed = True
+                held.completion_status = plan_entry.completion_status
+            if held is not None and in_range(held):
+                yield held
+            held = plan_entry.copy()
+        
+        if held is not None and in_range(held):
+            yield held
+    
+    def _recover(self):
+        """Validate stored history on startup and repair what can be repaired."""
+        with self.lock.exclusive():
+            # Initialize files if they don't exist
+            self._ensure_files_exist()
+            version = self._snapshot_version()
+            if version == 1 and not self.backup_file.exists():
+                # A legacy plain list can only be read whole; leave that to the
+                # migration below and to the first commit, off the startup path
+                self.writer.submit(('rebuild_rollups',))
+            else:
+                self._sync_tail(force=True)
+        
+        if self.storage_format == 'json' and version < SCHEMA_VERSION:
+            # Older records are upgraded as they are read; rewrite them in
+            # the background rather than holding up startup
+            self._migration = threading.Thread(target=self._migrate_snapshot,
+                                               name='storage-migration', daemon=True)
+            self._migration.start()
+        elif self.storage_format == 'binary' and version < SCHEMA_VERSION:
+            # Rewriting a binary snapshot is one compaction on the writer thread
+            self.writer.submit(('compact',))
+    
+    # Schema migration
+    
+    def _snapshot_version(self) -> int:
+        """Schema version of the primary snapshot, from its first line."""
+        try:
+            with open(self.plans_file, 'rb') as f:
+                start = f.read(len(binformat.MAGIC))
+                if binformat.is_binary(start):
+                    return SCHEMA_VERSION
+                if start.lstrip().startswith(b'['):
+                    # A legacy plain list, possibly all on one line
+                    return 1
+                first_line = start + f.readline()
+        except FileNotFoundError:
+            return SCHEMA_VERSION
+        try:
+            header = _parse_snapshot_header(first_line)
+        except ValueError:
+            return SCHEMA_VERSION  # damaged; recovery deals with it
+        # Anything else is a legacy plain list
+        return 1 if header is None else int(header.get('version', 1))
+    
+    def _iter_raw_snapshot(self, f) -> Tuple[int, int, Iterator[Dict]]:
+        """Stream (version, seq, records) from an open JSON snapshot.
+        
+        The records iterator verifies the checksum once it is exhausted and
+        raises StorageCorruptionError on a mismatch.
+        """
+        header = _parse_snapshot_header(f.readline())
+        if header is None:
+            # Legacy plain list; a one-off parse of the old file
+            f.seek(0)
+            return 1, 0, iter(json.load(f))
+        
+        def records():
+            digest = hashlib.sha256()
+            count = 0
+            for line in f:
+                line = _snapshot_record(line)
+                if line is None:
+                    break
+                digest.update(line + b'\n')
+                count += 1
+                yield json.loads(line)
+            if header.get('strings') is not None:
+                digest.update(_strings_line(header['strings']))
+            if count != header.get('count') or digest.hexdigest() != header.get('checksum'):
+                raise StorageCorruptionError(f"{self.plans_file}: checksum mismatch")
+        
+        return int(header.get('version', 1)), int(header.get('seq', 0)), records()
+    
+    def _migrate_snapshot(self):
+        """Rewrite an older-version snapshot in the current schema.
+        
+        Runs on its own thread. Records are upgraded and written to a side
+        file in batches with a pause between them, so saves and reads carry
+        on meanwhile; the writer thread then swaps the result in, unless a
+        compaction has already replaced the old snapshot.
+        """
+        body_path = self.plans_file.with_name(self.plans_file.name + '.migrating')
+        try:
+            with self.lock.shared():
+                f = open(self.plans_file, 'rb')
+            with f:
+                st = os.fstat(f.fileno())
+                version, seq, records = self._iter_raw_snapshot(f)
+                
+                normalizer = EntryNormalizer()
+                digest = hashlib.sha256()
+                count = 0
+                with open(body_path, 'wb') as out:
+                    for record in records:
+                        # Older records have no previous_id, so need no prior record
+                        plan = _decode_plan(record, version)
+                        plan.id = plan.id or count + 1
+                        line = _encode_record(_normalize_plan(plan, normalizer)).encode('utf-8')
+                        out.write(b',\n' + line if count else line)
+                        digest.update(line + b'\n')
+                        count += 1
+                        if count % MIGRATION_BATCH_SIZE == 0:
+                            if self._migration_stop.wait(MIGRATION_PAUSE):
+                                return
+                    if count:
+                        out.write(b'\n')
+                    out.flush()
+                    os.fsync(out.fileno())
+            
+            digest.update(_strings_line(normalizer.strings))
+            key = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if self.writer.submit(('migrate', body_path, key, seq, count, digest.hexdigest(),
+                                   normalizer.strings)).result():
+                print(f"Upgraded {count} stored plans to schema version {SCHEMA_VERSION}")
+        except Exception as e:
+            # The old records are still upgraded on every read
+            print(f"Error migrating {self.plans_file}: {e}")
+        finally:
+            if body_path.exists():
+                body_path.unlink()
+    
+    def _finish_migration(self, body_path: Path, key, seq: int, count: int, checksum: str,
+                          strings: List[str]) -> bool:
+        """Swap in a migrated snapshot, with the exclusive lock held."""
+        try:
+            st = os.stat(self.plans_file)
+        except FileNotFoundError:
+            return False
+        if (st.st_ino, st.st_size, st.st_mtime_ns) != key:
+            # Compacted in the meantime, which already wrote the current schema
+            return False
+        
+        tmp_path = self.plans_file.with_name(self.plans_file.name + '.new')
+        with open(tmp_path, 'wb') as out, open(body_path, 'rb') as body:
+            out.write(self._snapshot_header(seq, count, checksum, strings).encode('utf-8'))
+            shutil.copyfileobj(body, out)
+            out.write(b']}\n')
+            out.flush()
+            os.fsync(out.fileno())
+        
+        # The journal is untouched: the new snapshot has the same seq
+        os.replace(self.plans_file, self.backup_file)
+        os.replace(tmp_path, self.plans_file)
+        _fsync_dir(self.data_dir)
+        return True
+    
+    def _journal_size(self) -> int:
+        """Current size of the active journal in bytes."""
+        try:
+            return os.stat(self.journal_file).st_size
+        except FileNotFoundError:
+            return 0
+    
+    def _journal_key(self):
+        """Identity and length of the active journal, to spot foreign writes."""
+        try:
+            st = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size)
+    
+    def _sync_tail(self, force: bool = False) -> bool:
+        """Catch up with history written by other processes.
+        
+        Called with the exclusive lock held. Unless the journal changed since
+        our own last write this costs one stat(); otherwise the snapshot is
+        verified and the journals read, but the history is only decoded if
+        the snapshot cannot be mapped. Returns whether anything was caught up.
+        """
+        if not force and self._synced and self._journal_key() == self._last_journal_key:
+            return False
+        
+        self._last_entry = None
+        
+        state = self._scan_state()
+        if state is None:
+            state = self._load_state(lock=False)
+        self._seq = state['seq']
+        self._next_id = state['next_id']
+        self._journal_records = state['journal_records']
+        
+        if state['torn_tail']:
+            journal, valid_length = state['torn_tail']
+            print(f"Warning: discarding incomplete trailing record in {journal}")
+            if journal == self.journal_file:
+                with open(journal, 'r+b') as f:
+                    f.truncate(valid_length)
+                    os.fsync(f.fileno())
+        
+        if state.get('primary_error') is not None:
+            print(f"Warning: {state['primary_error']}; recovered history from {state['source']}")
+            if self.plans_file.exists():
+                quarantine = self.plans_file.with_name(
+                    f"{self.plans_file.name}.corrupt-{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+                os.replace(self.plans_file, quarantine)
+                print(f"Damaged history kept at {quarantine}")
+            self._compact(state['plans'], self._seq, primary_ok=False)
+        
+        if force:
+            rollups = self._load_rollups()
+            if rollups is None or rollups.seq != self._seq:
+                if rollups is not None:
+                    print("Daily rollups are out of date, rebuilding from history")
+                # Rebuilding reads the whole history; the writer thread does it
+                self.writer.submit(('rebuild_rollups',))
+        
+        self._synced = True
+        self._last_journal_key = self._journal_key()
+        return True
+    
+    def _compact(self, plans: List[PlanEntry], seq: int, primary_ok: bool = True):
+        """Fold the journal into a new snapshot.
+        
+        The snapshot being replaced becomes the backup and the journal that
+        followed it is kept alongside, so either snapshot can rebuild the
+        full history. Journal records are filtered by sequence number on
+        load, so a crash between any two steps is harmless.
+        """
+        with tracing.span('compact', 'storage', seq=seq):
+            self._compact_files(plans, seq, primary_ok)
+    
+    def _compact_files(self, plans: List[PlanEntry], seq: int, primary_ok: bool):
+        """Body of _compact."""
+        tmp_path = self.plans_file.with_name(self.plans_file.name + '.new')
+        with tracing.span('write snapshot', 'storage', format=self.storage_format):
+            self._write_snapshot(tmp_path, plans, seq)
+        
+        if primary_ok and self.plans_file.exists():
+            os.replace(self.plans_file, self.backup_file)
+        else:
+            # No good primary to keep; a copy of the new snapshot doubles as
+            # the backup (plans may be an iterator that is now used up)
+            backup_tmp = self.backup_file.with_name(self.backup_file.name + '.tmp')
+            shutil.copyfile(tmp_path, backup_tmp)
+            with open(backup_tmp, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(backup_tmp, self.backup_file)
+        
+        if self.journal_file.exists():
+            os.replace(self.journal_file, self.prev_journal_file)
+        os.replace(tmp_path, self.plans_file)
+        _fsync_dir(self.data_dir)
+        self._journal_records = 0
+        
+        if self.storage_format == 'binary':
+            try:
+                binformat.index_snapshot(self.plans_file)
+            except (OSError, ValueError) as e:
+                # Readers rebuild a missing index themselves
+                print(f"Error indexing {self.plans_file}: {e}")
+    
+    def import_plans(self, entries: List[PlanEntry]) -> int:
+        """Merge historical entries into the history as a single commit.
+        
+        Entries are inserted in timestamp order and keep their own
+        completion state. Callers are responsible for deduplication (see
+        importer.py). Returns the number of entries imported.
+        """
+        if not entries:
+            return 0
+        return self.writer.submit(('import', list(entries))).result()
+    
+    def compact(self):
+        """Fold the journal into a fresh snapshot now."""
+        return self.writer.submit(('compact',)).result()
+    
+    def _writer_history(self) -> Dict:
+        """_history for the writer thread, which holds the exclusive lock.
+        
+        A paged view that does not reach the writer's seq is not trusted;
+        the full load then sorts out which snapshot and journals apply.
+        """
+        state = self._history(lock=False)
+        if state['seq'] != self._seq:
+            state = self._load_state(lock=False)
+        return state
+    
+    def _do_compact(self):
+        """Compact on the writer thread, with the exclusive lock held."""
+        state = self._writer_history()
+        self._compact(state['plans'], state['seq'], primary_ok=state['primary_error'] is None)
+    
+    def save_plan_async(self, plan: str, completion_status: str = '', previous_plan: str = '') -> Future:
+        """Queue a new plan entry for the writer thread.
+        
+        Returns a Future that resolves to the saved plan entry once it is
+        durably on disk.
+        """
+        # Create plan entry; completed is updated when the next plan is set
+        plan_entry = PlanEntry(
+            timestamp=datetime.now(),
+            plan=plan,
+            previous_plan=previous_plan,
+            completion_status=completion_status
+        )
+        
+        return self.writer.submit(('save', plan_entry))
+        
+    def save_plan(self, plan: str, completion_status: str = '', previous_plan: str = '') -> PlanEntry:
+        """Save a new plan entry."""
+        return self.save_plan_async(plan, completion_status, previous_plan).result()
+    
+    def _commit(self, requests: List[Tuple]) -> List:
+        """Apply a batch of queued requests as a single commit.
+        
+        Called only from the writer thread. All saves in the batch share one
+        journal append and fsync, and one current-state write, made under
+        the exclusive lock so other processes see whole batches.
+        """
+        events = []
+        with tracing.span('commit', 'storage', requests=len(requests)):
+            with self.lock.exclusive():
+                results = self._commit_locked(requests, events)
+                self._last_journal_key = self._journal_key()
+        self._pending_events = events
+        return results
+    
+    def _publish_events(self):
+        """Publish the last commit's events (writer thread, after its futures resolved).
+        
+        By then the lock is released and the commit is durable, and a
+        subscriber that runs synchronously no longer delays the saves.
+        """
+        events, self._pending_events = self._pending_events, []
+        for event in events:
+            self.events.publish(event)
+    
+    def _newest_entry(self) -> Optional[PlanEntry]:
+        """The newest entry in the history as committed so far, read once and then tracked.
+        
+        Called with the exclusive lock held.
+        """
+        if self._last_entry is None:
+            plans = self._tail(1, lock=False)
+            self._last_entry = plans[-1] if plans else None
+        return self._last_entry
+    
+    def _commit_locked(self, requests: List[Tuple], events: List) -> List:
+        """Body of _commit, run while holding the exclusive lock.
+        
+        The events the commit should publish are appended to events.
+        """
+        synced = self._synced
+        if self._sync_tail() and synced and self.events is not None:
+            # Another process wrote since our last commit
+            events.append(HistoryChanged())
+        seq_before = self._seq
+        
+        results = []
+        records = []
+        changes = []
+        last_entry = None
+        for request in requests:
+            if request[0] == 'save':
+                plan_entry = request[1]
+                plan_entry.id = self._next_id
+                self._next_id += 1
+                # The previous plan is marked completed when the journal is replayed
+                records.append({'seq': self._seq + len(records) + 1, 'version': SCHEMA_VERSION,
+                                'op': 'save', 'entry': plan_entry.to_dict()})
+                changes.append(request)
+                last_entry = plan_entry
+                if self.events is not None:
+                    previous = self._newest_entry()
+                    if previous is not None and plan_entry.completion_status is not CompletionStatus.NONE:
+                        # The save answered the previous plan, as the journal replay records it
+                        amended = previous.copy()
+                        amended.completed = True
+                        amended.completion_status = plan_entry.completion_status
+                        events.append(PlanAmended(amended))
+                    events.append(PlanSaved(plan_entry))
+                self._last_entry = plan_entry.copy()
+                results.append(plan_entry)
+            elif request[0] == 'migrate':
+                results.append(self._finish_migration(*request[1:]))
+            elif request[0] == 'import':
+                entries = request[1]
+                for entry in entries:
+                    entry.id = self._next_id
+                    self._next_id += 1
+                records.append({'seq': self._seq + len(records) + 1, 'version': SCHEMA_VERSION,
+                                'op': 'import', 'entries': [entry.to_dict() for entry in entries]})
+                changes.append(request)
+                if self.events is not None:
+                    # Imports merge by timestamp, after existing entries at the same time
+                    candidates = [plan for plan in [self._newest_entry()] if plan is not None] + entries
+                    self._last_entry = sorted(candidates, key=lambda plan: plan.timestamp_us)[-1].copy()
+                    events.append(HistoryChanged())
+                else:
+                    self._last_entry = None
+                results.append(len(entries))
+            else:
+                results.append(None)
+        
+        if records:
+            self._append_journal(records)
+            self._seq += len(records)
+            self._journal_records += len(records)
+        
+        rebuild = any(request[0] == 'rebuild_rollups' for request in requests)
+        if changes or rebuild:
+            try:
+                self._update_rollups(seq_before, changes, force=rebuild)
+            except Exception as e:
+                # Rollups are derived data and are rebuilt on the next mismatch
+                print(f"Error updating daily rollups: {e}")
+        
+        if any(request[0] == 'compact' for request in requests):
+            self._compact_deferred = False
+            try:
+                self._do_compact()
+            except Exception as e:
+                # The journal already holds the entries; compaction can wait
+                print(f"Error compacting plan history: {e}")
+        elif not self._compact_deferred and (self._journal_records >= JOURNAL_COMPACT_THRESHOLD or
+                                             self._journal_size() >= JOURNAL_COMPACT_BYTES):
+            # Compact after this batch's saves have been answered
+            self._compact_deferred = True
+            self.writer.defer(('compact',))
+        
+        if last_entry is not None:
+            # Update current state
+            current_state = {
+                'version': SCHEMA_VERSION,
+                'current_id': last_entry.id,
+                'current_plan': last_entry.plan,
+                'plan_start_time': last_entry.timestamp_iso,
+                'last_completion_status': last_entry.completion_status.value
+            }
+            self._save_json(self.current_file, current_state)
+        
+        return results
+    
+    def close(self):
+        """Flush queued writes and stop the writer thread."""
+        if self._migration is not None:
+            # An unfinished migration simply starts over next time
+            self._migration_stop.set()
+            self._migration.join()
+        self.writer.stop()
+        self._view = None
+    
+    # Daily rollups
+    
+    def _load_rollups(self) -> Optional[DailyRollups]:
+        """Load persisted rollups, or None if missing, unreadable or of an older layout."""
+        try:
+            with open(self.rollups_file, 'r') as f:
+                rollups = DailyRollups.from_dict(json.load(f))
+            return rollups if rollups.version == ROLLUPS_VERSION else None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading {self.rollups_file}: {e}")
+            return None
+    
+    def _update_rollups(self, seq_before: int, changes: List[Tuple], force: bool = False):
+        """Fold saved or imported entries into the rollups, rebuilding if out of step.
+        
+        Called with the exclusive lock held.
+        """
+        rollups = None if force else self._load_rollups()
+        if rollups is not None and rollups.seq == seq_before:
+            for kind, payload in changes:
+                if kind == 'save':
+                    rollups.add_entry(payload)
+                else:
+                    for entry in payload:
+                        rollups.add_imported(entry)
+            rollups.seq = self._seq
+        else:
+            if not force:
+                print("Daily rollups are out of date, rebuilding from history")
+            state = self._writer_history()
+            rollups = DailyRollups.rebuild(state['plans'], state['seq'])
+        self._save_json(self.rollups_file, rollups.to_dict())
+    
+    def rebuild_rollups(self):
+        """Rebuild the daily rollups from the raw history."""
+        return self.writer.submit(('rebuild_rollups',)).result()
+    
+    def get_daily_rollups(self) -> DailyRollups:
+        """Get the daily rollups (computed from history if none are stored)."""
+        rollups = self._load_rollups()
+        if rollups is None:
+            state = self._history()
+            rollups = DailyRollups.rebuild(state['plans'], state['seq'])
+        return rollups
+    
+    def get_summaries(self, period: str = 'week') -> List[Dict]:
+        """Get weekly, monthly or yearly summaries, derived from daily rollups."""
+        return self.get_daily_rollups().summarize(period)
+    
+    def _load_current_state(self) -> Dict:
+        """Load current_state.json, upgrading an older layout on read."""
+        current_state = self._load_json(self.current_file)
+        if current_state:
+            current_state = upgrade('state', current_state, current_state.pop('version', 1))
+        return current_state
     
     def get_current_plan(self) -> str:
         """Get the current active plan."""
-        current_state = self._load_json(self.current_file)
+        current_state = self._load_current_state()
+        if not current_state:
+            # current_state.json is derived data; rebuild it from history
+            last_plan = self.get_last_plan()
+            return last_plan.plan if last_plan else ''
         return current_state.get('current_plan', '')
     
-    def get_last_plan(self) -> Optional[Dict]:
+    def get_last_plan(self) -> Optional[PlanEntry]:
         """Get the last plan entry."""
-        plans = self._load_json(self.plans_file)
+        plans = self._tail(1)
         return plans[-1] if plans else None
     
-    def get_plans_history(self, limit: int = 50) -> List[Dict]:
+    def get_plans_history(self, limit: int = 50) -> List[PlanEntry]:
         """Get recent plans history."""
-        plans = self._load_json(self.plans_file)
-        return plans[-limit:] if plans else []
+        return self._tail(limit)
     
-    def get_plans_for_date(self, date_str: str) -> List[Dict]:
-        """Get all plans for a specific date (YYYY-MM-DD format)."""
-        plans = self._load_json(self.plans_file)
-        date_plans = []
+    def iter_plans(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[PlanEntry]:
+        """Iterate over the plan history, oldest first, optionally limited to [start, end).
         
-        for plan in plans:
-            try:
-                plan_date = datetime.fromisoformat(plan['timestamp']).date().isoformat()
-                if plan_date == date_str:
-                    date_plans.append(plan)
-            except:
-                continue
+        Streams from the memory-mapped snapshot, decoding one record at a
+        time, so a full scan never materializes the whole history.
+        """
+        read = self._read_view()
+        if read is None:
+            return _filter_range(self._load_plans(), start, end)
+        
+        view, saves = read
+        start_epoch = int(start.timestamp()) if start else None
+        end_epoch = int(end.timestamp()) if end else None
+        return self._iter_view(view, saves, start_epoch, end_epoch)
+    
+    def changes_since(self, last_id: int) -> Iterator[PlanEntry]:
+        """Entries added or amended since last_id, oldest first.
+        
+        Ids are assigned in commit order, so every entry with a larger id,
+        imported older history included, is returned, and before each
+        save the entry it answered. When the snapshot holds no larger ids
+        only its last record and the journal are read; otherwise the
+        history is scanned. An entry next to an import may be returned
+        again unchanged.
+        """
+        read = self._read_view()
+        if read is None or read[0].max_id > last_id:
+            return _changed(self.iter_plans(), last_id)
         
-        return date_plans
+        view, saves = read
+        count = len(view)
+        plans = list(view.records(max(0, count - 1), count))
+        for plan_entry in saves:
+            _apply_save(plans, plan_entry)
+        return _changed(plans, last_id)
+    
+    def get_plans_for_date(self, date_str: str) -> List[PlanEntry]:
+        """Get all plans for a specific date (YYYY-MM-DD format)."""
+        day_start = datetime.fromisoformat(date_str)
+        return list(self.iter_plans(day_start, day_start + timedelta(days=1)))
+    
+    def get_paging_stats(self) -> Optional[Dict]:
+        """Page cache budget, residency and hit/eviction counts, or None if paging is off."""
+        return self.paging.to_dict() if self.paging else None
     
     def get_stats(self) -> Dict:
         """Get statistics about plans and completion."""
-        plans = self._load_json(self.plans_file)
+        days = self.get_daily_rollups().days
         
-        if not plans:
+        total_plans = sum(day['count'] for day in days.values())
+        if not total_plans:
             return {
                 'total_plans': 0,
                 'completed_plans': 0,
@@ -131,27 +1877,16 @@ class PlanStorage:
                 'plans_today': 0
             }
         
-        total_plans = len(plans)
-        completed_plans = sum(1 for p in plans if p.get('completed', False))
+        completed_plans = sum(day['done'] for day in days.values())
         completion_rate = (completed_plans / total_plans) * 100 if total_plans > 0 else 0
         
         # Count plans for current week and today
         now = datetime.now()
         today_str = now.date().isoformat()
-        week_start = (now - datetime.timedelta(days=now.weekday())).date()
+        week_start = (now - timedelta(days=now.weekday())).date().isoformat()
         
-        plans_today = 0
-        plans_this_week = 0
-        
-        for plan in plans:
-            try:
-                plan_date = datetime.fromisoformat(plan['timestamp']).date()
-                if plan_date.isoformat() == today_str:
-                    plans_today += 1
-                if plan_date >= week_start:
-                    plans_this_week += 1
-            except:
-                continue
+        plans_today = days.get(today_str, {}).get('count', 0)
+        plans_this_week = sum(day['count'] for key, day in days.items() if key >= week_start)
         
         return {
             'total_plans': total_plans,
@@ -169,99 +1904,180 @@ class LogWriter:
         self.log_file_path = Path(log_file_path)
         self.log_file_path.parent.mkdir(parents=True, exist_ok=True)
     
-    def write_plan_log(self, plan_entry: Dict):
+    def write_plan_log(self, plan_entry: PlanEntry):
         """Write a plan entry to the log file."""
         try:
-            timestamp = plan_entry['timestamp']
-            plan = plan_entry['plan']
-            completion = plan_entry.get('completion_status', '')
-            previous = plan_entry.get('previous_plan', '')
+            self.write_plan_logs([plan_entry])
+        except Exception as e:
+            print(f"Error writing to log file: {e}")
+    
+    def write_plan_logs(self, plan_entries: List[PlanEntry]):
+        """Append several plan entries to the log file in one write. Raises on failure."""
+        lines = []
+        for plan_entry in plan_entries:
+            timestamp = plan_entry.timestamp_iso
+            plan = plan_entry.plan
+            completion = plan_entry.completion_status.value
+            previous = plan_entry.previous_plan
             
             # Format log entry
             log_entry = f"[{timestamp}] Plan: {plan}"
             if previous:
                 log_entry += f" | Previous: {previous} (Status: {completion})"
             log_entry += "\\n"
+            lines.append(log_entry)
             
-            # Append to log file
-            with open(self.log_file_path, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-                
-        except Exception as e:
-            print(f"Error writing to log file: {e}")
+        # Append to log file
+        with open(self.log_file_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
     
-    def write_csv_log(self, plan_entry: Dict):
+    def write_csv_log(self, plan_entry: PlanEntry):
         """Write a plan entry to CSV format log."""
         try:
-            csv_path = self.log_file_path.with_suffix('.csv')
-            
-            # Check if file exists to determine if we need headers
-            write_headers = not csv_path.exists()
-            
-            with open(csv_path, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                
-                if write_headers:
-                    writer.writerow(['timestamp', 'plan', 'previous_plan', 'completion_status', 'completed'])
-                
-                writer.writerow([
-                    plan_entry['timestamp'],
-                    plan_entry['plan'],
-                    plan_entry.get('previous_plan', ''),
-                    plan_entry.get('completion_status', ''),
-                    plan_entry.get('completed', False)
-                ])
-                
+            self.write_csv_logs([plan_entry])
         except Exception as e:
             print(f"Error writing to CSV log file: {e}")
     
-    def export_all_plans(self, plans: List[Dict], format_type: str = 'txt'):
-        """Export all plans to a file."""
-        if format_type == 'csv':
-            self._export_csv(plans)
-        else:
-            self._export_txt(plans)
+    def write_csv_logs(self, plan_entries: List[PlanEntry]):
+        """Append several plan entries to the CSV log in one write. Raises on failure."""
+        csv_path = self.log_file_path.with_suffix('.csv')
+        
+        # Check if file exists to determine if we need headers
+        write_headers = not csv_path.exists()
+        
+        with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            
+            if write_headers:
+                writer.writerow(['timestamp', 'plan', 'previous_plan', 'completion_status', 'completed'])
+            
+            writer.writerows([
+                plan_entry.timestamp_iso,
+                plan_entry.plan,
+                plan_entry.previous_plan,
+                plan_entry.completion_status.value,
+                plan_entry.completed
+            ] for plan_entry in plan_entries)
     
-    def _export_txt(self, plans: List[Dict]):
+    def export_all_plans(self, plans: Iterable[PlanEntry], format_type: str = 'txt',
+                         start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         export_path=None) -> Optional[Path]:
+        """Export plans to a file, optionally limited to [start, end).
+        
+        Writes to export_path, or to a timestamped export_<time>.<ext> next
+        to the log file if none is given. Returns the path written, or None
+        if the export failed.
+        
+        plans may be any iterable; the jsonl and sqlite formats consume it
+        in bounded batches so a full-history export runs in constant memory.
+        """
+        plans = _filter_range(plans, start, end)
+        exporters = {'txt': self._export_txt, 'csv': self._export_csv,
+                     'jsonl': self._export_jsonl, 'sqlite': self._export_sqlite}
+        if format_type not in exporters:
+            format_type = 'txt'
+        if export_path is None:
+            export_path = self.log_file_path.with_name(
+                f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_type}")
+        return exporters[format_type](plans, Path(export_path))
+    
+    def _export_txt(self, plans: Iterable[PlanEntry], export_path: Path) -> Optional[Path]:
         """Export plans to text format."""
         try:
-            export_path = self.log_file_path.with_name(f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
-            
             with open(export_path, 'w', encoding='utf-8') as f:
                 f.write("Periodic Prompter - Plans Export\\n")
                 f.write(f"Generated: {datetime.now().isoformat()}\\n\\n")
                 
                 for plan in plans:
-                    f.write(f"[{plan['timestamp']}]\\n")
-                    f.write(f"Plan: {plan['plan']}\\n")
-                    if plan.get('previous_plan'):
-                        f.write(f"Previous: {plan['previous_plan']} (Status: {plan.get('completion_status', 'Unknown')})\\n")
-                    f.write(f"Completed: {plan.get('completed', False)}\\n\\n")
+                    f.write(f"[{plan.timestamp_iso}]\\n")
+                    f.write(f"Plan: {plan.plan}\\n")
+                    if plan.previous_plan:
+                        f.write(f"Previous: {plan.previous_plan} (Status: {plan.completion_status.value or 'Unknown'})\\n")
+                    f.write(f"Completed: {plan.completed}\\n\\n")
                     
             print(f"Plans exported to: {export_path}")
+            return export_path
             
         except Exception as e:
             print(f"Error exporting plans: {e}")
+            return None
     
-    def _export_csv(self, plans: List[Dict]):
+    def _export_csv(self, plans: Iterable[PlanEntry], export_path: Path) -> Optional[Path]:
         """Export plans to CSV format."""
         try:
-            export_path = self.log_file_path.with_name(f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-            
             with open(export_path, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 writer.writerow(['timestamp', 'plan', 'previous_plan', 'completion_status', 'completed'])
                 
                 for plan in plans:
                     writer.writerow([
-                        plan['timestamp'],
-                        plan['plan'],
-                        plan.get('previous_plan', ''),
-                        plan.get('completion_status', ''),
-                        plan.get('completed', False)
+                        plan.timestamp_iso,
+                        plan.plan,
+                        plan.previous_plan,
+                        plan.completion_status.value,
+                        plan.completed
                     ])
                     
             print(f"Plans exported to CSV: {export_path}")
+            return export_path
+            
+        except Exception as e:
+            print(f"Error exporting CSV: {e}")
+            return None
+    
+    def _export_jsonl(self, plans: Iterable[PlanEntry], export_path: Path) -> Optional[Path]:
+        """Export plans to JSON Lines, one EXPORT_SCHEMA record per line."""
+        try:
+            count = 0
+            with open(export_path, 'w', encoding='utf-8') as f:
+                for batch in _batched(plans, EXPORT_BATCH_SIZE):
+                    f.write(''.join(_encode_record(_export_record(plan)) + '\n' for plan in batch))
+                    count += len(batch)
+            
+            print(f"Exported {count} plans to JSON Lines: {export_path}")
+            return export_path
+        
+        except Exception as e:
+            print(f"Error exporting JSON Lines: {e}")
+            return None
+    
+    def _export_sqlite(self, plans: Iterable[PlanEntry], export_path: Path) -> Optional[Path]:
+        """Export plans to a self-contained SQLite database file."""
+        try:
+            tmp_path = export_path.with_name(export_path.name + '.tmp')
+            if tmp_path.exists():
+                tmp_path.unlink()
+            
+            columns = [name for name, _ in EXPORT_SCHEMA]
+            count = 0
+            conn = sqlite3.connect(str(tmp_path))
+            try:
+                conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                conn.execute("CREATE TABLE plans (id INTEGER PRIMARY KEY, "
+                             + ", ".join(f"{name} {sql_type}" for name, sql_type in EXPORT_SCHEMA) + ")")
+                insert = (f"INSERT INTO plans ({', '.join(columns)}) "
+                          f"VALUES ({', '.join('?' for _ in columns)})")
+                for batch in _batched(plans, EXPORT_BATCH_SIZE):
+                    conn.executemany(insert, [
+                        tuple(_export_record(plan)[name] for name in columns) for plan in batch
+                    ])
+                    conn.commit()
+                    count += len(batch)
+                
+                conn.execute("CREATE INDEX plans_epoch ON plans (epoch)")
+                conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                    ('schema_version', str(EXPORT_SCHEMA_VERSION)),
+                    ('exported_at', datetime.now().isoformat()),
+                    ('plan_count', str(count)),
+                ])
+                conn.commit()
+            finally:
+                conn.close()
             
+            os.replace(tmp_path, export_path)
+            print(f"Exported {count} plans to SQLite: {export_path}")
+            return export_path
+        
         except Exception as e:
-            print(f"Error exporting CSV: {e}")
\ No newline at end of file
+            print(f"Error exporting SQLite: {e}")
+            return None
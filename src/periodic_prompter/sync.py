@@ -0,0 +1,310 @@
+"""Background sync of saved plans to a team aggregation endpoint.
+
+A SyncClient thread tails PlanStorage and POSTs new entries as JSON
+batches over one kept-alive HTTP(S) connection:
+
+    {"client": "<client id>", "plans": [{"id": <entry id>, "timestamp": ..., ...}]}
+
+Progress is kept as a persisted high-water mark, the largest entry id
+sent, advanced only after the server accepts a batch. Storage assigns ids
+in commit order, so imported older history is sent too, and entries are
+sent once however often the app restarts. An entry is sent again when a
+later save answers it, marking it completed; the server keeps the latest
+copy of each id, which also absorbs the rare duplicate from a crash
+between a POST and saving the mark. The mark is shared with the
+periodic-prompter-sync command: each pass holds sync.lock in the data
+directory and starts from the mark on disk, so the two never send the
+same batch side by side.
+
+While the server is unreachable, entries wait in a bounded offline queue
+and the client retries with exponential backoff; anything past the queue
+stays in PlanStorage and is read again once the queue drains. Nothing on
+the prompt path waits for the network: notify() only wakes the thread.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.clock import SYSTEM_CLOCK
+    from periodic_prompter.locking import FileLock
+    from periodic_prompter.storage import PlanStorage, _export_record
+except ImportError:
+    from .clock import SYSTEM_CLOCK
+    from .locking import FileLock
+    from .storage import PlanStorage, _export_record
+
+
+SYNC_BATCH_SIZE = 200
+
+# Entries held in memory while the server is unreachable
+OFFLINE_QUEUE_SIZE = 5000
+
+# Seconds between checks for entries saved by other processes
+POLL_INTERVAL = 60
+
+BACKOFF_INITIAL = 5
+BACKOFF_MAX = 30 * 60
+
+HTTP_TIMEOUT = 10
+
+STATE_FILE = 'sync_state.json'
+LOCK_FILE = 'sync.lock'
+
+
+class SyncError(Exception):
+    """The server did not accept a batch."""
+
+
+class SyncClient:
+    """Pushes new plans from a PlanStorage to an HTTP endpoint in batches."""
+    
+    def __init__(self, storage: PlanStorage, url: str, token: str = '',
+                 batch_size: int = SYNC_BATCH_SIZE, queue_size: int = OFFLINE_QUEUE_SIZE,
+                 poll_interval: float = POLL_INTERVAL, clock=None):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Sync URL must be http(s)://host/path: {url!r}")
+        self.storage = storage
+        self.url = url
+        self.token = token
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.clock = clock or SYSTEM_CLOCK
+        
+        self._parts = parts
+        self._path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self._connection = None
+        
+        self.state_file = storage.data_dir / STATE_FILE
+        # Held around every read and write of the state file
+        self.lock = FileLock(storage.data_dir / LOCK_FILE)
+        with self.lock.exclusive():
+            self.state = self._load_state()
+        # Entries read from storage but not yet accepted, as (id, record)
+        self.pending = deque()
+        # Largest id read into pending
+        self.read_id = self.state['last_id']
+        
+        self.backoff = 0
+        self.sent = 0
+        self.last_error = None
+        
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.thread = None
+    
+    def _load_state(self) -> Dict:
+        state = None
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading {self.state_file}, resending from the start: {e}")
+        
+        if not state or state.get('url') != self.url or 'last_id' not in state:
+            # A new endpoint has seen nothing yet
+            client = state.get('client') if state else None
+            state = {'url': self.url, 'client': client or uuid.uuid4().hex, 'last_id': 0}
+            self.storage._save_json(self.state_file, state)
+        return state
+    
+    def _refresh_state(self):
+        """Pick up progress another process saved, starting over from its mark.
+        
+        Called with the lock held.
+        """
+        state = self._load_state()
+        if state['client'] != self.state['client'] or state['last_id'] != self.state['last_id']:
+            self.state = state
+            self.pending.clear()
+            self.read_id = state['last_id']
+    
+    # Reading new entries
+    
+    def _fill_queue(self):
+        """Move entries added or amended since the last read into the offline queue, up to its size.
+        
+        An amended entry comes just before the save that answered it, so
+        the queue is only cut after a new entry.
+        """
+        room = self.queue_size - len(self.pending)
+        if room <= 0:
+            return
+        
+        for plan in self.storage.changes_since(self.read_id):
+            record = _export_record(plan)
+            record['id'] = plan.id
+            self.pending.append((plan.id, record))
+            if plan.id > self.read_id:
+                self.read_id = plan.id
+                room -= 1
+                if room <= 0:
+                    break
+    
+    # HTTP
+    
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            if self._parts.scheme == 'https':
+                self._connection = http.client.HTTPSConnection(
+                    self._parts.hostname, self._parts.port, timeout=HTTP_TIMEOUT)
+            else:
+                self._connection = http.client.HTTPConnection(
+                    self._parts.hostname, self._parts.port, timeout=HTTP_TIMEOUT)
+        return self._connection
+    
+    def _disconnect(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+    
+    def _post(self, records: List[Dict]):
+        """POST one batch; raises SyncError if it was not accepted."""
+        body = json.dumps({'client': self.state['client'], 'plans': records},
+                          ensure_ascii=False).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        
+        while True:
+            reused = self._connection is not None
+            connection = self._connect()
+            try:
+                connection.request('POST', self._path, body, headers)
+                response = connection.getresponse()
+                # Read the body so the connection can be reused
+                response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self._disconnect()
+                if not reused:
+                    raise SyncError(str(e) or type(e).__name__)
+                # The server closed the idle connection; retry once on a fresh one
+        
+        if response.will_close:
+            self._disconnect()
+        if not 200 <= response.status < 300:
+            raise SyncError(f"HTTP {response.status} {response.reason}")
+    
+    # Sending
+    
+    def sync_once(self) -> int:
+        """Send everything new, batch by batch. Returns the number of entries sent.
+        
+        Raises SyncError on the first batch the server does not accept;
+        that batch and the rest stay queued.
+        """
+        with self.lock.exclusive():
+            self._refresh_state()
+            return self._send_pending()
+    
+    def _send_pending(self) -> int:
+        """Body of sync_once, run while holding the lock."""
+        sent = 0
+        while True:
+            self._fill_queue()
+            if not self.pending:
+                return sent
+            batch = [self.pending[i] for i in range(min(self.batch_size, len(self.pending)))]
+            self._post([record for _, record in batch])
+            for _ in batch:
+                self.pending.popleft()
+            self.state['last_id'] = max([self.state['last_id']] + [entry_id for entry_id, _ in batch])
+            self.storage._save_json(self.state_file, self.state)
+            sent += len(batch)
+            self.sent += len(batch)
+    
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='plan-sync', daemon=True)
+        self.thread.start()
+    
+    def notify(self):
+        """Wake the sync thread after a save. Never blocks."""
+        self._wake.set()
+    
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self._disconnect()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.sync_once()
+            except Exception as e:
+                if self.last_error is None:
+                    print(f"Plan sync failed, will retry: {e}")
+                self.last_error = str(e)
+                self.backoff = min(max(self.backoff * 2, BACKOFF_INITIAL), BACKOFF_MAX)
+                # Jitter so a team's clients do not retry in lockstep
+                self.clock.wait(self._stop, self.backoff * random.uniform(0.75, 1))
+                continue
+            
+            if self.last_error is not None:
+                print("Plan sync recovered")
+            self.last_error = None
+            self.backoff = 0
+            self.clock.wait(self._wake, self.poll_interval)
+    
+    def stats(self) -> Dict:
+        return {
+            'sent': self.sent,
+            'pending': len(self.pending),
+            'backoff': self.backoff,
+            'last_error': self.last_error,
+        }
+
+
+def create_sync_client(settings, storage: PlanStorage) -> Optional[SyncClient]:
+    """A started SyncClient if sync is enabled in settings, else None."""
+    if not settings or not settings.get('sync_enabled', False) or not settings.get('sync_url'):
+        return None
+    try:
+        client = SyncClient(storage, settings.get('sync_url'), settings.get('sync_token', ''))
+    except ValueError as e:
+        print(f"Plan sync disabled: {e}")
+        return None
+    client.start()
+    return client
+
+
+def main(argv=None):
+    """Command line entry point: periodic-prompter-sync URL."""
+    parser = argparse.ArgumentParser(description="Send plans not yet synced to a team endpoint.")
+    parser.add_argument('url', help="Endpoint to POST plan batches to")
+    parser.add_argument('--data-dir', help="Data directory to sync from (default: the app's)")
+    parser.add_argument('--token', default='', help="Bearer token for the endpoint")
+    args = parser.parse_args(argv)
+    
+    storage = PlanStorage(args.data_dir)
+    try:
+        client = SyncClient(storage, args.url, args.token)
+        sent = client.sync_once()
+    except (ValueError, SyncError) as e:
+        print(f"Sync failed: {e}")
+        return 1
+    finally:
+        storage.close()
+    
+    print(f"Sent {sent} plans")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
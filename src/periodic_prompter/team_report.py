@@ -0,0 +1,285 @@
+"""Team report across many users' data directories, built in parallel.
+
+Each source is a data directory, a folder of collected data directories,
+or a .zip/.tar(.gz) archive holding one or more of them. Every data
+directory found becomes one job for a ProcessPoolExecutor: the worker
+reads the history files once with read_data_dir (extracting them to a
+scratch directory first if they are in an archive; collected data is
+never modified) and reduces them to a small partial aggregate of daily
+rollups and hour/weekday sums. The main
+process only merges those partials, so throughput grows with the number
+of cores.
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Use absolute imports for packaging compatibility
+try:
+    from periodic_prompter.analytics import WEEKDAY_NAMES, by_hour, by_weekday
+    from periodic_prompter.rollups import DailyRollups
+    from periodic_prompter.storage import SNAPSHOT_FILES, read_data_dir
+except ImportError:
+    from .analytics import WEEKDAY_NAMES, by_hour, by_weekday
+    from .rollups import DailyRollups
+    from .storage import SNAPSHOT_FILES, read_data_dir
+
+
+# Files that make up a user's history; anything else in a data dir is ignored
+DATA_FILES = {name + suffix for name in SNAPSHOT_FILES.values() for suffix in ('', '.bak')}
+DATA_FILES |= {'plans.journal', 'plans.journal.1'}
+
+# A directory holding any of these is a data directory
+MARKER_FILES = set(SNAPSHOT_FILES.values()) | {'plans.journal'}
+
+# Path components too generic to name a user by
+GENERIC_NAMES = {'periodic_prompter', 'share', '.local', ''}
+
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.tar', '.zip')
+
+REPORT_WEEKS = 8
+
+# A job is (user label, kind, location, path inside the archive)
+Job = Tuple[str, str, str, str]
+
+
+def _label(path: str) -> str:
+    """Name a user by the most specific non-generic part of a path."""
+    for part in reversed(Path(path).parts):
+        for suffix in ARCHIVE_SUFFIXES:
+            if part.endswith(suffix):
+                part = part[:-len(suffix)]
+                break
+        if part not in GENERIC_NAMES:
+            return part
+    return path
+
+
+def _archive_jobs(path: Path, kind: str, names: List[str]) -> List[Job]:
+    """One job per data directory inside an archive."""
+    prefixes = sorted({posixpath.dirname(name) for name in names
+                       if posixpath.basename(name) in MARKER_FILES})
+    return [(_label(str(Path(path.name) / prefix)), kind, str(path), prefix) for prefix in prefixes]
+
+
+def find_jobs(sources: List[str]) -> List[Job]:
+    """Expand directories and archives into one job per data directory."""
+    jobs = []
+    for source in sources:
+        path = Path(source).expanduser()
+        if path.is_dir():
+            for dirpath, _, filenames in os.walk(path):
+                if MARKER_FILES.intersection(filenames):
+                    jobs.append((_label(dirpath), 'dir', dirpath, ''))
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                jobs.extend(_archive_jobs(path, 'zip', archive.namelist()))
+        elif path.is_file() and tarfile.is_tarfile(path):
+            with tarfile.open(path) as archive:
+                names = [member.name for member in archive if member.isfile()]
+            jobs.extend(_archive_jobs(path, 'tar', names))
+        else:
+            print(f"Skipping {source}: not a data directory or archive", file=sys.stderr)
+    return jobs
+
+
+def _extract_data_files(kind: str, location: str, prefix: str, target: Path):
+    """Extract one data directory's files from an archive into target."""
+    # Members are written by base name only, so no archive path can escape target
+    wanted = {posixpath.join(prefix, name): name for name in DATA_FILES}
+    if kind == 'zip':
+        with zipfile.ZipFile(location) as archive:
+            for member in archive.namelist():
+                if member in wanted:
+                    with archive.open(member) as src, open(target / wanted[member], 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+    else:
+        with tarfile.open(location) as archive:
+            for member in archive:
+                if member.isfile() and member.name in wanted:
+                    with archive.extractfile(member) as src, open(target / wanted[member.name], 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+
+
+def _bucket_sums(breakdown: Dict) -> Dict:
+    return {key: list(breakdown[key]) for key in ('plans', 'answered', 'scores')}
+
+
+def load_partial(job: Job) -> Dict:
+    """Reduce one user's history to a partial aggregate. Runs in a worker process."""
+    label, kind, location, prefix = job
+    started = time.perf_counter()
+    if kind == 'dir':
+        plans = read_data_dir(location)
+    else:
+        with tempfile.TemporaryDirectory(prefix='periodic_prompter_report_') as scratch:
+            _extract_data_files(kind, location, prefix, Path(scratch))
+            plans = read_data_dir(scratch)
+    
+    rollups = DailyRollups.rebuild(plans, 0)
+    return {
+        'user': label,
+        'source': posixpath.join(location, prefix) if prefix else location,
+        'entries': len(plans),
+        'first': plans[0].timestamp_iso if plans else None,
+        'last': plans[-1].timestamp_iso if plans else None,
+        'days': rollups.days,
+        'by_hour': _bucket_sums(by_hour(rollups)),
+        'by_weekday': _bucket_sums(by_weekday(rollups)),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _add_buckets(total: Optional[Dict], part: Dict) -> Dict:
+    if total is None:
+        return {key: list(values) for key, values in part.items()}
+    for key, values in part.items():
+        total[key] = [a + b for a, b in zip(total[key], values)]
+    return total
+
+
+def _rate(scores: float, answered: int) -> Optional[float]:
+    return (scores / answered) * 100 if answered else None
+
+
+def merge_partials(partials: List[Dict], weeks: int = REPORT_WEEKS) -> Dict:
+    """Combine per-user partial aggregates into the team report."""
+    team_days = {}
+    hours = weekdays = None
+    users = []
+    for partial in sorted(partials, key=lambda p: p['user']):
+        for day_key, day in partial['days'].items():
+            total = team_days.get(day_key)
+            if total is None:
+                team_days[day_key] = dict(day)
+                continue
+            for field in ('count', 'done', 'completed', 'partial', 'no'):
+                total[field] += day[field]
+            total['first'] = min(total['first'], day['first'])
+            total['last'] = max(total['last'], day['last'])
+        hours = _add_buckets(hours, partial['by_hour'])
+        weekdays = _add_buckets(weekdays, partial['by_weekday'])
+        
+        answered = sum(partial['by_hour']['answered'])
+        active_days = len(partial['days'])
+        users.append({
+            'user': partial['user'],
+            'source': partial['source'],
+            'plans': partial['entries'],
+            'answered': answered,
+            'completion_rate': _rate(sum(partial['by_hour']['scores']), answered),
+            'active_days': active_days,
+            'plans_per_day': partial['entries'] / active_days if active_days else 0.0,
+            'first': partial['first'],
+            'last': partial['last'],
+        })
+    
+    hours = hours or {'plans': [0] * 24, 'answered': [0] * 24, 'scores': [0.0] * 24}
+    weekdays = weekdays or {'plans': [0] * 7, 'answered': [0] * 7, 'scores': [0.0] * 7}
+    for breakdown in (hours, weekdays):
+        breakdown['rates'] = [_rate(s, a) for s, a in zip(breakdown['scores'], breakdown['answered'])]
+    
+    answered = sum(hours['answered'])
+    return {
+        'users': users,
+        'plans': sum(user['plans'] for user in users),
+        'answered': answered,
+        'completion_rate': _rate(sum(hours['scores']), answered),
+        'by_hour': hours,
+        'by_weekday': weekdays,
+        'weeks': DailyRollups(team_days).summarize('week')[-weeks:],
+    }
+
+
+def build_report(sources: List[str], workers: Optional[int] = None,
+                 weeks: int = REPORT_WEEKS) -> Dict:
+    """Load every data directory in sources in parallel and merge them."""
+    jobs = find_jobs(sources)
+    partials = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(load_partial, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                partials.append(future.result())
+            except Exception as e:
+                label, _, location, prefix = futures[future]
+                print(f"Skipping {label} ({location} {prefix}): {e}", file=sys.stderr)
+    report = merge_partials(partials, weeks)
+    report['sources'] = len(jobs)
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """Render the team report as Markdown."""
+    def rate(value):
+        return f"{value:.0f}%" if value is not None else "-"
+    
+    lines = [
+        "# Team Report",
+        "",
+        f"{len(report['users'])} users, {report['plans']} plans, "
+        f"{report['answered']} answered, completion rate {rate(report['completion_rate'])}",
+        "",
+        "## Users",
+        "",
+        "| User | Plans | Answered | Completion | Active days | Plans/day | Last plan |",
+        "| --- | ---: | ---: | ---: | ---: | ---: | --- |",
+    ]
+    for user in report['users']:
+        lines.append(f"| {user['user']} | {user['plans']} | {user['answered']} | "
+                     f"{rate(user['completion_rate'])} | {user['active_days']} | "
+                     f"{user['plans_per_day']:.1f} | {user['last'] or '-'} |")
+    
+    lines += ["", "## Recent Weeks", "", "| Week | Plans | Answered | Completed |", "| --- | ---: | ---: | ---: |"]
+    for week in report['weeks']:
+        lines.append(f"| {week['period']} | {week['count']} | {week['answered']} | {week['completed']} |")
+    
+    lines += ["", "## By Weekday", "", "| Day | Plans | Completion |", "| --- | ---: | ---: |"]
+    weekdays = report['by_weekday']
+    for index, name in enumerate(WEEKDAY_NAMES):
+        lines.append(f"| {name} | {weekdays['plans'][index]} | {rate(weekdays['rates'][index])} |")
+    
+    lines += ["", "## By Hour", "", "| Hour | Plans | Completion |", "| --- | ---: | ---: |"]
+    hours = report['by_hour']
+    for index in range(24):
+        if hours['plans'][index]:
+            lines.append(f"| {index:02d}:00 | {hours['plans'][index]} | {rate(hours['rates'][index])} |")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    """Command line entry point: periodic-prompter-team-report SOURCE..."""
+    parser = argparse.ArgumentParser(
+        description="Build a team report from many data directories and archives."
+    )
+    parser.add_argument('sources', nargs='+',
+                        help="Data directories, folders of them, or .zip/.tar(.gz) archives")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--weeks', type=int, default=REPORT_WEEKS,
+                        help=f"Recent weeks to list (default: {REPORT_WEEKS})")
+    parser.add_argument('--json', metavar='FILE', help="Also write the full report as JSON")
+    args = parser.parse_args(argv)
+    
+    started = time.perf_counter()
+    report = build_report(args.sources, args.workers, args.weeks)
+    sys.stdout.write(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(f"\n{report['sources']} data directories in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
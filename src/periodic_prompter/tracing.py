@@ -0,0 +1,172 @@
+"""Timeline of scheduler, prompt and storage events in Chrome trace format.
+
+When tracing is on (the PERIODIC_PROMPTER_TRACE environment variable, or
+the "tracing" setting) the scheduler, notification and storage layers
+record spans into a bounded ring buffer: every fire with its planned and
+actual time, every osascript call, every storage commit, snapshot write
+and log sink batch. The oldest events fall off once the buffer is full,
+so it holds the most recent days of activity in fixed memory.
+
+export() writes the buffer as Chrome trace-event JSON, which opens in
+Perfetto (ui.perfetto.dev) or chrome://tracing. When tracing is off,
+span() hands back a shared no-op context and nothing is recorded.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+ENV_VAR = 'PERIODIC_PROMPTER_TRACE'
+
+# Events kept; a busy day records a few hundred
+DEFAULT_CAPACITY = 50000
+
+# Trace files kept in the traces folder
+KEEP_TRACES = 10
+
+
+class _NoSpan:
+    """Context manager standing in for a span while tracing is off."""
+    
+    def __enter__(self):
+        return {}
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """Ring buffer of trace events."""
+    
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.events = deque(maxlen=capacity)
+        self.threads = {}
+        self.pid = os.getpid()
+    
+    def _thread(self) -> int:
+        thread = threading.current_thread()
+        self.threads.setdefault(thread.ident, thread.name)
+        return thread.ident
+    
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        """Record the with block as a complete event.
+        
+        Yields the args dict, so the block can add results to it.
+        """
+        start = time.time()
+        began = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args['error'] = type(e).__name__
+            raise
+        finally:
+            # deque.append is atomic, so spans from any thread are safe
+            self.events.append({
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': int(start * 1e6), 'dur': int((time.perf_counter() - began) * 1e6),
+                'pid': self.pid, 'tid': self._thread(), 'args': args,
+            })
+    
+    def instant(self, name: str, category: str, **args):
+        self.events.append({
+            'name': name, 'cat': category, 'ph': 'i', 's': 't',
+            'ts': int(time.time() * 1e6), 'pid': self.pid, 'tid': self._thread(), 'args': args,
+        })
+    
+    def counter(self, name: str, **values):
+        """Record counter values, drawn as a graph track."""
+        self.events.append({
+            'name': name, 'ph': 'C', 'ts': int(time.time() * 1e6),
+            'pid': self.pid, 'args': values,
+        })
+    
+    def to_dict(self) -> Dict:
+        """The buffer as a Chrome trace-event document."""
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                     'args': {'name': 'Periodic Prompter'}}]
+        metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                      'args': {'name': name}} for tid, name in list(self.threads.items())]
+        return {'traceEvents': metadata + list(self.events), 'displayTimeUnit': 'ms'}
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(capacity: int = DEFAULT_CAPACITY) -> Tracer:
+    """Start recording, keeping up to capacity events."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(capacity)
+    return _tracer
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, category: str, **args):
+    """Context manager recording a span, or doing nothing while tracing is off."""
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.span(name, category, **args)
+
+
+def instant(name: str, category: str, **args):
+    if _tracer is not None:
+        _tracer.instant(name, category, **args)
+
+
+def counter(name: str, **values):
+    if _tracer is not None:
+        _tracer.counter(name, **values)
+
+
+def export(directory) -> Optional[Path]:
+    """Write the buffer to directory as trace-<time>.json. Returns the file, if any."""
+    if _tracer is None:
+        return None
+    directory = Path(directory)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"trace-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(_tracer.to_dict(), f)
+        
+        for old in sorted(directory.glob('trace-*.json'))[:-KEEP_TRACES]:
+            old.unlink()
+        return path
+    except Exception as e:
+        print(f"Error exporting trace: {e}")
+        return None
+
+
+def enable_from(settings=None) -> bool:
+    """Turn tracing on if the environment or settings ask for it."""
+    value = os.environ.get(ENV_VAR, '').strip()
+    if value:
+        if value in ('0', 'false', 'no'):
+            return False
+        # A number above 1 sets the buffer size
+        capacity = int(value) if value.isdigit() and int(value) > 1 else DEFAULT_CAPACITY
+        enable(capacity)
+        return True
+    if settings is not None and settings.get('tracing', False):
+        enable(settings.get('trace_capacity', DEFAULT_CAPACITY))
+        return True
+    return False
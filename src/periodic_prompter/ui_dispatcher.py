@@ -0,0 +1,86 @@
+"""Coalescing dispatcher for menu bar updates.
+
+AppKit state may only be touched from the main thread, but plans are
+saved from scheduler and prompt threads. Updates are therefore requested
+from any thread under a key; the dispatcher schedules one flush on the
+main run loop per frame, and a burst of requests for the same key within
+that frame results in a single call of the latest one.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+# One redraw per display frame at most
+FRAME_INTERVAL = 1 / 60
+
+
+class AppKitBackend:
+    """Runs callbacks on the main run loop via PyObjC (installed with rumps)."""
+
+    def __init__(self):
+        from PyObjCTools import AppHelper
+        self._call_later = AppHelper.callLater
+
+    def call_later(self, delay: float, func: Callable):
+        self._call_later(delay, func)
+
+
+class ManualBackend:
+    """Test double that queues callbacks until run_pending() is called.
+
+    Stands in for the main run loop so the coalescing logic can be
+    exercised without AppKit.
+    """
+
+    def __init__(self):
+        self.scheduled = []
+        self._lock = threading.Lock()
+
+    def call_later(self, delay: float, func: Callable):
+        with self._lock:
+            self.scheduled.append((delay, func))
+
+    def run_pending(self) -> int:
+        """Run everything scheduled so far, as one turn of the run loop would."""
+        with self._lock:
+            scheduled, self.scheduled = self.scheduled, []
+        for _, func in scheduled:
+            func()
+        return len(scheduled)
+
+
+class UIDispatcher:
+    """Marshals UI updates onto the main thread, one flush per frame."""
+
+    def __init__(self, backend=None, frame_interval: float = FRAME_INTERVAL):
+        self.backend = backend if backend is not None else AppKitBackend()
+        self.frame_interval = frame_interval
+        self._pending = OrderedDict()
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        # Counters for diagnostics
+        self.requested = 0
+        self.flushes = 0
+
+    def request(self, key: str, func: Callable):
+        """Ask for func to run on the main thread; later requests for key replace it."""
+        with self._lock:
+            self.requested += 1
+            self._pending[key] = func
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self.backend.call_later(self.frame_interval, self._flush)
+
+    def _flush(self):
+        """Run all pending updates, on the main thread."""
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+            self._flush_scheduled = False
+        self.flushes += 1
+        for key, func in pending.items():
+            try:
+                func()
+            except Exception as e:
+                print(f"Error in UI update {key!r}: {e}")
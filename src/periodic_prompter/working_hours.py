@@ -0,0 +1,163 @@
+"""Working-hours rules compiled to sorted interval tables.
+
+Rules give any number of time ranges per weekday plus per-date exceptions:
+
+    {
+        "weekly": {"mon": ["09:00-12:00", "13:00-17:30"], "fri": ["09:00-15:00"]},
+        "exceptions": {"2025-12-25": [], "2025-12-24": ["09:00-12:00"]}
+    }
+
+A range whose end is before its start runs overnight into the next day.
+An exception replaces everything on its date, including the tail of an
+overnight range from the day before. Ends are inclusive, matching the
+original start_time/end_time check.
+
+Each weekday and each exception date compiles to sorted, merged
+(start, end) second-of-day arrays, so checking an instant is a binary
+search and finding the next working instant skips whole non-working
+days at a time.
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+DAY_SECONDS = 24 * 3600
+
+# How far ahead to look for working time before giving up
+MAX_LOOKAHEAD_DAYS = 400
+
+
+def _parse_clock(value: str) -> int:
+    """Seconds since midnight for "HH:MM" ("24:00" is allowed as an end)."""
+    hours, minutes = map(int, value.split(':'))
+    if not (0 <= hours <= 24 and 0 <= minutes <= 59) or (hours == 24 and minutes):
+        raise ValueError(f"Invalid time: {value!r}")
+    return hours * 3600 + minutes * 60
+
+
+def _parse_range(value: str) -> Tuple[int, int]:
+    """(start, end) seconds for "HH:MM-HH:MM"; end is exclusive and may pass midnight."""
+    start_text, end_text = value.split('-')
+    start = _parse_clock(start_text.strip())
+    # Inclusive end: the whole end second still counts as working time
+    end = min(_parse_clock(end_text.strip()) + 1, DAY_SECONDS)
+    if start == DAY_SECONDS:
+        raise ValueError(f"Range cannot start at 24:00: {value!r}")
+    if end <= start:
+        end += DAY_SECONDS
+    return start, end
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """Sort and merge overlapping ranges into parallel start/end lists."""
+    starts, ends = [], []
+    for start, end in sorted(ranges):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def legacy_rules(start_time: str, end_time: str, weekdays_only: bool) -> Dict:
+    """Rules equivalent to the original start_time/end_time/weekdays_only settings.
+
+    An overnight window is split at midnight within each day, because the
+    original check tested the weekday of the current date.
+    """
+    if _parse_clock(start_time) <= _parse_clock(end_time):
+        ranges = [f"{start_time}-{end_time}"]
+    else:
+        ranges = [f"00:00-{end_time}", f"{start_time}-24:00"]
+    days = DAY_NAMES[:5] if weekdays_only else DAY_NAMES
+    return {'weekly': {day: list(ranges) for day in days}}
+
+
+class WorkingHours:
+    """Compiled working-hours rules."""
+
+    def __init__(self, rules: Dict):
+        """Compile rules; raises ValueError if they are malformed."""
+        weekly = rules.get('weekly', {})
+        unknown = set(weekly) - set(DAY_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown weekday(s): {', '.join(sorted(unknown))}")
+
+        per_day = [[] for _ in DAY_NAMES]
+        for index, day in enumerate(DAY_NAMES):
+            for text in weekly.get(day, []):
+                start, end = _parse_range(text)
+                per_day[index].append((start, min(end, DAY_SECONDS)))
+                if end > DAY_SECONDS:
+                    per_day[(index + 1) % 7].append((0, end - DAY_SECONDS))
+        self.weekly = [_merge(ranges) for ranges in per_day]
+
+        self.exceptions = {}
+        for day_text, texts in rules.get('exceptions', {}).items():
+            ranges = []
+            for text in texts:
+                start, end = _parse_range(text)
+                if end > DAY_SECONDS:
+                    raise ValueError(f"Exception ranges cannot run past midnight: {text!r}")
+                ranges.append((start, end))
+            self.exceptions[date.fromisoformat(day_text)] = _merge(ranges)
+
+    @classmethod
+    def from_legacy(cls, start_time: str, end_time: str, weekdays_only: bool) -> 'WorkingHours':
+        return cls(legacy_rules(start_time, end_time, weekdays_only))
+
+    def _day(self, day: date) -> Tuple[List[int], List[int]]:
+        table = self.exceptions.get(day)
+        return table if table is not None else self.weekly[day.weekday()]
+
+    def works_on(self, day: date) -> bool:
+        """Whether there is any working time on day."""
+        return bool(self._day(day)[0])
+
+    def is_working(self, when: datetime) -> bool:
+        """Whether when falls inside working hours."""
+        starts, ends = self._day(when.date())
+        seconds = when.hour * 3600 + when.minute * 60 + when.second
+        index = bisect_right(starts, seconds) - 1
+        return index >= 0 and seconds < ends[index]
+
+    def end_of_week(self, when: datetime) -> Optional[datetime]:
+        """End of the last working range of when's week (Monday to Sunday).
+
+        If that is not after when, the end of the next week with working
+        time instead. Returns None if there is none in the lookahead period.
+        """
+        monday = when.date() - timedelta(days=when.weekday())
+        for week in range(MAX_LOOKAHEAD_DAYS // 7):
+            for offset in range(6, -1, -1):
+                day = monday + timedelta(days=week * 7 + offset)
+                ends = self._day(day)[1]
+                if ends:
+                    end = datetime.combine(day, time()) + timedelta(seconds=ends[-1])
+                    if end > when:
+                        return end
+                    break
+        return None
+
+    def next_working_instant(self, when: datetime) -> Optional[datetime]:
+        """when itself if it is working time, else the start of the next working range.
+
+        Returns None if there is no working time in the lookahead period.
+        """
+        day = when.date()
+        seconds = when.hour * 3600 + when.minute * 60 + when.second
+        for offset in range(MAX_LOOKAHEAD_DAYS):
+            starts, ends = self._day(day)
+            # First range that has not ended yet
+            index = bisect_right(ends, seconds)
+            if index < len(starts):
+                if offset == 0 and starts[index] <= seconds:
+                    return when
+                return datetime.combine(day, time()) + timedelta(seconds=starts[index])
+            day += timedelta(days=1)
+            seconds = 0
+        return None
@@ -0,0 +1,11 @@
+import pytest
+
+from periodic_prompter.storage import PlanStorage
+
+
+@pytest.fixture(params=['json', 'binary'])
+def storage(request, tmp_path):
+    """An empty PlanStorage in each snapshot format."""
+    storage = PlanStorage(tmp_path / 'data', request.param)
+    yield storage
+    storage.close()
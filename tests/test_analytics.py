@@ -0,0 +1,47 @@
+"""Completion analytics served from the rollups."""
+
+from datetime import date, datetime
+
+from periodic_prompter import analytics
+from periodic_prompter.models import PlanEntry
+
+
+def test_answers_count_towards_the_hour_and_day_of_the_plan_they_answer(storage):
+    storage.import_plans([
+        PlanEntry(datetime(2025, 1, 6, 9, 0), 'Monday 9', '', 'yes', True),
+        PlanEntry(datetime(2025, 1, 6, 10, 0), 'Monday 10', '', 'partially', True),
+        PlanEntry(datetime(2025, 1, 7, 9, 30), 'Tuesday 9', '', 'no', True),
+        PlanEntry(datetime(2025, 1, 7, 14, 0), 'Tuesday 14'),
+    ])
+    results = analytics.analyze(storage, date(2025, 1, 7))
+
+    hours = results['by_hour']
+    assert hours['plans'][9] == 2 and hours['answered'][9] == 2 and hours['rates'][9] == 50.0
+    assert hours['rates'][10] == 50.0
+    assert hours['plans'][14] == 1 and hours['rates'][14] is None
+    weekdays = results['by_weekday']
+    assert weekdays['plans'][:2] == [2, 2]
+    assert weekdays['rates'][:2] == [75.0, 0.0]
+    assert results['entries'] == 4
+    assert results['current'][7] == 50.0
+
+
+def test_incremental_rollups_match_a_rebuild(storage):
+    storage.import_plans([PlanEntry(datetime(2025, 1, 6, 8, 0), 'Imported', '', 'yes', True)])
+    for plan, status in (('First', ''), ('Second', 'yes'), ('Third', 'no'), ('Fourth', 'partially')):
+        storage.save_plan(plan, status)
+
+    incremental = analytics.analyze(storage)
+    assert incremental == analytics.analyze_entries(storage.iter_plans())
+    storage.rebuild_rollups()
+    assert analytics.analyze(storage) == incremental
+
+
+def test_current_rate_is_for_the_window_ending_today(storage):
+    storage.import_plans([PlanEntry(datetime(2025, 1, 6, 9, 0), 'Monday', '', 'yes', True)])
+
+    assert analytics.analyze(storage, date(2025, 1, 12))['current'][7] == 100.0
+    later = analytics.analyze(storage, date(2025, 1, 20))
+    assert later['current'][7] is None
+    assert later['current'][30] == 100.0
+    assert later['rolling'][7][-1]['date'] == date(2025, 1, 20)
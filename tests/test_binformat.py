@@ -0,0 +1,67 @@
+"""Binary snapshot encoding and its sidecar index."""
+
+from datetime import datetime
+
+import pytest
+
+from periodic_prompter.binformat import BinarySnapshot, decode_snapshot, encode_snapshot, index_snapshot
+from periodic_prompter.models import PlanEntry
+
+
+def history(count, start_hour=9):
+    """Entries with recurring plans, each answering the one before."""
+    entries = []
+    previous = ''
+    for index in range(count):
+        plan = ['Email', 'Write report', 'Review PRs'][index % 3]
+        moment = datetime(2025, 3, 4, start_hour + index, 15, 2, 1000 * index)
+        entries.append(PlanEntry(moment, plan, previous, 'partially' if index % 2 else 'yes',
+                                 index < count - 1, index + 1))
+        previous = plan
+    return entries
+
+
+def write_snapshot(path, entries, seq=1):
+    path.write_bytes(encode_snapshot(entries, seq))
+    return path
+
+
+def test_snapshot_round_trips():
+    entries = history(6) + [PlanEntry(datetime(2025, 3, 5, 9), 'Café ☕', 'Not the last plan', '', False, 9)]
+
+    seq, decoded = decode_snapshot(encode_snapshot(entries, 42))
+
+    assert seq == 42
+    assert decoded == entries
+    assert [entry.timestamp_us for entry in decoded] == [entry.timestamp_us for entry in entries]
+
+
+def test_damaged_snapshot_is_rejected():
+    data = bytearray(encode_snapshot(history(3), 1))
+    data[-1] ^= 0xFF
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        decode_snapshot(bytes(data))
+    with pytest.raises(ValueError):
+        decode_snapshot(b'PPBIN\x00\x02\n' + bytes(data[8:]))
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    path = write_snapshot(tmp_path / 'plans.bin', history(3))
+    index_snapshot(path)
+    old_index = (tmp_path / 'plans.bin.idx').read_bytes()
+
+    # A newer snapshot next to the old index
+    entries = history(5, start_hour=8)
+    write_snapshot(path, entries, seq=2)
+    with open(path, 'rb') as f:
+        view = BinarySnapshot(path, f)
+    assert len(view) == 5
+    assert [view.record(index) for index in range(5)] == entries
+    assert list(view.records(1, 4)) == entries[1:4]
+    assert view.bisect_time(entries[2].timestamp) == 2
+    assert view.max_id == 5
+
+    new_index = (tmp_path / 'plans.bin.idx').read_bytes()
+    assert new_index != old_index
+    with open(path, 'rb') as f:
+        assert list(BinarySnapshot(path, f).offsets) == list(view.offsets)
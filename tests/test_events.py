@@ -0,0 +1,126 @@
+"""Plan events published by PlanStorage."""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from periodic_prompter import storage as storage_module
+from periodic_prompter.events import Event, EventBus, HistoryChanged, PlanAmended, PlanSaved
+from periodic_prompter.models import CompletionStatus, PlanEntry
+from periodic_prompter.storage import PlanStorage
+
+
+@pytest.fixture
+def published(tmp_path):
+    """A PlanStorage on an EventBus, and the events it publishes."""
+    events = []
+    bus = EventBus()
+    bus.subscribe(Event, events.append)
+    storage = PlanStorage(tmp_path / 'data', events=bus)
+    settle(storage)
+    yield storage, events
+    storage.close()
+
+
+def settle(storage):
+    """Wait until the writer has published the events of earlier commits."""
+    storage.writer.submit(('sync',)).result()
+
+
+def test_saves_publish_the_entry_and_the_plan_it_answered(published):
+    storage, events = published
+    first = storage.save_plan('First')
+    second = storage.save_plan('Second', 'partially', 'First')
+    storage.save_plan('Third', '', 'Second')
+    settle(storage)
+
+    assert [type(event) for event in events] == [PlanSaved, PlanAmended, PlanSaved, PlanSaved]
+    assert events[0].entry.id == first.id
+    amended = events[1].entry
+    assert (amended.id, amended.completed, amended.completion_status) == \
+        (first.id, True, CompletionStatus.PARTIALLY)
+    assert events[2].entry.id == second.id
+
+
+def test_amended_entry_is_read_back_after_reopening(published, tmp_path):
+    storage, events = published
+    first = storage.save_plan('First')
+    storage.close()
+
+    bus = EventBus()
+    reopened_events = []
+    bus.subscribe(Event, reopened_events.append)
+    reopened = PlanStorage(tmp_path / 'data', events=bus)
+    try:
+        reopened.save_plan('Second', 'yes', 'First')
+    finally:
+        reopened.close()
+    assert [type(event) for event in reopened_events] == [PlanAmended, PlanSaved]
+    assert reopened_events[0].entry.id == first.id
+
+
+def test_imports_publish_history_changed(published):
+    storage, events = published
+    storage.save_plan('Today')
+    storage.import_plans([PlanEntry(datetime(2024, 1, 1, 9), 'Old', '', 'yes', True)])
+    settle(storage)
+    assert type(events[-1]) is HistoryChanged
+
+    # The import is older, so the next save still answers Today
+    storage.save_plan('Next', 'no', 'Today')
+    settle(storage)
+    assert events[-2].entry.plan == 'Today'
+
+
+def test_writes_from_another_process_publish_history_changed(published):
+    storage, events = published
+    storage.save_plan('Ours')
+
+    other = PlanStorage(storage.data_dir)
+    try:
+        other.save_plan('Theirs', 'yes', 'Ours')
+    finally:
+        other.close()
+
+    settle(storage)
+    assert type(events[-1]) is HistoryChanged
+    storage.save_plan('Ours again', 'no', 'Theirs')
+    settle(storage)
+    assert events[-2].entry.plan == 'Theirs'
+
+
+def test_saves_resolve_before_synchronous_subscribers_run(published):
+    storage, events = published
+    release = threading.Event()
+    storage.events.subscribe(PlanSaved, lambda event: release.wait(5))
+    try:
+        saved = storage.save_plan_async('First').result(timeout=2)
+        assert saved.plan == 'First'
+    finally:
+        release.set()
+    settle(storage)
+    assert [event.entry.plan for event in events if type(event) is PlanSaved] == ['First']
+
+
+def test_idle_writer_notices_other_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, 'CHANGE_POLL_INTERVAL', 0.01)
+    events = []
+    bus = EventBus()
+    bus.subscribe(HistoryChanged, events.append)
+    storage = PlanStorage(tmp_path / 'data', events=bus)
+    try:
+        storage.writer.submit(('sync',)).result()
+        other = PlanStorage(storage.data_dir)
+        try:
+            other.save_plan('Theirs')
+        finally:
+            other.close()
+
+        deadline = time.monotonic() + 5
+        while not events and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert events
+    finally:
+        storage.close()
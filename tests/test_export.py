@@ -0,0 +1,45 @@
+"""Exports written by LogWriter."""
+
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from periodic_prompter.storage import LogWriter
+
+
+@pytest.mark.parametrize('format_type', ['txt', 'csv', 'jsonl', 'sqlite'])
+def test_export_writes_the_chosen_file(storage, tmp_path, format_type):
+    storage.save_plan('First')
+    storage.save_plan('Second', 'yes', 'First')
+    chosen = tmp_path / 'exports' / f'my plans.{format_type}'
+
+    written = LogWriter(chosen).export_all_plans(storage.iter_plans(), format_type, export_path=chosen)
+
+    assert written == chosen
+    assert sorted(path.name for path in chosen.parent.iterdir()) == [chosen.name]
+    if format_type == 'csv':
+        with open(chosen, newline='', encoding='utf-8') as f:
+            assert [row['plan'] for row in csv.DictReader(f)] == ['First', 'Second']
+    elif format_type == 'jsonl':
+        records = [json.loads(line) for line in chosen.read_text(encoding='utf-8').splitlines()]
+        assert [(r['plan'], r['completed']) for r in records] == [('First', 1), ('Second', 0)]
+    elif format_type == 'sqlite':
+        conn = sqlite3.connect(str(chosen))
+        try:
+            assert conn.execute("SELECT plan FROM plans ORDER BY id").fetchall() == [('First',), ('Second',)]
+        finally:
+            conn.close()
+    else:
+        assert 'Plan: Second' in chosen.read_text(encoding='utf-8')
+
+
+def test_export_without_a_path_is_named_after_the_time(storage, tmp_path):
+    storage.save_plan('Only')
+    log = tmp_path / 'logs' / 'plans.log'
+
+    written = LogWriter(log).export_all_plans(storage.iter_plans(), 'jsonl')
+
+    assert written.parent == log.parent
+    assert written.name.startswith('export_') and written.suffix == '.jsonl'
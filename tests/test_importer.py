@@ -0,0 +1,118 @@
+"""Bulk import from plans.json snapshots, CSV logs and exports."""
+
+import pytest
+
+from periodic_prompter.importer import BulkImporter
+from periodic_prompter.models import PlanEntry
+from periodic_prompter.storage import LogWriter, PlanStorage
+
+
+def history(storage):
+    return [(plan.timestamp_us, plan.plan, plan.previous_plan, plan.completion_status.value, plan.completed)
+            for plan in storage.iter_plans()]
+
+
+def save_day(storage):
+    """Save a few answered plans; returns the entries as saved."""
+    return [
+        storage.save_plan('Write report'),
+        storage.save_plan('Review PRs', 'yes', 'Write report'),
+        storage.save_plan('Lunch', 'partially', 'Review PRs'),
+        storage.save_plan('Standup', 'no', 'Lunch'),
+    ]
+
+
+def test_csv_log_rows_answer_the_plan_before_them(storage, tmp_path):
+    log = tmp_path / 'plans.log'
+    LogWriter(log).write_csv_logs(save_day(storage))
+    target = PlanStorage(tmp_path / 'imported')
+    try:
+        BulkImporter(target, batch_size=2).import_source(log.with_suffix('.csv'))
+        assert history(target) == history(storage)
+        assert [plan.completed for plan in target.iter_plans()] == [True, True, True, False]
+    finally:
+        target.close()
+
+
+def test_csv_export_round_trips(storage, tmp_path):
+    save_day(storage)
+    export = LogWriter(tmp_path / 'plans.log').export_all_plans(storage.iter_plans(), 'csv',
+                                                               export_path=tmp_path / 'export.csv')
+    target = PlanStorage(tmp_path / 'imported')
+    try:
+        BulkImporter(target).import_source(export)
+        assert history(target) == history(storage)
+    finally:
+        target.close()
+
+
+def test_plans_within_the_same_second_are_not_duplicates(tmp_path):
+    entries = [PlanEntry(None, 'Email', timestamp_us=1700000000000000 + offset) for offset in (0, 250000)]
+    log = tmp_path / 'plans.log'
+    LogWriter(log).write_csv_logs(entries)
+    target = PlanStorage(tmp_path / 'imported')
+    try:
+        importer = BulkImporter(target)
+        assert importer.import_source(log.with_suffix('.csv'))['imported'] == 2
+        importer.reset()
+        assert importer.import_source(log.with_suffix('.csv'))['skipped'] == 2
+    finally:
+        target.close()
+
+
+def test_snapshot_round_trips_through_the_importer(tmp_path):
+    source = PlanStorage(tmp_path / 'source', 'json')
+    try:
+        previous = ''
+        for plan in ['Email', 'Standup', 'Email', 'Review', 'Email', 'Standup']:
+            source.save_plan(plan, 'yes' if previous else '', previous)
+            previous = plan
+        source.compact()
+        target = PlanStorage(tmp_path / 'imported')
+        try:
+            BulkImporter(target).import_source(source.plans_file)
+            assert history(target) == history(source)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def test_interrupted_snapshot_import_resumes_mid_chain(tmp_path):
+    source = PlanStorage(tmp_path / 'source', 'json')
+    try:
+        previous = ''
+        for plan in ['Email', 'Standup', 'Email', 'Review', 'Email']:
+            source.save_plan(plan, 'no' if previous else '', previous)
+            previous = plan
+        source.compact()
+        target = PlanStorage(tmp_path / 'imported')
+        try:
+            def interrupt(info):
+                if info['imported'] == 2:
+                    raise KeyboardInterrupt
+
+            with pytest.raises(KeyboardInterrupt):
+                BulkImporter(target, batch_size=2, progress=interrupt).import_source(source.plans_file)
+            state = BulkImporter(target, batch_size=2).import_source(source.plans_file)
+            assert (state['imported'], state['skipped']) == (5, 0)
+            assert history(target) == history(source)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+@pytest.mark.parametrize('source', ['directory', 'snapshot'])
+def test_saves_only_in_the_journal_are_imported(storage, tmp_path, source):
+    save_day(storage)
+    storage.close()
+    assert storage.journal_file.stat().st_size > 0
+    path = storage.data_dir if source == 'directory' else storage.plans_file
+
+    target = PlanStorage(tmp_path / 'imported')
+    try:
+        BulkImporter(target, batch_size=3).import_source(path)
+        assert history(target) == history(storage)
+    finally:
+        target.close()
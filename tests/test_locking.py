@@ -0,0 +1,58 @@
+"""File locks shared between processes, and the single-instance guard."""
+
+import os
+import threading
+
+from periodic_prompter.locking import FileLock, InstanceLock
+
+
+def acquired_within(context, seconds):
+    """Whether another thread can enter context within seconds."""
+    entered = threading.Event()
+    leave = threading.Event()
+
+    def hold():
+        with context:
+            entered.set()
+            leave.wait(5)
+
+    thread = threading.Thread(target=hold, daemon=True)
+    thread.start()
+    result = entered.wait(seconds)
+    leave.set()
+    if result:
+        thread.join(5)
+    # Otherwise the thread is still waiting, and leaves as soon as it gets in
+    return result
+
+
+def test_readers_share_the_lock(tmp_path):
+    lock = FileLock(tmp_path / 'plans.lock')
+    with lock.shared():
+        assert acquired_within(lock.shared(), 1)
+
+
+def test_a_writer_waits_for_readers_and_excludes_them(tmp_path):
+    lock = FileLock(tmp_path / 'plans.lock')
+    with lock.shared():
+        assert not acquired_within(lock.exclusive(), 0.2)
+    with lock.exclusive():
+        assert not acquired_within(lock.shared(), 0.2)
+        assert not acquired_within(lock.exclusive(), 0.2)
+    assert acquired_within(lock.exclusive(), 1)
+
+
+def test_a_second_instance_is_refused(tmp_path):
+    first = InstanceLock(tmp_path / 'data' / 'app.lock')
+    second = InstanceLock(tmp_path / 'data' / 'app.lock')
+    try:
+        assert first.acquire()
+        assert first.acquire()
+        assert (tmp_path / 'data' / 'app.lock').read_text() == f"{os.getpid()}\n"
+        assert not second.acquire()
+
+        first.release()
+        assert second.acquire()
+    finally:
+        first.release()
+        second.release()
@@ -0,0 +1,41 @@
+"""PlanEntry conversions."""
+
+import json
+from datetime import datetime
+
+from periodic_prompter.models import CompletionStatus, PlanEntry
+
+
+def test_sub_second_timestamps_round_trip():
+    entry = PlanEntry(datetime(2025, 3, 4, 9, 15, 2, 123456), 'Write tests', 'Plan', 'yes', True, 7)
+
+    assert entry.timestamp_iso == '2025-03-04T09:15:02.123456'
+    assert entry.datetime == datetime(2025, 3, 4, 9, 15, 2, 123456)
+    assert PlanEntry.from_dict(json.loads(json.dumps(entry.to_dict()))) == entry
+    assert entry.copy() == entry
+
+
+def test_integer_timestamps_are_epoch_seconds():
+    moment = datetime(2025, 3, 4, 9, 15, 2)
+    entry = PlanEntry(int(moment.timestamp()), 'Plan')
+
+    assert entry.datetime == moment
+    assert entry.timestamp == int(moment.timestamp())
+    assert entry.timestamp_iso == '2025-03-04T09:15:02'
+
+
+def test_timestamp_is_whole_seconds_of_timestamp_us():
+    entry = PlanEntry(1700000000.25, 'Plan')
+
+    assert entry.timestamp_us == 1700000000250000
+    assert entry.timestamp == 1700000000
+    assert PlanEntry(None, 'Plan', timestamp_us=entry.timestamp_us) == entry
+
+
+def test_from_dict_normalizes_status():
+    entry = PlanEntry.from_dict({'timestamp': '2025-03-04T09:15:02', 'plan': 'Plan',
+                                 'completion_status': ' Partially '})
+
+    assert entry.completion_status is CompletionStatus.PARTIALLY
+    assert entry.previous_plan == ''
+    assert not entry.completed
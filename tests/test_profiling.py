@@ -0,0 +1,36 @@
+"""Sampled profiling wrappers."""
+
+import threading
+
+from periodic_prompter.profiling import Profiler
+
+
+def test_nested_calls_are_profiled_once(tmp_path):
+    profiler = Profiler(tmp_path, sample_rate=1.0)
+    inner = profiler.wrap('inner', lambda: 1)
+    outer = profiler.wrap('outer', lambda: inner() + 1)
+
+    assert outer() == 2
+    assert profiler.calls == {'outer': 1, 'inner': 1}
+    assert profiler.samples == {'outer': 1}
+
+
+def test_concurrent_calls_are_all_counted(tmp_path):
+    profiler = Profiler(tmp_path, sample_rate=1.0)
+    wrapped = profiler.wrap('work', lambda: sum(range(2000)))
+    start = threading.Barrier(8)
+
+    def worker():
+        start.wait()
+        for _ in range(200):
+            wrapped()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert profiler.calls == {'work': 1600}
+    assert 1 <= profiler.samples['work'] <= 1600
+    assert profiler.stats['work'].total_calls > 0
@@ -0,0 +1,55 @@
+"""The Recent Plans ring and its menu lines."""
+
+from datetime import datetime
+
+from periodic_prompter.events import EventBus, PlanAmended, PlanSaved
+from periodic_prompter.models import CompletionStatus, PlanEntry
+from periodic_prompter.recent import RecentPlans, menu_title
+from periodic_prompter.storage import PlanStorage
+
+
+def test_ring_keeps_the_newest_entries(storage):
+    storage.import_plans([PlanEntry(datetime(2025, 3, 4, hour), f'Plan {hour}') for hour in range(9, 14)])
+    recent = RecentPlans(3)
+    recent.prime(storage)
+    assert [entry.plan for entry in recent.latest()] == ['Plan 13', 'Plan 12', 'Plan 11']
+
+    for hour in range(14, 16):
+        recent.push(PlanEntry(datetime(2025, 3, 4, hour), f'Plan {hour}'))
+    assert [entry.plan for entry in recent.latest()] == ['Plan 15', 'Plan 14', 'Plan 13']
+
+
+def test_saves_and_answers_refresh_the_ring(tmp_path):
+    bus = EventBus()
+    storage = PlanStorage(tmp_path / 'data', events=bus)
+    recent = RecentPlans(2)
+    recent.prime(storage)
+    bus.subscribe(PlanSaved, lambda event: recent.push(event.entry))
+    bus.subscribe(PlanAmended, lambda event: recent.amend(event.entry))
+    try:
+        storage.save_plan('First')
+        storage.save_plan('Second', 'partially', 'First')
+        storage.save_plan('Third', 'yes', 'Second')
+        # Events are published once the save has resolved
+        storage.writer.submit(('sync',)).result()
+    finally:
+        storage.close()
+
+    third, second = recent.latest()
+    assert (third.plan, third.completed) == ('Third', False)
+    assert (second.plan, second.completed, second.completion_status) == ('Second', True, CompletionStatus.YES)
+    assert [title[0] for _, title in recent.menu_items()] == ['…', '✓']
+
+
+def test_amending_an_entry_that_fell_off_changes_nothing():
+    recent = RecentPlans(1)
+    kept = PlanEntry(datetime(2025, 3, 4, 10), 'Kept', entry_id=2)
+    recent.push(kept)
+    gone = PlanEntry(datetime(2025, 3, 4, 9), 'Gone', '', 'no', True, 1)
+    recent.amend(gone)
+    assert recent.latest() == [kept]
+
+
+def test_long_plans_are_truncated_in_the_menu():
+    entry = PlanEntry(datetime(2025, 3, 4, 9, 30), 'x' * 80, '', 'no', True)
+    assert menu_title(entry) == f"✗ Tue 09:30  {'x' * 60}..."
@@ -0,0 +1,51 @@
+"""Cached weekly reviews and their invalidation."""
+
+from datetime import date, datetime
+
+from periodic_prompter.events import EventBus, HistoryChanged
+from periodic_prompter.models import PlanEntry
+from periodic_prompter.reports import ReportGenerator
+from periodic_prompter.storage import PlanStorage
+
+TODAY = date(2025, 3, 20)
+
+
+def plans(day, count):
+    return [PlanEntry(datetime(day.year, day.month, day.day, 9 + hour), f'Plan {hour}', '', 'yes', True)
+            for hour in range(count)]
+
+
+def test_history_changes_invalidate_cached_reviews(tmp_path, monkeypatch):
+    bus = EventBus()
+    changes = []
+    bus.subscribe(HistoryChanged, changes.append)
+    storage = PlanStorage(tmp_path / 'data', events=bus)
+    try:
+        storage.import_plans(plans(date(2025, 3, 4), 2) + plans(date(2025, 3, 11), 3))
+        generator = ReportGenerator(storage)
+        first = dict(generator.reports('week', today=TODAY))
+        assert '| Tue 04 Mar | 2 |' in first['2025-W10']
+
+        # Nothing changed: both closed weeks come from the cache
+        rendered = []
+        render = ReportGenerator._render
+
+        def recording_render(self, period, keys, today):
+            rendered.extend(keys)
+            return render(self, period, keys, today)
+
+        monkeypatch.setattr(ReportGenerator, '_render', recording_render)
+        assert dict(generator.reports('week', today=TODAY)) == first
+        assert rendered == []
+
+        storage.import_plans(plans(date(2025, 3, 5), 1))
+        storage.writer.submit(('sync',)).result()
+        assert changes
+
+        second = dict(generator.reports('week', today=TODAY))
+        assert rendered == ['2025-W10']
+        assert '| Wed 05 Mar | 1 |' in second['2025-W10']
+        assert second['2025-W11'] == first['2025-W11']
+        assert generator.path('week', '2025-W10').read_text(encoding='utf-8') == second['2025-W10']
+    finally:
+        storage.close()
@@ -0,0 +1,131 @@
+"""Scheduling regressions, replayed in virtual time with the simulator."""
+
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta
+
+from periodic_prompter.clock import SystemClock
+from periodic_prompter.scheduler import MAX_WAIT_SECONDS, PromptScheduler
+from periodic_prompter.settings import Settings
+from periodic_prompter.simulator import PRESETS, simulate
+
+
+def fires_on(result, day):
+    return [fire for fire in result['fire_times'] if fire.date() == day.date()]
+
+
+def test_default_prompts_hourly_within_working_hours():
+    # 2025-01-01 is a Wednesday
+    result = simulate(days=7)
+    fires = result['fire_times']
+
+    assert fires_on(result, datetime(2025, 1, 1)) == [
+        datetime(2025, 1, 1, hour) for hour in range(9, 19)
+    ]
+    assert len(fires) == 50
+    assert all(fire.weekday() < 5 for fire in fires)
+    assert all(time(9) <= fire.time() <= time(18) for fire in fires)
+
+
+def test_next_prompt_counts_from_when_the_answer_was_given():
+    result = simulate(days=1, answer_seconds=20 * 60)
+
+    assert result['fire_times'][:4] == [
+        datetime(2025, 1, 1, 9, 0),
+        datetime(2025, 1, 1, 10, 20),
+        datetime(2025, 1, 1, 11, 40),
+        datetime(2025, 1, 1, 13, 0),
+    ]
+
+
+def test_sub_hour_intervals_keep_their_minutes():
+    result = simulate(PRESETS['ninety-minutes'], days=1)
+
+    assert result['fire_times'] == [
+        datetime(2025, 1, 1, 8, 30), datetime(2025, 1, 1, 10, 0), datetime(2025, 1, 1, 11, 30),
+        datetime(2025, 1, 1, 13, 0), datetime(2025, 1, 1, 14, 30), datetime(2025, 1, 1, 16, 0),
+    ]
+
+
+def test_overnight_window_spans_midnight():
+    result = simulate(PRESETS['overnight'], days=2)
+    hours = sorted({fire.hour for fire in result['fire_times']})
+
+    assert hours == [0, 1, 2, 3, 4, 5, 6, 22, 23]
+    assert datetime(2025, 1, 2, 0, 0) in result['fire_times']
+
+
+def test_working_hours_exceptions_and_lunch_break():
+    result = simulate(PRESETS['split-shift'], start=datetime(2025, 12, 23), days=4)
+
+    tuesday = fires_on(result, datetime(2025, 12, 23))
+    assert not [fire for fire in tuesday if time(12, 0) < fire.time() < time(13, 0)]
+    assert tuesday[0] == datetime(2025, 12, 23, 8, 0)
+    assert tuesday[-1] == datetime(2025, 12, 23, 17, 0)
+
+    # Christmas Eve is a short day; the next two are holidays
+    assert fires_on(result, datetime(2025, 12, 24))[-1] == datetime(2025, 12, 24, 12, 0)
+    assert fires_on(result, datetime(2025, 12, 25)) == []
+    assert fires_on(result, datetime(2025, 12, 26)) == []
+
+
+def test_fixed_time_schedule_fires_once_per_working_day():
+    overrides = {'interval_hours': 24, 'schedules': [{'name': 'standup', 'kind': 'plan', 'at': '09:30'}]}
+    result = simulate(overrides, days=7)
+    standups = [fire for fire in result['fire_times'] if fire.time() == time(9, 30)]
+
+    assert [fire.date() for fire in standups] == [
+        (datetime(2025, 1, 1) + timedelta(days=offset)).date() for offset in (0, 1, 2, 5, 6)
+    ]
+
+
+def test_simulating_a_year_is_cheap():
+    result = simulate(PRESETS['quarter-hour'], days=365)
+
+    assert len(result['fire_times']) > 9000
+    assert result['cpu_seconds'] < 5
+
+
+def test_restart_reschedules_on_the_running_thread(tmp_path):
+    settings = Settings(tmp_path)
+    scheduler = PromptScheduler(settings, notification_system=None)
+
+    def intervals():
+        return [prompt.interval for _, _, prompt in scheduler.timers if prompt.kind == 'plan']
+
+    def wait_for(condition):
+        deadline = time_module.monotonic() + 5
+        while not condition() and time_module.monotonic() < deadline:
+            time_module.sleep(0.01)
+
+    scheduler.start()
+    try:
+        thread = scheduler.scheduler_thread
+        wait_for(lambda: intervals() == [timedelta(hours=1)])
+
+        settings.update_multiple({'interval_hours': 3})
+        scheduler.restart()
+        wait_for(lambda: intervals() == [timedelta(hours=3)])
+
+        assert intervals() == [timedelta(hours=3)]
+        assert scheduler.scheduler_thread is thread and thread.is_alive()
+        assert [t.name for t in threading.enumerate()].count('PromptScheduler') == 1
+    finally:
+        scheduler.stop()
+    assert not thread.is_alive()
+
+
+def test_waits_are_capped_so_the_wall_clock_is_rechecked(tmp_path):
+    class RecordingClock(SystemClock):
+        def __init__(self):
+            self.timeouts = []
+
+        def wait(self, event, timeout):
+            self.timeouts.append(timeout)
+            scheduler.stop_event.set()
+            return True
+
+    clock = RecordingClock()
+    scheduler = PromptScheduler(Settings(tmp_path, clock=clock), notification_system=None, clock=clock)
+    scheduler.run_scheduler()
+    assert clock.timeouts == [MAX_WAIT_SECONDS]
@@ -0,0 +1,87 @@
+"""Log sinks built from settings, and backpressure between them."""
+
+import threading
+import time
+
+from periodic_prompter import sinks
+from periodic_prompter.sinks import CSVSink, JSONLSink, Sink, SinkPipeline, TextSink, build_sinks
+
+
+def test_sink_paths_expand_the_home_directory(tmp_path, monkeypatch, storage):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    sinks = build_sinks({'sinks': [
+        {'type': 'text', 'path': '~/logs/plans.txt'},
+        {'type': 'csv', 'path': '~/logs/plans.txt'},
+        {'type': 'jsonl', 'path': '~/logs/plans.jsonl'},
+    ]})
+    assert [type(sink) for sink in sinks] == [TextSink, CSVSink, JSONLSink]
+
+    pipeline = SinkPipeline(sinks)
+    pipeline.publish(storage.save_plan('Write report'))
+    pipeline.close()
+
+    assert sorted(path.name for path in (tmp_path / 'logs').iterdir()) == ['plans.csv', 'plans.jsonl', 'plans.txt']
+    assert not (tmp_path / '~').exists()
+
+
+def test_unknown_settings_are_reported_and_ignored(tmp_path, capsys):
+    sinks = build_sinks({'sinks': [
+        {'type': 'jsonl', 'path': str(tmp_path / 'plans.jsonl'), 'policy': 'drop', 'rotate': 'daily'},
+        {'type': 'carrier-pigeon'},
+    ]})
+
+    assert [(type(sink), sink.policy) for sink in sinks] == [(JSONLSink, 'drop')]
+    err = capsys.readouterr().err
+    assert "Ignoring unknown jsonl sink settings: rotate" in err
+    assert "Unknown log sink type 'carrier-pigeon'" in err
+
+
+class StuckSink(Sink):
+    """A sink whose writes hang until released."""
+
+    def __init__(self, **kwargs):
+        super().__init__('stuck', **kwargs)
+        self.release = threading.Event()
+
+    def write_batch(self, entries):
+        self.release.wait()
+
+
+class ListSink(Sink):
+    def __init__(self, **kwargs):
+        super().__init__('list', **kwargs)
+        self.entries = []
+
+    def write_batch(self, entries):
+        self.entries.extend(entries)
+
+
+def test_a_stalled_blocking_sink_does_not_hold_up_the_others(monkeypatch, storage):
+    monkeypatch.setattr(sinks, 'SINK_BLOCK_TIMEOUT', 0.05)
+    stuck = StuckSink(policy='block', queue_size=1, batch_size=1)
+    healthy = ListSink()
+    pipeline = SinkPipeline([stuck, healthy], batch_size=1)
+    try:
+        for index in range(5):
+            pipeline.publish(storage.save_plan(f'Plan {index}'))
+        deadline = time.monotonic() + 5
+        while len(healthy.entries) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [entry.plan for entry in healthy.entries] == [f'Plan {index}' for index in range(5)]
+        assert stuck.stats()['dropped'] >= 3
+    finally:
+        stuck.release.set()
+        pipeline.close()
+
+
+def test_stopping_a_stuck_sink_gives_up_after_the_timeout(capsys, storage):
+    stuck = StuckSink(queue_size=1)
+    stuck.start()
+    stuck.offer([storage.save_plan('Plan')])
+    started = time.monotonic()
+    try:
+        stuck.stop(timeout=0.1)
+        assert time.monotonic() - started < 2
+        assert "Log sink stuck did not finish" in capsys.readouterr().err
+    finally:
+        stuck.release.set()
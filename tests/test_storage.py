@@ -0,0 +1,192 @@
+"""PlanStorage persistence across saves, imports, compaction and format changes."""
+
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+from periodic_prompter import storage as storage_module
+from periodic_prompter.models import CompletionStatus, PlanEntry
+from periodic_prompter.storage import PlanStorage, upgrade
+
+
+def test_microseconds_survive_compaction_and_conversion(storage):
+    first = storage.save_plan('First')
+    second = storage.save_plan('Second', 'yes', 'First')
+    storage.import_plans([PlanEntry(datetime(2024, 1, 1, 9, 0, 0, 123456), 'Old', '', 'no', True)])
+    storage.compact()
+
+    plans = list(storage.iter_plans())
+    assert [plan.timestamp_us for plan in plans] == [
+        PlanEntry(datetime(2024, 1, 1, 9, 0, 0, 123456), '').timestamp_us,
+        first.timestamp_us,
+        second.timestamp_us,
+    ]
+    assert plans[1].completed and plans[1].completion_status is CompletionStatus.YES
+    storage.close()
+
+    other_format = 'binary' if storage.storage_format == 'json' else 'json'
+    converted = PlanStorage(storage.data_dir, other_format)
+    try:
+        assert list(converted.iter_plans()) == plans
+    finally:
+        converted.close()
+
+
+def test_stats_count_completed_entries_without_an_answer(storage):
+    storage.import_plans([
+        PlanEntry(datetime(2024, 1, 1, 9), 'Answered', '', 'yes', True),
+        PlanEntry(datetime(2024, 1, 1, 10), 'Marked done without an answer', '', '', True),
+        PlanEntry(datetime(2024, 1, 1, 11), 'Open', '', '', False),
+    ])
+    storage.save_plan('Now', 'partially', 'Open')
+
+    stats = storage.get_stats()
+    assert stats['total_plans'] == 4
+    assert stats['completed_plans'] == 3
+    assert stats['completion_rate'] == 75.0
+
+    storage.rebuild_rollups()
+    assert storage.get_stats() == stats
+
+
+def test_legacy_history_with_unknown_statuses_keeps_its_completed_count(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    legacy = [
+        {'timestamp': '2024-01-01T09:00:00', 'plan': 'A', 'completion_status': 'yes', 'completed': True},
+        {'timestamp': '2024-01-01T10:00:00', 'plan': 'B', 'completion_status': 'Done!', 'completed': True},
+        {'timestamp': '2024-01-01T11:00:00', 'plan': 'C', 'completion_status': 'no', 'completed': True},
+        {'timestamp': '2024-01-01T12:00:00', 'plan': 'D', 'completed': True},
+        {'timestamp': '2024-01-01T13:00:00', 'plan': 'E'},
+    ]
+    (data_dir / 'plans.json').write_text(json.dumps(legacy))
+    # Rollups written before the completed counter existed are rebuilt
+    (data_dir / 'rollups.json').write_text(json.dumps({'seq': 0, 'last_day': None, 'days': {}}))
+
+    storage = PlanStorage(data_dir)
+    try:
+        stats = storage.get_stats()
+    finally:
+        storage.close()
+    assert (stats['total_plans'], stats['completed_plans']) == (5, 4)
+
+
+def test_reopening_reads_the_header_and_journal_not_the_history(storage, monkeypatch):
+    storage.save_plan('First')
+    storage.import_plans([PlanEntry(datetime(2024, 1, 1, 9), 'Imported', '', 'yes', True)])
+    storage.compact()
+    storage.save_plan('Second', 'no', 'First')
+    expected = storage._load_state()
+    storage.close()
+
+    def full_load(self, lock=True):
+        raise AssertionError("history decoded at startup")
+
+    monkeypatch.setattr(PlanStorage, '_load_state', full_load)
+    reopened = PlanStorage(storage.data_dir)
+    monkeypatch.undo()
+    try:
+        assert (reopened._seq, reopened._next_id) == (expected['seq'], expected['next_id'])
+        assert reopened.save_plan('Third', 'yes', 'Second').id == expected['next_id']
+        assert len({plan.id for plan in reopened.iter_plans()}) == 4
+    finally:
+        reopened.close()
+
+
+def test_legacy_history_is_read_after_startup(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    legacy = [{'timestamp': f'2024-01-01T{hour:02d}:00:00', 'plan': f'Plan {hour}'} for hour in range(9, 12)]
+    (data_dir / 'plans.json').write_text(json.dumps(legacy))
+
+    storage = PlanStorage(data_dir)
+    try:
+        saved = storage.save_plan('Now', 'yes', 'Plan 11')
+        assert saved.id == 4
+        assert [plan.plan for plan in storage.iter_plans()] == ['Plan 9', 'Plan 10', 'Plan 11', 'Now']
+        assert storage.get_stats()['total_plans'] == 4
+    finally:
+        storage.close()
+
+
+def test_legacy_state_file_is_upgraded_on_read(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (data_dir / 'current_state.json').write_text(json.dumps(
+        {'current_plan': 'Write docs', 'last_completion_status': 'Partially'}))
+
+    storage = PlanStorage(data_dir)
+    try:
+        assert storage.get_current_plan() == 'Write docs'
+        state = storage._load_current_state()
+        assert state['last_completion_status'] == 'partially'
+        assert state['current_id'] == 0
+    finally:
+        storage.close()
+
+
+def test_only_legacy_and_current_schemas_are_read():
+    record = {'timestamp': '2024-01-01T09:00:00', 'plan': 'Plan', 'completion_status': 'YES'}
+    assert upgrade('plan', record, 1)['completion_status'] == 'yes'
+    with pytest.raises(ValueError):
+        upgrade('plan', dict(record, id=0), 2)
+
+
+def test_paging_rebuilds_and_compacts_without_loading_the_history(tmp_path, monkeypatch):
+    storage = PlanStorage(tmp_path / 'data', memory_budget=1024 * 1024)
+    try:
+        storage.import_plans([PlanEntry(datetime(2024, 1, 1, hour), f'Plan {hour}', '', 'yes', True)
+                              for hour in range(9, 18)])
+        storage.compact()
+        storage.save_plan('Now', 'no', 'Plan 17')
+        expected = storage._load_plans()
+
+        def full_load(self, lock=True):
+            raise AssertionError("history loaded whole")
+
+        monkeypatch.setattr(PlanStorage, '_load_state', full_load)
+        storage.rebuild_rollups()
+        storage.rollups_file.unlink()
+        assert storage.get_stats()['total_plans'] == 10
+        storage.compact()
+        monkeypatch.undo()
+        assert storage._load_plans() == expected
+    finally:
+        storage.close()
+
+
+def test_backup_written_from_an_iterator_is_complete(storage):
+    storage.import_plans([PlanEntry(datetime(2024, 1, 1, hour), f'Plan {hour}') for hour in range(9, 12)])
+    plans = storage._load_plans()
+
+    with storage.lock.exclusive():
+        storage._compact(iter(plans), storage._seq, primary_ok=False)
+
+    assert PlanStorage._read_snapshot(storage.backup_file)[1] == plans
+
+
+def test_saves_are_answered_before_the_journal_is_compacted(storage, monkeypatch):
+    monkeypatch.setattr(storage_module, 'JOURNAL_COMPACT_THRESHOLD', 3)
+    compacting = threading.Event()
+    release = threading.Event()
+    released = []
+    do_compact = PlanStorage._do_compact
+
+    def slow_compact(self):
+        compacting.set()
+        released.append(release.wait(5))
+        do_compact(self)
+
+    monkeypatch.setattr(PlanStorage, '_do_compact', slow_compact)
+    for index in range(3):
+        storage.save_plan(f'Plan {index}')
+    # The save that crossed the threshold returned while compaction waits
+    assert compacting.wait(5)
+    release.set()
+    storage.save_plan('Plan 3')
+
+    assert released == [True]
+    assert storage._journal_records == 1
+    assert [plan.plan for plan in storage.iter_plans()] == [f'Plan {index}' for index in range(4)]
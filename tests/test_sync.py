@@ -0,0 +1,130 @@
+"""SyncClient against a local stand-in for the team endpoint."""
+
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from periodic_prompter.models import PlanEntry
+from periodic_prompter.sync import SyncClient, SyncError
+
+
+class Endpoint(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.batches.append(body['plans'])
+        status = self.server.status
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Endpoint)
+    server.batches = []
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(storage, server, **kwargs):
+    return SyncClient(storage, f"http://127.0.0.1:{server.server_port}/plans", **kwargs)
+
+
+def received(server):
+    """Latest copy of each plan the server got, by id."""
+    return {plan['id']: plan for batch in server.batches for plan in batch}
+
+
+def test_entries_are_sent_once_by_id_in_batches(storage, server):
+    saved = [storage.save_plan(f'Plan {n}') for n in range(5)]
+    client = make_client(storage, server, batch_size=2)
+    try:
+        assert client.sync_once() == 5
+        assert [len(batch) for batch in server.batches] == [2, 2, 1]
+        assert sorted(received(server)) == [entry.id for entry in saved]
+        assert client.sync_once() == 0
+    finally:
+        client.stop()
+
+    restarted = make_client(storage, server)
+    try:
+        assert restarted.sync_once() == 0
+        assert len(server.batches) == 3
+    finally:
+        restarted.stop()
+
+
+def test_progress_saved_by_another_client_is_picked_up(storage, server):
+    storage.save_plan('First')
+    app = make_client(storage, server)
+    cli = make_client(storage, server)
+    try:
+        app.sync_once()
+        storage.save_plan('Second')
+        storage.save_plan('Third')
+        assert cli.sync_once() == 2
+        assert app.sync_once() == 0
+        assert app.state['last_id'] == cli.state['last_id']
+        assert [len(batch) for batch in server.batches] == [1, 2]
+    finally:
+        app.stop()
+        cli.stop()
+
+
+def test_answered_entry_is_sent_again(storage, server):
+    first = storage.save_plan('First')
+    client = make_client(storage, server)
+    try:
+        client.sync_once()
+        assert received(server)[first.id]['completed'] == 0
+
+        second = storage.save_plan('Second', 'yes', 'First')
+        client.sync_once()
+        plans = received(server)
+        assert plans[first.id]['completed'] == 1
+        assert plans[first.id]['completion_status'] == 'yes'
+        assert plans[second.id]['completed'] == 0
+    finally:
+        client.stop()
+
+
+def test_imported_older_entries_are_sent(storage, server):
+    storage.save_plan('Today')
+    client = make_client(storage, server)
+    try:
+        client.sync_once()
+        storage.import_plans([PlanEntry(datetime(2024, 1, 1, 9), 'Old', '', 'yes', True)])
+        storage.compact()
+        client.sync_once()
+        assert sorted(plan['plan'] for plan in received(server).values()) == ['Old', 'Today']
+    finally:
+        client.stop()
+
+
+def test_rejected_batch_stays_queued(storage, server):
+    storage.save_plan('First')
+    client = make_client(storage, server)
+    try:
+        server.status = 503
+        with pytest.raises(SyncError):
+            client.sync_once()
+        assert client.stats()['pending'] == 1
+        assert client.state['last_id'] == 0
+
+        server.status = 200
+        assert client.sync_once() == 1
+        assert client.stats()['pending'] == 0
+    finally:
+        client.stop()
@@ -0,0 +1,37 @@
+"""Team report partials read straight from data directories."""
+
+import zipfile
+
+from periodic_prompter.storage import read_data_dir
+from periodic_prompter.team_report import find_jobs, load_partial, merge_partials
+
+
+def fill(storage):
+    previous = ''
+    for plan in ['Email', 'Standup', 'Review']:
+        storage.save_plan(plan, 'yes' if previous else '', previous)
+        previous = plan
+    storage.compact()
+    storage.save_plan('Lunch', 'partially', previous)
+
+
+def test_read_data_dir_matches_storage(storage):
+    fill(storage)
+
+    assert read_data_dir(storage.data_dir) == list(storage.iter_plans())
+
+
+def test_partials_from_directories_and_archives_agree(storage, tmp_path):
+    fill(storage)
+    archive = tmp_path / 'alice.zip'
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for path in storage.data_dir.iterdir():
+            zf.write(path, f"alice/periodic_prompter/{path.name}")
+
+    jobs = find_jobs([str(storage.data_dir), str(archive)])
+    partials = [load_partial(job) for job in jobs]
+
+    assert [partial['entries'] for partial in partials] == [4, 4]
+    assert partials[0]['days'] == partials[1]['days']
+    report = merge_partials(partials)
+    assert (report['plans'], report['answered']) == (8, 6)
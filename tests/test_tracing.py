@@ -0,0 +1,61 @@
+"""Chrome trace output of the tracing ring buffer."""
+
+import json
+
+import pytest
+
+from periodic_prompter import tracing
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.enable(capacity=100)
+    yield tracer
+    tracing.disable()
+
+
+def test_export_writes_chrome_trace_events(tracer, tmp_path, storage):
+    storage.save_plan('Write report')
+    with tracing.span('fire hourly', 'scheduler', planned='09:00') as args:
+        args['late_s'] = 0.5
+    with pytest.raises(KeyError):
+        with tracing.span('dialog', 'prompt'):
+            raise KeyError('plan')
+    tracing.instant('sleep', 'scheduler')
+    tracing.counter('fire lateness (s)', hourly=0.5)
+
+    path = tracing.export(tmp_path / 'traces')
+    document = json.loads(path.read_text())
+
+    assert document['displayTimeUnit'] == 'ms'
+    events = document['traceEvents']
+    metadata = [event for event in events if event['ph'] == 'M']
+    assert {'name': 'process_name', 'ph': 'M', 'pid': tracer.pid,
+            'args': {'name': 'Periodic Prompter'}} in metadata
+    thread_names = {event['args']['name'] for event in metadata if event['name'] == 'thread_name'}
+    assert 'PlanStorageWriter' in thread_names
+
+    spans = {event['name']: event for event in events if event['ph'] == 'X'}
+    assert spans['commit']['cat'] == 'storage'
+    assert spans['fire hourly']['args'] == {'planned': '09:00', 'late_s': 0.5}
+    assert spans['dialog']['args'] == {'error': 'KeyError'}
+    for event in spans.values():
+        assert isinstance(event['ts'], int) and isinstance(event['dur'], int) and event['dur'] >= 0
+    assert [event['ph'] for event in events if event['name'] == 'sleep'] == ['i']
+    assert [event['args'] for event in events if event['ph'] == 'C'] == [{'hourly': 0.5}]
+
+
+def test_buffer_keeps_only_the_newest_events(tracer):
+    for index in range(150):
+        tracing.instant(f'event {index}', 'test')
+
+    names = [event['name'] for event in tracer.to_dict()['traceEvents'] if event['ph'] == 'i']
+    assert names == [f'event {index}' for index in range(50, 150)]
+
+
+def test_nothing_is_recorded_while_tracing_is_off(tmp_path):
+    assert not tracing.enabled()
+    with tracing.span('fire', 'scheduler') as args:
+        assert args == {}
+    assert tracing.export(tmp_path) is None
+    assert list(tmp_path.iterdir()) == []
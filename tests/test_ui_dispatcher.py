@@ -0,0 +1,85 @@
+"""Coalescing of menu updates, driven through ManualBackend."""
+
+import threading
+
+from periodic_prompter.ui_dispatcher import FRAME_INTERVAL, ManualBackend, UIDispatcher
+
+
+def make_dispatcher():
+    backend = ManualBackend()
+    return backend, UIDispatcher(backend)
+
+
+def test_burst_for_one_key_runs_latest_request_once():
+    backend, dispatcher = make_dispatcher()
+    calls = []
+
+    for n in range(5):
+        dispatcher.request('title', lambda n=n: calls.append(n))
+
+    assert calls == []
+    assert len(backend.scheduled) == 1
+    assert backend.scheduled[0][0] == FRAME_INTERVAL
+    assert backend.run_pending() == 1
+    assert calls == [4]
+    assert (dispatcher.requested, dispatcher.flushes) == (5, 1)
+
+
+def test_different_keys_share_one_flush_in_request_order():
+    backend, dispatcher = make_dispatcher()
+    calls = []
+
+    dispatcher.request('title', lambda: calls.append('title'))
+    dispatcher.request('recent', lambda: calls.append('recent'))
+    dispatcher.request('title', lambda: calls.append('title again'))
+
+    assert backend.run_pending() == 1
+    assert calls == ['title again', 'recent']
+
+
+def test_request_after_flush_schedules_a_new_frame():
+    backend, dispatcher = make_dispatcher()
+    calls = []
+
+    dispatcher.request('title', lambda: calls.append(1))
+    backend.run_pending()
+    dispatcher.request('title', lambda: calls.append(2))
+
+    assert len(backend.scheduled) == 1
+    backend.run_pending()
+    assert calls == [1, 2]
+    assert dispatcher.flushes == 2
+    assert backend.run_pending() == 0
+
+
+def test_failing_update_does_not_stop_the_others(capsys):
+    backend, dispatcher = make_dispatcher()
+    calls = []
+
+    dispatcher.request('broken', lambda: 1 / 0)
+    dispatcher.request('title', lambda: calls.append('title'))
+    backend.run_pending()
+
+    assert calls == ['title']
+    assert "Error in UI update 'broken'" in capsys.readouterr().out
+
+
+def test_requests_from_many_threads_coalesce():
+    backend, dispatcher = make_dispatcher()
+    calls = []
+    start = threading.Barrier(8)
+
+    def worker():
+        start.wait()
+        for _ in range(100):
+            dispatcher.request('recent', lambda: calls.append('recent'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.run_pending() == 1
+    assert calls == ['recent']
+    assert dispatcher.requested == 800